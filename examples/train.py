@@ -1,5 +1,4 @@
 from luxai2021.game.game_constants import GAME_CONSTANTS
-from luxai2021.game.position import Position
 import gym
 from gym import spaces
 import numpy as np
@@ -15,8 +14,10 @@ import os
 
 from stable_baselines3 import PPO # pip install stable-baselines3
 from luxai2021.env.lux_env import LuxEnvironment
+from luxai2021.env.vec_env import LuxVecEnv
 from luxai2021.env.agent import Agent
 from luxai2021.game.constants import LuxMatchConfigs_Default
+from luxai2021.game.distance_index import RESOURCE_CLASSES
 from luxai2021.game.actions import *
 from stable_baselines3.common.vec_env import DummyVecEnv, SubprocVecEnv
 from stable_baselines3.common.env_util import make_vec_env
@@ -27,11 +28,6 @@ from functools import partial # pip install functools
 from typing import Callable
 
 
-# https://codereview.stackexchange.com/questions/28207/finding-the-closest-point-to-a-list-of-points
-def closest_node(node, nodes):
-    dist_2 = np.sum((nodes - node)**2, axis=1)
-    return np.argmin(dist_2)
-
 # https://stable-baselines3.readthedocs.io/en/master/guide/examples.html?highlight=SubprocVecEnv#multiprocessing-unleashing-the-power-of-vectorized-environments
 def make_env(env, rank, seed=0):
     """
@@ -144,62 +140,8 @@ class AgentPolicy(Agent):
         """
         Implements getting a observation from the current game for this unit or city
         """
-        obsIndex = 0
-        if isNewTurn:
-            # It's a new turn this event. This flag is set True for only the first observation from each turn.
-            # Update any per-turn fixed observation space that doesn't change per unit/city controlled.
-
-            # Build a list of object nodes by type for quick distance-searches
-            self.objectNodes = {}
-
-            # Add resources
-            for cell in game.map.resources:
-                if cell.resource.type not in self.objectNodes:
-                    self.objectNodes[cell.resource.type] = np.array([[cell.pos.x, cell.pos.y]])
-                else:
-                    self.objectNodes[cell.resource.type] = np.concatenate(
-                        (
-                            self.objectNodes[cell.resource.type],
-                            [[cell.pos.x, cell.pos.y]]
-                        )
-                        , axis=0
-                    )
-            
-            # Add your own and opponent units
-            for t in [team, (team+1)%2]:
-                for u in game.state["teamStates"][team]["units"].values():
-                    key = str(u.type)
-                    if t != team:
-                        key = str(u.type) + "_opponent"
-                    
-                    if key not in self.objectNodes:
-                        self.objectNodes[key] = np.array([[u.pos.x, u.pos.y]])
-                    else:
-                        self.objectNodes[key] = np.concatenate(
-                            (
-                                self.objectNodes[key],
-                                [[u.pos.x, u.pos.y]]
-                            )
-                            , axis=0
-                        )
-            
-            # Add your own and opponent cities
-            for city in game.cities.values():
-                for cells in city.citycells:
-                    key = "city"
-                    if city.team != team:
-                        key = "city_opponent"
-                    
-                    if key not in self.objectNodes:
-                        self.objectNodes[key] = np.array([[cells.pos.x, cells.pos.y]])
-                    else:
-                        self.objectNodes[key] = np.concatenate(
-                            (
-                                self.objectNodes[key],
-                                [[cells.pos.x, cells.pos.y]]
-                            )
-                            , axis=0
-                        )
+        # Nearest objects are looked up in the distance index of the game, computed once per turn
+        index = game.getDistanceIndex()
 
         # Observation space: (Basic minimum for a miner agent)
         # Object:
@@ -231,6 +173,7 @@ class AgentPolicy(Agent):
         #   2x worker counts [cur player, opponent]
         #   2x cart counts [cur player, opponent]
         obs = np.zeros(self.observation_shape)
+        obsIndex = 0
         pos = None
         if unit != None:
             pos = unit.pos
@@ -243,75 +186,55 @@ class AgentPolicy(Agent):
             # Encode the direction to the nearest objects
             #   5x direction_nearest
             #   1x distance
-            for key in [
+            for objectClass in [
                 Constants.RESOURCE_TYPES.WOOD,
                 Constants.RESOURCE_TYPES.COAL,
                 Constants.RESOURCE_TYPES.URANIUM,
                 "city",
-                str(Constants.UNIT_TYPES.WORKER)]:
+                "worker"]:
                 # Process the direction to and distance to this object type
-                
+
                 # Encode the direction to the nearest object (excluding itself)
                 #   5x direction
                 #   1x distance
-                if key in self.objectNodes:
-                    if (
-                            (key == "city" and citytile != None) or
-                            (unit != None and unit.type == key)
-                        ):
-                        # Filter out the current unit from the closest-search
-                        closestIndex = closest_node((pos.x, pos.y), self.objectNodes[key])
-                        filteredNodes = np.delete(self.objectNodes[key], closestIndex, axis=0)
-                    else:
-                        filteredNodes = self.objectNodes[key]
-                    
-                    if len(filteredNodes) == 0:
-                        # No other object of this type
-                        obs[obsIndex+5] = 1.0
+                nearest = index.nearest(
+                    objectClass,
+                    pos.x,
+                    pos.y,
+                    None if objectClass in RESOURCE_CLASSES else team,
+                    exclude=citytile if objectClass == "city" else unit
+                )
+                if nearest is None:
+                    # No other object of this type
+                    obs[obsIndex+5] = 1.0
+                else:
+                    # There is another object of this type
+                    source, distance, direction = nearest
+                    mapping = {
+                        Constants.DIRECTIONS.CENTER: 0,
+                        Constants.DIRECTIONS.NORTH: 1,
+                        Constants.DIRECTIONS.WEST: 2,
+                        Constants.DIRECTIONS.SOUTH: 3,
+                        Constants.DIRECTIONS.EAST: 4,
+                    }
+                    obs[obsIndex+mapping[direction]] = 1.0 # One-hot encoding direction
+
+                    # 0 to 1 distance
+                    obs[obsIndex+5] = min(distance / 20.0, 1.0)
+
+                    # 0 to 1 value (amount of resource, cargo for unit, or fuel for city)
+                    if objectClass == "city":
+                        # City fuel
+                        obs[obsIndex+6] = min(game.cities[source.cityid].fuel / 300, 1.0)
+                    elif objectClass == "worker":
+                        # Unit cargo
+                        obs[obsIndex+6] = min(source.getCargoSpaceLeft() / 100, 1.0)
                     else:
-                        # There is another object of this type
-                        closestIndex = closest_node((pos.x, pos.y), filteredNodes)
-                        
-                        if closestIndex != None and closestIndex >= 0:
-                            closest = filteredNodes[closestIndex]
-                            closestPosition = Position(closest[0], closest[1])
-                            direction = pos.directionTo( closestPosition )
-                            mapping = {
-                                Constants.DIRECTIONS.CENTER: 0,
-                                Constants.DIRECTIONS.NORTH: 1,
-                                Constants.DIRECTIONS.WEST: 2,
-                                Constants.DIRECTIONS.SOUTH: 3,
-                                Constants.DIRECTIONS.EAST: 4,
-                            }
-                            obs[obsIndex+mapping[direction]] = 1.0 # One-hot encoding direction
-
-                            # 0 to 1 distance
-                            distance = pos.distanceTo( closestPosition )
-                            obs[obsIndex+5] = min(distance / 20.0, 1.0)
-
-                            # 0 to 1 value (amount of resource, cargo for unit, or fuel for city)
-                            if key == "city":
-                                # City fuel
-                                obs[obsIndex+6] = min(
-                                    game.cities[game.map.getCellByPos(closestPosition).citytile.cityid].fuel / 300,
-                                    1.0
-                                )
-                            elif key in [Constants.RESOURCE_TYPES.WOOD, Constants.RESOURCE_TYPES.COAL, Constants.RESOURCE_TYPES.URANIUM]:
-                                # Resource amount
-                                obs[obsIndex+6] = min(
-                                    game.map.getCellByPos(closestPosition).resource.amount / 500,
-                                    1.0
-                                )
-                            else:
-                                # Unit cargo
-                                obs[obsIndex+6] = min(
-                                    next(iter(game.map.getCellByPos(closestPosition).units.values())).getCargoSpaceLeft() / 100,
-                                    1.0
-                                )
+                        # Resource amount
+                        obs[obsIndex+6] = min(source.resource.amount / 500, 1.0)
 
                 obsIndex += 7
-            
-        
+
         if unit != None:
             # Encode the cargo space
             #   1x cargo size
@@ -319,7 +242,7 @@ class AgentPolicy(Agent):
             obsIndex += 1
         else:
             obsIndex += 1
-        
+
         # Game state observations
 
         #   1x is night
@@ -334,11 +257,9 @@ class AgentPolicy(Agent):
         #   2x worker counts [cur player, opponent]
         #   2x cart counts [cur player, opponent]
         maxCount = 30
-        for key in ["city", str(Constants.UNIT_TYPES.WORKER), str(Constants.UNIT_TYPES.CART)]:
-            if key in self.objectNodes:
-                obs[obsIndex] = len(self.objectNodes[key]) / maxCount
-            if (key + "_opponent") in self.objectNodes:
-                obs[obsIndex+1] = len(self.objectNodes[(key + "_opponent")]) / maxCount
+        for key in ["cityTiles", "workers", "carts"]:
+            obs[obsIndex] = game.counters[team][key] / maxCount
+            obs[obsIndex+1] = game.counters[(team+1)%2][key] / maxCount
             obsIndex += 2
 
         return obs
@@ -502,6 +423,7 @@ if __name__ == "__main__":
     parser.add_argument('--gamma', help='Gamma', type=float)
     parser.add_argument('--gae_lambda', help='GAE Lambda', type=float)
     parser.add_argument('--batch_size', help='batch_size', type=float)
+    parser.add_argument('--num_envs', help='Number of environments stepped together in this process', type=int, default=1)
     args = parser.parse_args()
     print(args)
 
@@ -514,11 +436,13 @@ if __name__ == "__main__":
     player = AgentPolicy(mode="train")
     
     # Train the model
-    #num_cpu = 4
-    #env = SubprocVecEnv([make_env(LuxEnvironment(configs, learningAgent=AgentPolicy(mode="train"), opponentAgent=Agent()), i) for i in range(num_cpu)])
     id = str(random.randint(0,10000)) if not args.id else args.id
     print("Run id %s" % id)
-    env = LuxEnvironment(configs, player, opponent)
+    if args.num_envs > 1:
+        # in-process vectorized envs, each with its own learning and opponent agents
+        env = LuxVecEnv(configs, partial(AgentPolicy, mode="train"), Agent, args.num_envs)
+    else:
+        env = LuxEnvironment(configs, player, opponent)
     model = PPO("MlpPolicy",
         env,
         verbose=1,
@@ -528,7 +452,7 @@ if __name__ == "__main__":
         gamma = args.gamma if args.gamma else 0.995,
         gae_lambda = args.gae_lambda if args.gae_lambda else 0.95,
         batch_size = args.batch_size if args.batch_size else 64,
-        n_steps=2048*4
+        n_steps=2048*4 // args.num_envs # steps per environment, for the same rollout size
     )
 
     print("Training model...")
@@ -540,6 +464,8 @@ if __name__ == "__main__":
     
     # Inference the model
     print("Inferencing model policy with rendering...")
+    env.close()
+    env = LuxEnvironment(configs, player, opponent)
     obs = env.reset()
     for i in range(600):
         actionCode, _states = model.predict(obs)
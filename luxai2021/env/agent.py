@@ -1,3 +1,5 @@
+import numpy as np
+
 from ..game.constants import Constants
 
 ''' Implements the base class for a training Agent '''
@@ -28,4 +30,30 @@ class Agent():
         self.team = team
     
     def setController(self, matchController):
-        self.matchController = matchController
\ No newline at end of file
+        self.matchController = matchController
+
+    def getTurnObservation(self, game, units, citytiles, team):
+        """
+        Implements getting the observations of all the units and city tiles to control this turn, for a
+        LuxEnvironment in turn mode. Learning agents may override it to build the whole batch at once.
+        Returns: Array with one row per unit, then one per city tile.
+        """
+        observations = []
+        newTurn = True
+        for unit in units:
+            observations.append(self.getObservation(game, unit, None, team, newTurn))
+            newTurn = False
+        for citytile in citytiles:
+            observations.append(self.getObservation(game, None, citytile, team, newTurn))
+            newTurn = False
+        return np.stack(observations)
+
+    def takeTurnActions(self, actionCodes, game, units, citytiles, team):
+        """
+        Takes the actions of all the units and city tiles of this turn, for a LuxEnvironment in turn mode.
+            actionCodes: One action code per row of getTurnObservation().
+        """
+        for i, unit in enumerate(units):
+            self.takeAction(actionCodes[i], game, unit=unit, citytile=None, team=team)
+        for i, citytile in enumerate(citytiles):
+            self.takeAction(actionCodes[len(units) + i], game, unit=None, citytile=citytile, team=team)
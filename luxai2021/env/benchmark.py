@@ -0,0 +1,132 @@
+'''
+Measures the env-steps/sec of the vectorized Lux environments, against stable-baselines3's SubprocVecEnv.
+Map sizes vary with the seeds of the environments, so the pool is measured on a mix of cheap and expensive matches.
+
+To compare 16 environments in 16 processes over 2000 steps:
+    python -m luxai2021.env.benchmark --envs 16 --workers 16 --steps 2000
+'''
+import argparse
+import time
+from functools import partial
+
+import numpy as np
+from gym import spaces
+from stable_baselines3.common.vec_env import SubprocVecEnv
+
+from .agent import Agent
+from .env_pool import LuxEnvPool
+from .lux_env import LuxEnvironment
+from .shm_vec_env import LuxSharedMemoryVecEnv
+from .vec_env import LuxVecEnv
+from ..game.actions import MoveAction
+from ..game.constants import Constants
+
+DIRECTIONS = [
+    Constants.DIRECTIONS.CENTER, Constants.DIRECTIONS.NORTH, Constants.DIRECTIONS.EAST,
+    Constants.DIRECTIONS.SOUTH, Constants.DIRECTIONS.WEST,
+]
+
+
+class BenchmarkAgent(Agent):
+    ''' Learning agent with a small observation, that moves its units in the direction of the action code '''
+    def __init__(self):
+        super().__init__()
+        self.action_space = spaces.Discrete(len(DIRECTIONS))
+        self.observation_space = spaces.Box(low=0, high=1, shape=(5,), dtype=np.float32)
+
+    def getAgentType(self):
+        return Constants.AGENT_TYPE.LEARNING
+
+    def getObservation(self, game, unit, citytile, team, isNewTurn):
+        pos = unit.pos if unit is not None else citytile.pos
+        cargo = unit.cargo.used / 100 if unit is not None else 0
+        return np.array([
+            pos.x / game.map.width, pos.y / game.map.height, cargo, game.isNight(), game.state["turn"] / 360
+        ], dtype=np.float32)
+
+    def takeAction(self, actionCode, game, unit=None, citytile=None, team=None):
+        if unit is not None:
+            self.matchController.takeAction(MoveAction(team, unit.id, DIRECTIONS[actionCode]))
+
+    def getReward(self, game, isGameFinished, isNewTurn, isGameError):
+        return 0
+
+
+def _makeEnv(configs, i):
+    envConfigs = dict(configs)
+    if envConfigs.get("seed") is not None:
+        envConfigs["seed"] += i
+    return LuxEnvironment(envConfigs, BenchmarkAgent(), Agent())
+
+
+def measureStepsPerSecond(env, steps, seed = 0):
+    '''
+    Steps a vectorized environment with random actions.
+    Returns: env-steps/sec, counting one step per environment
+    '''
+    rng = np.random.default_rng(seed)
+    env.reset()
+    actions = rng.integers(0, len(DIRECTIONS), (steps, env.num_envs))
+    startTime = time.perf_counter()
+    for step in range(steps):
+        env.step(actions[step])
+    return steps * env.num_envs / (time.perf_counter() - startTime)
+
+
+def measurePoolStepsPerSecond(pool, steps, seed = 0):
+    '''
+    Steps an environment pool with random actions, sending the actions of each batch as soon as it is received.
+    Returns: env-steps/sec, for as many env-steps as steps of all the environments
+    '''
+    rng = np.random.default_rng(seed)
+    pool.async_reset()
+    envIds = np.concatenate([pool.recv()[3]["env_id"] for i in range(pool.numEnvs // pool.batchSize)])
+    pool.send(rng.integers(0, len(DIRECTIONS), len(envIds)), envIds)
+    envSteps = 0
+    startTime = time.perf_counter()
+    while envSteps < steps * pool.numEnvs:
+        obs, rewards, dones, info = pool.recv()
+        envSteps += len(info["env_id"])
+        pool.send(rng.integers(0, len(DIRECTIONS), len(info["env_id"])), info["env_id"])
+    return envSteps / (time.perf_counter() - startTime)
+
+
+def runBenchmark(numEnvs, numWorkers, steps, configs = None):
+    '''
+    Measures LuxVecEnv, LuxSharedMemoryVecEnv, SubprocVecEnv and LuxEnvPool returning half of the environments at a
+    time, with the same environments.
+    Returns: dict of env-steps/sec by vectorized environment name
+    '''
+    configs = {"seed": 0} if configs is None else configs
+    makers = {
+        "LuxVecEnv": lambda: LuxVecEnv(configs, BenchmarkAgent, Agent, numEnvs),
+        "LuxSharedMemoryVecEnv": lambda: LuxSharedMemoryVecEnv(configs, BenchmarkAgent, Agent, numEnvs, numWorkers),
+        "SubprocVecEnv": lambda: SubprocVecEnv([partial(_makeEnv, configs, i) for i in range(numEnvs)]),
+    }
+    results = {}
+    for name, make in makers.items():
+        env = make()
+        try:
+            results[name] = measureStepsPerSecond(env, steps)
+        finally:
+            env.close()
+
+    pool = LuxEnvPool(configs, BenchmarkAgent, Agent, numEnvs, max(numEnvs // 2, 1), numWorkers)
+    try:
+        results["LuxEnvPool"] = measurePoolStepsPerSecond(pool, steps)
+    finally:
+        pool.close()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Measures the env-steps/sec of the vectorized Lux environments.')
+    parser.add_argument('--envs', help='Number of environments', type=int, default=8)
+    parser.add_argument('--workers', help='Number of worker processes of LuxSharedMemoryVecEnv', type=int)
+    parser.add_argument('--steps', help='Number of steps of every environment', type=int, default=1000)
+    args = parser.parse_args()
+
+    results = runBenchmark(args.envs, args.workers, args.steps)
+    baseline = results["SubprocVecEnv"]
+    for name, stepsPerSecond in results.items():
+        print("%-24s %10.0f env-steps/sec  %5.2fx" % (name, stepsPerSecond, stepsPerSecond / baseline))
@@ -0,0 +1,223 @@
+'''
+Implements an asynchronous pool of Lux environments in worker processes, in the spirit of envpool: recv() returns
+the first environments to finish their step, so the learner never waits behind a slow match.
+'''
+import multiprocessing
+import traceback
+from collections import deque
+from multiprocessing import shared_memory
+from multiprocessing.connection import wait
+
+import numpy as np
+
+from .lux_env import LuxEnvironment
+
+# Commands of the workers
+STEP = 0
+RESET = 1
+CLOSE = 2
+
+
+def _worker(envIndices, configs, makeLearningAgent, makeOpponentAgent, buffers, pipe):
+    '''
+    Runs the environments envIndices of a LuxEnvPool. Receives (command, envId) through the pipe, and replies
+    with the envId once the step data of the environment is in the shared buffers.
+    '''
+    shms = {name: shared_memory.SharedMemory(name=shmName) for name, (shmName, shape, dtype) in buffers.items()}
+    arrays = {
+        name: np.ndarray(shape, dtype=dtype, buffer=shms[name].buf)
+        for name, (shmName, shape, dtype) in buffers.items()
+    }
+    obsBuf, rewards, dones, actions = arrays["obs"], arrays["rewards"], arrays["dones"], arrays["actions"]
+
+    envs = {}
+    try:
+        for i in envIndices:
+            envConfigs = dict(configs)
+            if envConfigs.get("seed") is not None:
+                envConfigs["seed"] += i
+            envs[i] = LuxEnvironment(envConfigs, makeLearningAgent(), makeOpponentAgent())
+
+        while True:
+            command, envId = pipe.recv()
+            if command == CLOSE:
+                break
+            env = envs[envId]
+            if command == STEP:
+                obs, rewards[envId], dones[envId], info = env.step(actions[envId])
+                if dones[envId]:
+                    # The match is over so there is no next observation, start a new match in its place
+                    obs = env.reset()
+            else:
+                obs = env.reset()
+                rewards[envId] = 0
+                dones[envId] = False
+            obsBuf[envId] = obs
+            pipe.send(envId)
+    except Exception:
+        traceback.print_exc()
+        pipe.send(None)
+    finally:
+        del obsBuf, rewards, dones, actions, arrays
+        for shm in shms.values():
+            shm.close()
+        for env in envs.values():
+            env.close()
+        pipe.close()
+
+
+class LuxEnvPool:
+    def __init__(self, configs, makeLearningAgent, makeOpponentAgent, numEnvs, batchSize = None, numWorkers = None,
+                 startMethod = None):
+        """
+        Pool of numEnvs LuxEnvironments stepped asynchronously in worker processes. Step data is exchanged through
+        shared memory, only environment ids go through the pipes.
+        Arguments:
+            configs: Match configs of the games. A seed is offset by the index of the environment.
+            makeLearningAgent: Picklable function returning a new learning agent, called once per environment.
+            makeOpponentAgent: Picklable function returning a new opponent agent, called once per environment.
+            numEnvs: Number of environments.
+            batchSize: Number of environments returned by recv(), all of them by default which steps in lockstep.
+            numWorkers: Number of worker processes, the environments are split evenly between them. One per
+                environment by default.
+            startMethod: Multiprocessing start method, forkserver where available by default.
+        """
+        self.numEnvs = numEnvs
+        self.batchSize = numEnvs if batchSize is None else batchSize
+        if not 0 < self.batchSize <= numEnvs:
+            raise Exception("Batch size must be between 1 and the number of environments %i." % numEnvs)
+        numWorkers = numEnvs if numWorkers is None else min(numWorkers, numEnvs)
+        if startMethod is None:
+            startMethod = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        context = multiprocessing.get_context(startMethod)
+
+        # Spaces are taken from an environment made in this process
+        env = LuxEnvironment(dict(configs), makeLearningAgent(), makeOpponentAgent())
+        self.observation_space = env.observation_space
+        self.action_space = env.action_space
+
+        self.shms = {}
+        self.arrays = {}
+        buffers = {}
+        for name, shape, dtype in [
+            ("obs", (numEnvs,) + env.observation_space.shape, env.observation_space.dtype),
+            ("rewards", (numEnvs,), np.float32),
+            ("dones", (numEnvs,), np.bool_),
+            ("actions", (numEnvs,) + env.action_space.shape, env.action_space.dtype),
+        ]:
+            dtype = np.dtype(dtype)
+            size = max(int(np.prod(shape)) * dtype.itemsize, 1)
+            self.shms[name] = shared_memory.SharedMemory(create=True, size=size)
+            self.arrays[name] = np.ndarray(shape, dtype=dtype, buffer=self.shms[name].buf)
+            self.arrays[name][:] = 0
+            buffers[name] = (self.shms[name].name, shape, dtype)
+
+        self.pipes = []
+        self.processes = []
+        self.workerOf = np.zeros(numEnvs, dtype=np.int64) # worker of each environment
+        for w, envIndices in enumerate(np.array_split(np.arange(numEnvs), numWorkers)):
+            parentPipe, childPipe = context.Pipe()
+            process = context.Process(
+                target=_worker,
+                args=(envIndices.tolist(), configs, makeLearningAgent, makeOpponentAgent, buffers, childPipe),
+                daemon=True
+            )
+            process.start()
+            childPipe.close()
+            self.workerOf[envIndices] = w
+            self.pipes.append(parentPipe)
+            self.processes.append(process)
+
+        self.failed = np.zeros(numWorkers, dtype=bool)
+        self.running = np.zeros(numEnvs, dtype=bool) # environments stepping in a worker
+        self.ready = deque() # environments done stepping and not yet returned by recv()
+        self.closed = False
+
+    def _receive(self):
+        ''' Queues the environments that finished their step as ready, raises if a worker failed '''
+        failed = False
+        for w, pipe in enumerate(self.pipes):
+            if self.failed[w] or not pipe.poll():
+                continue
+            try:
+                envId = pipe.recv()
+            except EOFError:
+                envId = None
+            if envId is None:
+                self.failed[w] = True
+                self.running[self.workerOf == w] = False
+                failed = True
+            else:
+                self.running[envId] = False
+                self.ready.append(envId)
+        if failed:
+            raise Exception("A LuxEnvPool worker failed, see its traceback.")
+
+    def _wait(self):
+        ''' Blocks until a worker has a reply '''
+        wait([pipe for w, pipe in enumerate(self.pipes) if not self.failed[w]])
+
+    def _send(self, command, envIds):
+        for envId in envIds:
+            if self.running[envId]:
+                raise Exception("Environment %i is still running its last step." % envId)
+            self.running[envId] = True
+            self.pipes[self.workerOf[envId]].send((command, envId))
+
+    def async_reset(self):
+        """ Resets all the environments, their first observations are returned by recv() """
+        self.ready.clear()
+        self._send(RESET, range(self.numEnvs))
+
+    def send(self, actions, envIds):
+        """
+        Starts a step of the environments envIds, with one action each. They must have been returned by recv().
+        """
+        envIds = np.asarray(envIds)
+        self.arrays["actions"][envIds] = actions
+        self._send(STEP, envIds.tolist())
+
+    def recv(self):
+        """
+        Waits for batchSize environments to finish their step, in the order they finished.
+        Returns: obs, rewards, dones, info. info["env_id"] holds the ids of the environments of the rows, to send
+            their next actions with. Finished matches are reset in place, obs is then the first of the new match.
+        """
+        while len(self.ready) < self.batchSize:
+            if not self.running.any():
+                raise Exception("No environment is running, send() actions first.")
+            self._wait()
+            self._receive()
+        envIds = np.array([self.ready.popleft() for i in range(self.batchSize)], dtype=np.int64)
+        return (
+            self.arrays["obs"][envIds],
+            self.arrays["rewards"][envIds],
+            self.arrays["dones"][envIds],
+            {"env_id": envIds}
+        )
+
+    def step(self, actions, envIds = None):
+        """ Sends the actions and waits for the next batch, as send() then recv() """
+        self.send(actions, np.arange(self.numEnvs) if envIds is None else envIds)
+        return self.recv()
+
+    def close(self):
+        if self.closed:
+            return
+        # let the running steps finish before closing
+        while self.running.any():
+            self._wait()
+            try:
+                self._receive()
+            except Exception:
+                pass
+        for w, (pipe, process) in enumerate(zip(self.pipes, self.processes)):
+            if not self.failed[w]:
+                pipe.send((CLOSE, None))
+            process.join()
+            pipe.close()
+        self.arrays = {}
+        for shm in self.shms.values():
+            shm.close()
+            shm.unlink()
+        self.closed = True
@@ -13,7 +13,13 @@ class LuxEnvironment(gym.Env):
     """Custom Environment that follows gym interface"""
     metadata = {'render.modes': ['human']}
     
-    def __init__(self, configs, learningAgent, opponentAgent):
+    def __init__(self, configs, learningAgent, opponentAgent, turnMode = False):
+        """
+        Arguments:
+            turnMode: Step a whole turn at a time instead of one unit or city tile. Observations are then
+                one row per unit and city tile of the learning agent that can act, as returned by
+                learningAgent.getTurnObservation(), and step() takes one action code per row.
+        """
         super(LuxEnvironment, self).__init__()
 
         # Create the game
@@ -29,9 +35,15 @@ class LuxEnvironment(gym.Env):
         self.matchGenerator = None
 
         self.lastObservationObject = None
+
+        self.turnMode = turnMode
+        self.entityIds = None # in turn mode, ids of the units and city tiles of the rows of the observation
     
 
     def step(self, action_code):
+        if self.turnMode:
+            return self.stepTurn(action_code)
+
         # Take this action, then get the state at the next action
         
         # Decision for 1 unit or city
@@ -68,12 +80,51 @@ class LuxEnvironment(gym.Env):
         
         return obs, reward, isGameOver, {}
 
+    def stepTurn(self, action_codes):
+        """
+        Takes the actions of all the units and city tiles of this turn, then plays turns until the learning agent
+        has something to control again.
+        """
+        (units, citytiles, team) = self.lastObservationObject
+        self.learningAgent.takeTurnActions(action_codes, self.game, units, citytiles, team)
+
+        self.current_step += 1
+
+        isGameOver = False
+        isGameError = False
+        try:
+            obs = self.nextTurnObservation()
+        except StopIteration as err:
+            # The game episode is done.
+            isGameOver = True
+            obs = None
+        except GameStepFailedException as err:
+            # Game step failed, assign a game lost reward to not incentivise this
+            isGameOver = True
+            obs = None
+            isGameError = True
+
+        # Every step starts a new turn
+        reward = self.learningAgent.getReward(self.game, isGameOver, True, isGameError)
+
+        return obs, reward, isGameOver, {"entityIds": self.entityIds}
+
+    def nextTurnObservation(self):
+        """ Runs the match to the next turn with units or city tiles to control, and returns their observations """
+        (units, citytiles, team) = next(self.matchGenerator)
+        self.lastObservationObject = (units, citytiles, team)
+        self.entityIds = [unit.id for unit in units] + [citytile.getTileID() for citytile in citytiles]
+        return self.learningAgent.getTurnObservation(self.game, units, citytiles, team)
+
     def reset(self):
         self.current_step = 0
         self.lastObservationObject = None
 
         # Reset game + map
         self.matchController.reset()
+        if self.turnMode:
+            self.matchGenerator = self.matchController.runToNextTurn()
+            return self.nextTurnObservation()
         self.matchGenerator = self.matchController.runToNextObservation()
         (unit, citytile, team, isNewTurn) = next(self.matchGenerator)
 
@@ -82,6 +133,11 @@ class LuxEnvironment(gym.Env):
 
         return obs
 
+    def seed(self, seed=None):
+        """ Seeds the maps of the next matches """
+        self.game.configs["seed"] = seed
+        return [seed]
+
     def render(self):
         print(self.current_step)
         print(self.game.map.getMapString())
@@ -0,0 +1,142 @@
+''' Implements a full-map spatial observation, built once per turn and shared by all the units of a team '''
+import numpy as np
+
+from ..game.codes import RESOURCE_INDEX
+from ..game.constants import Constants
+from ..game.game_map import mapSizes
+
+# Channels of the observation, "own" and "enemy" are relative to the team observing
+CHANNELS = [
+    "wood", # resource amounts
+    "coal",
+    "uranium",
+    "ownWorkers", # number of units on the cell
+    "ownCarts",
+    "enemyWorkers",
+    "enemyCarts",
+    "ownCargo", # cargo of the units on the cell, as a fraction of their capacity
+    "enemyCargo",
+    "ownCooldown", # cooldown of the units on the cell
+    "enemyCooldown",
+    "ownCityTiles",
+    "enemyCityTiles",
+    "ownCityFuel", # fuel of the city of the tile over the upkeep of a whole night, capped at 1
+    "enemyCityFuel",
+    "road",
+    "night", # constant planes
+    "cyclePhase",
+    "matchPhase",
+    "onMap", # 1 on the cells of the map, 0 on the padding
+]
+CHANNEL_INDEX = {name: i for i, name in enumerate(CHANNELS)}
+
+# Own and enemy channels swapped, to turn the observation of team A into the one of team B
+_TEAM_SWAP = list(range(len(CHANNELS)))
+for _own, _enemy in [
+    ("ownWorkers", "enemyWorkers"), ("ownCarts", "enemyCarts"), ("ownCargo", "enemyCargo"),
+    ("ownCooldown", "enemyCooldown"), ("ownCityTiles", "enemyCityTiles"), ("ownCityFuel", "enemyCityFuel"),
+]:
+    _TEAM_SWAP[CHANNEL_INDEX[_own]] = CHANNEL_INDEX[_enemy]
+    _TEAM_SWAP[CHANNEL_INDEX[_enemy]] = CHANNEL_INDEX[_own]
+
+RESOURCE_SCALE = 1 / 500 # resource amounts are scaled to about [0, 1]
+COOLDOWN_SCALE = 1 / 10
+
+
+class SpatialObservation:
+    def __init__(self, cropSize = 11, size = None):
+        """
+        Builds a (C, H, W) observation of the whole map for each team, see CHANNELS. Maps smaller than size are
+        placed in the top left corner, with onMap set to 0 on the rest.
+        Args:
+            cropSize: Odd width and height of the crops centred on units returned by getCrop().
+            size: Width and height of the observation, the largest map size by default.
+        """
+        if cropSize % 2 != 1:
+            raise Exception("Crop size must be odd, got %i." % cropSize)
+        self.size = max(mapSizes) if size is None else size
+        self.cropSize = cropSize
+        self.pad = cropSize // 2
+
+        # Observations of both teams are views into a zero padded buffer, so crops near the edges are views too
+        paddedSize = self.size + 2 * self.pad
+        self.buffer = np.zeros((2, len(CHANNELS), paddedSize, paddedSize), dtype=np.float32)
+        self.observations = self.buffer[:, :, self.pad:self.pad + self.size, self.pad:self.pad + self.size]
+        self.turn = None
+
+    def update(self, game):
+        """
+        Builds the observations of both teams for the current turn of the game.
+        """
+        obs = self.observations[Constants.TEAM.A]
+        obs[:] = 0
+        params = game.params
+        width, height = game.map.width, game.map.height
+        if width > self.size or height > self.size:
+            raise Exception("Map of size %i does not fit an observation of size %i." % (width, self.size))
+
+        # resources
+        resources = [(cell.pos.x, cell.pos.y, RESOURCE_INDEX[cell.resource.type], cell.resource.amount)
+                     for cell in game.map.resources]
+        if len(resources) > 0:
+            xs, ys, codes, amounts = np.array(resources).T
+            obs[codes.astype(np.int64) + CHANNEL_INDEX["wood"], ys.astype(np.int64), xs.astype(np.int64)] = (
+                amounts * RESOURCE_SCALE
+            )
+
+        # units, as seen by team A
+        units = []
+        for team, enemy in [(Constants.TEAM.A, 0), (Constants.TEAM.B, 1)]:
+            for unit in game.getTeamsUnits(team).values():
+                units.append((
+                    unit.pos.x, unit.pos.y, enemy, unit.type,
+                    unit.cargo.used / params.resourceCapacity[unit.type], unit.cooldown
+                ))
+        if len(units) > 0:
+            xs, ys, enemy, types, cargo, cooldown = np.array(units).T
+            xs, ys = xs.astype(np.int64), ys.astype(np.int64)
+            enemy, types = enemy.astype(np.int64), types.astype(np.int64)
+            np.add.at(obs, (CHANNEL_INDEX["ownWorkers"] + 2 * enemy + types, ys, xs), 1)
+            np.add.at(obs, (CHANNEL_INDEX["ownCargo"] + enemy, ys, xs), cargo)
+            np.add.at(obs, (CHANNEL_INDEX["ownCooldown"] + enemy, ys, xs), cooldown * COOLDOWN_SCALE)
+
+        # city tiles, with the fuel of their city
+        tiles = []
+        for city in game.cities.values():
+            enemy = 0 if city.team == Constants.TEAM.A else 1
+            nightUpkeep = max(city.getLightUpkeep(), 1) * params.nightLength
+            fuel = min(city.fuel / nightUpkeep, 1)
+            for cell in city.citycells:
+                tiles.append((cell.pos.x, cell.pos.y, enemy, fuel))
+        if len(tiles) > 0:
+            xs, ys, enemy, fuel = np.array(tiles).T
+            xs, ys, enemy = xs.astype(np.int64), ys.astype(np.int64), enemy.astype(np.int64)
+            obs[CHANNEL_INDEX["ownCityTiles"] + enemy, ys, xs] = 1
+            obs[CHANNEL_INDEX["ownCityFuel"] + enemy, ys, xs] = fuel
+
+        # roads, only the changed ones are not at the minimum
+        obs[CHANNEL_INDEX["road"], :height, :width] = params.minRoad / params.maxRoad
+        for cell in game.map.roadCells:
+            obs[CHANNEL_INDEX["road"], cell.pos.y, cell.pos.x] = cell.road / params.maxRoad
+
+        turn = game.state["turn"]
+        obs[CHANNEL_INDEX["night"], :height, :width] = 1 if game.isNight() else 0
+        obs[CHANNEL_INDEX["cyclePhase"], :height, :width] = (turn % params.cycleLength) / params.cycleLength
+        obs[CHANNEL_INDEX["matchPhase"], :height, :width] = turn / params.maxDays
+        obs[CHANNEL_INDEX["onMap"], :height, :width] = 1
+
+        self.observations[Constants.TEAM.B] = obs[_TEAM_SWAP]
+        self.turn = turn
+
+    def getObservation(self, team):
+        """
+        Returns the (C, H, W) observation of a team, a view valid until the next update().
+        """
+        return self.observations[team]
+
+    def getCrop(self, team, x, y):
+        """
+        Returns the (C, cropSize, cropSize) crop of the observation of a team centred on (x, y), a view into the
+        padded buffer valid until the next update(). Cells off the observation are 0.
+        """
+        return self.buffer[team, :, y:y + self.cropSize, x:x + self.cropSize]
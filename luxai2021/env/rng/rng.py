@@ -1,11 +1,92 @@
-import os
-from subprocess import Popen, PIPE
+import numpy as np
+
+
+class SeedRandom:
+    """
+    In-process port of the ARC4 generator of seedrandom.js, seeded as the lux ai CLI tool does with `gen_<seed>`.
+    Gives the same numbers as rng.js, bit for bit, without starting node.
+    """
+    def __init__(self, seed):
+        key = self._mixKey("gen_%s" % seed)
+        if len(key) == 0:
+            key = [0]
+
+        # ARC4 key schedule
+        s = list(range(256))
+        j = 0
+        for i in range(256):
+            t = s[i]
+            j = (j + key[i % len(key)] + t) & 255
+            s[i] = s[j]
+            s[j] = t
+        self.s = s
+        self.i = 0
+        self.j = 0
+
+        # Discard the first 256 bytes, as seedrandom does
+        self._bytes(256)
+
+    @staticmethod
+    def _mixKey(seed):
+        """ seedrandom mixkey(), smearing the characters of the seed into a key of up to 256 bytes """
+        key = []
+        smear = 0
+        for index, char in enumerate(seed):
+            k = index & 255
+            if k == len(key):
+                key.append(0)
+            smear ^= key[k] * 19
+            key[k] = (smear + ord(char)) & 255
+        return key
+
+    def _bytes(self, count):
+        """ Returns the next count bytes of the ARC4 stream as a big-endian integer """
+        s = self.s
+        i = self.i
+        j = self.j
+        r = 0
+        for n in range(count):
+            i = (i + 1) & 255
+            t = s[i]
+            j = (j + t) & 255
+            s[i] = s[j]
+            s[j] = t
+            r = r * 256 + s[(s[i] + t) & 255]
+        self.i = i
+        self.j = j
+        return r
+
+    def random(self):
+        """ Next float in [0, 1) with 52 bits of randomness, as seedrandom's default prng() """
+        n = float(self._bytes(6))
+        d = 281474976710656.0 # 2^48
+        x = 0
+        while n < 4503599627370496.0: # 2^52
+            n = (n + x) * 256
+            d *= 256
+            x = self._bytes(1)
+        while n >= 9007199254740992.0: # 2^53
+            n /= 2
+            d /= 2
+            x >>= 1
+        return (n + x) / d
+
+    def int32(self):
+        """ Next signed 32 bit integer, as seedrandom's prng.int32() """
+        value = self._bytes(4)
+        return value - (1 << 32) if value >= (1 << 31) else value
+
+    def quick(self):
+        """ Next float in [0, 1) with 32 bits of randomness, as seedrandom's prng.quick() """
+        return self._bytes(4) / 4294967296
+
+    def values(self, N):
+        """ Next N floats of random() as a numpy array """
+        return np.array([self.random() for i in range(N)])
+
+
 def get_n_values(seed, N=100):
     """
     Generates the same random numbers as the lux ai CLI tool given the numerical seed and a number of values to generate. 10k values is generally more than enough
     """
-    p = Popen(["node",f"{os.path.dirname(__file__)}/rng.js", str(seed), str(N)], stdout=PIPE)
-    # p.stdin.write(str(seed).encode())
-    output = p.stdout.readline()
-    vals = [float(v) for v in output.decode().split(",")]
-    return vals
\ No newline at end of file
+    return SeedRandom(seed).values(N).tolist()
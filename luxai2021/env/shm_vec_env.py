@@ -0,0 +1,275 @@
+''' Implements a subprocess vectorized Lux environment that exchanges the step data through shared memory '''
+import multiprocessing
+import traceback
+from multiprocessing import shared_memory
+
+import numpy as np
+from .vec_env_base import VecEnv
+
+from .lux_env import LuxEnvironment
+
+# Commands of the workers
+STEP = 0
+RESET = 1
+METHOD = 2 # call or access an attribute of the environments, with the arguments sent through the pipe
+CLOSE = 3
+
+
+def _sharedArray(shm, shape, dtype):
+    return np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+
+def _worker(workerIndex, envIndices, configs, makeLearningAgent, makeOpponentAgent, buffers, commands, errors, hasInfos,
+            start, done, pipe):
+    '''
+    Runs the environments envIndices of a LuxSharedMemoryVecEnv. Waits on start for a command, runs it for all its
+    environments, then releases done. Sets errors[workerIndex] and exits if its environments raised.
+    The infos of a step are sent through the pipe after done, and only if one of them is not empty, see hasInfos.
+    '''
+    shms = {name: shared_memory.SharedMemory(name=shmName) for name, (shmName, shape, dtype) in buffers.items()}
+    arrays = {name: _sharedArray(shms[name], shape, dtype) for name, (shmName, shape, dtype) in buffers.items()}
+    obsBuf, rewards, dones, actions = arrays["obs"], arrays["rewards"], arrays["dones"], arrays["actions"]
+
+    try:
+        envs = []
+        for i in envIndices:
+            envConfigs = dict(configs)
+            if envConfigs.get("seed") is not None:
+                envConfigs["seed"] += i
+            envs.append(LuxEnvironment(envConfigs, makeLearningAgent(), makeOpponentAgent()))
+
+        while True:
+            start.acquire()
+            command = commands[workerIndex]
+            if command == STEP:
+                infos = []
+                for i, env in zip(envIndices, envs):
+                    obs, rewards[i], dones[i], info = env.step(actions[i])
+                    if dones[i]:
+                        # The match is over so there is no next observation, start a new match in its place. The
+                        # infos have no terminal_observation, see LuxVecEnv.step_wait()
+                        obs = env.reset()
+                    obsBuf[i] = obs
+                    infos.append(info)
+                hasInfos[workerIndex] = any(infos)
+            elif command == RESET:
+                for i, env in zip(envIndices, envs):
+                    obsBuf[i] = env.reset()
+            elif command == METHOD:
+                name, indices, args, kwargs = pipe.recv()
+                try:
+                    results = []
+                    for i, env in zip(envIndices, envs):
+                        if i in indices:
+                            if args is None:
+                                results.append(getattr(env, name))
+                            elif name == "__setattr__":
+                                setattr(env, *args)
+                                results.append(None)
+                            else:
+                                results.append(getattr(env, name)(*args, **kwargs))
+                    pipe.send((True, results))
+                except Exception as e:
+                    # raised again in the parent
+                    pipe.send((False, e))
+            elif command == CLOSE:
+                for env in envs:
+                    env.close()
+                break
+            done.release()
+            if command == STEP and hasInfos[workerIndex]:
+                pipe.send(infos)
+    except Exception:
+        traceback.print_exc()
+        errors[workerIndex] = 1
+    finally:
+        del obsBuf, rewards, dones, actions, arrays
+        for shm in shms.values():
+            shm.close()
+        done.release()
+
+
+class LuxSharedMemoryVecEnv(VecEnv):
+    def __init__(self, configs, makeLearningAgent, makeOpponentAgent, numEnvs, numWorkers = None, startMethod = None):
+        """
+        Steps numEnvs LuxEnvironments in worker processes. Actions, observations, rewards and dones are exchanged
+        through shared memory, and each step only signals semaphores, so no arrays are pickled. The info dicts of the
+        environments are sent back through pipes when they are not empty, as in turn mode. Once a worker has failed, the environment raises on every call
+        but close().
+        Arguments:
+            configs: Match configs of the games. A seed is offset by the index of the environment.
+            makeLearningAgent: Picklable function returning a new learning agent, called once per environment.
+            makeOpponentAgent: Picklable function returning a new opponent agent, called once per environment.
+            numEnvs: Number of environments.
+            numWorkers: Number of worker processes, the environments are split evenly between them. One per
+                environment by default.
+            startMethod: Multiprocessing start method, forkserver where available by default.
+        """
+        numWorkers = numEnvs if numWorkers is None else min(numWorkers, numEnvs)
+        if startMethod is None:
+            startMethod = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        context = multiprocessing.get_context(startMethod)
+
+        # Spaces are taken from an environment made in this process
+        env = LuxEnvironment(dict(configs), makeLearningAgent(), makeOpponentAgent())
+        super().__init__(numEnvs, env.observation_space, env.action_space)
+        obsShape = (numEnvs,) + env.observation_space.shape
+        actionShape = (numEnvs,) + env.action_space.shape
+
+        self.shms = {}
+        self.arrays = {}
+        buffers = {}
+        for name, shape, dtype in [
+            ("obs", obsShape, env.observation_space.dtype),
+            ("rewards", (numEnvs,), np.float32),
+            ("dones", (numEnvs,), np.bool_),
+            ("actions", actionShape, env.action_space.dtype),
+        ]:
+            dtype = np.dtype(dtype)
+            size = max(int(np.prod(shape)) * dtype.itemsize, 1)
+            self.shms[name] = shared_memory.SharedMemory(create=True, size=size)
+            self.arrays[name] = _sharedArray(self.shms[name], shape, dtype)
+            self.arrays[name][:] = 0
+            buffers[name] = (self.shms[name].name, shape, dtype)
+
+        self.commands = context.Array("i", numWorkers, lock=False)
+        self.errors = context.Array("b", numWorkers, lock=False) # set by the workers whose environments raised
+        self.hasInfos = context.Array("b", numWorkers, lock=False) # set by the workers sending the infos of a step
+        self.starts = [context.Semaphore(0) for w in range(numWorkers)]
+        self.done = context.Semaphore(0)
+        self.pipes = []
+        self.processes = []
+        self.envIndices = np.array_split(np.arange(numEnvs), numWorkers)
+        for w in range(numWorkers):
+            parentPipe, childPipe = context.Pipe()
+            process = context.Process(
+                target=_worker,
+                args=(w, self.envIndices[w].tolist(), configs, makeLearningAgent, makeOpponentAgent, buffers,
+                      self.commands, self.errors, self.hasInfos, self.starts[w], self.done, childPipe),
+                daemon=True
+            )
+            process.start()
+            childPipe.close()
+            self.pipes.append(parentPipe)
+            self.processes.append(process)
+        self.closed = False
+        self.failed = False
+
+    def _checkFailed(self):
+        if self.failed:
+            raise Exception("A LuxSharedMemoryVecEnv worker failed, the environment can only be closed.")
+
+    def _run(self, command, workers = None):
+        ''' Runs a command on the workers and waits for all of them to finish it '''
+        self._checkFailed()
+        workers = range(len(self.processes)) if workers is None else workers
+        for w in workers:
+            self.commands[w] = command
+            self.starts[w].release()
+        self._wait(len(workers))
+
+    def _wait(self, count):
+        ''' Waits for count workers to finish their command, raises if one of them failed '''
+        for w in range(count):
+            self.done.acquire()
+        if any(self.errors):
+            self.failed = True
+            raise Exception("A LuxSharedMemoryVecEnv worker failed, see its traceback.")
+
+    def reset(self):
+        self._run(RESET)
+        return np.copy(self.arrays["obs"])
+
+    def _recv(self, workers):
+        ''' Receives a reply from each of the workers, None from the failed ones, see _wait() '''
+        replies = []
+        for w in workers:
+            try:
+                replies.append(self.pipes[w].recv())
+            except EOFError:
+                # the worker exited, its error is raised by _wait()
+                replies.append(None)
+        return replies
+
+    def step_async(self, actions):
+        self._checkFailed()
+        self.arrays["actions"][:] = actions
+        for w in range(len(self.processes)):
+            self.commands[w] = STEP
+            self.starts[w].release()
+
+    def step_wait(self):
+        self._wait(len(self.processes))
+        dones = np.copy(self.arrays["dones"])
+        infos = []
+        for w, envIndices in enumerate(self.envIndices):
+            infos += self.pipes[w].recv() if self.hasInfos[w] else [{} for i in envIndices]
+        return np.copy(self.arrays["obs"]), np.copy(self.arrays["rewards"]), dones, infos
+
+    def _callEnvs(self, name, indices, args = None, kwargs = None):
+        ''' Accesses an attribute of the environments, or calls a method of them if args is not None '''
+        self._checkFailed()
+        indices = self._getIndices(indices)
+        workers = [w for w, envIndices in enumerate(self.envIndices) if any(i in indices for i in envIndices)]
+        for w in workers:
+            self.pipes[w].send((name, indices, args, kwargs))
+        for w in workers:
+            self.commands[w] = METHOD
+            self.starts[w].release()
+        replies = self._recv(workers)
+        self._wait(len(workers))
+        results = []
+        for ok, value in replies:
+            if not ok:
+                raise value
+            results += value
+        return results
+
+    def seed(self, seed = None):
+        """ Seeds the maps of the next matches, environment i gets seed + i """
+        seeds = []
+        for i in range(self.num_envs):
+            seeds += self.env_method("seed", None if seed is None else seed + i, indices=i)[0]
+        return seeds
+
+    def close(self):
+        if self.closed:
+            return
+        # failed workers have already exited
+        workers = [w for w in range(len(self.processes)) if not self.errors[w]]
+        for w in workers:
+            self.commands[w] = CLOSE
+            self.starts[w].release()
+        for w in workers:
+            self.done.acquire()
+        for process in self.processes:
+            process.join()
+        for pipe in self.pipes:
+            pipe.close()
+        self.arrays = {}
+        for shm in self.shms.values():
+            shm.close()
+            shm.unlink()
+        self.closed = True
+
+    def get_attr(self, attr_name, indices = None):
+        return self._callEnvs(attr_name, indices)
+
+    def set_attr(self, attr_name, value, indices = None):
+        self._callEnvs("__setattr__", indices, (attr_name, value))
+
+    def env_method(self, method_name, *method_args, indices = None, **method_kwargs):
+        return self._callEnvs(method_name, indices, method_args, method_kwargs)
+
+    def env_is_wrapped(self, wrapper_class, indices = None):
+        return [False for i in self._getIndices(indices)]
+
+    def get_images(self):
+        raise NotImplementedError("LuxSharedMemoryVecEnv does not render images.")
+
+    def _getIndices(self, indices):
+        if indices is None:
+            return list(range(self.num_envs))
+        if isinstance(indices, int):
+            return [indices]
+        return list(indices)
@@ -0,0 +1,84 @@
+''' Implements an in-process vectorized Lux environment, with the stable-baselines3 VecEnv interface '''
+import numpy as np
+from .vec_env_base import VecEnv
+
+from .lux_env import LuxEnvironment
+
+
+class LuxVecEnv(VecEnv):
+    def __init__(self, configs, makeLearningAgent, makeOpponentAgent, numEnvs):
+        """
+        Steps numEnvs LuxEnvironments, each with its own Game and MatchController, in this process. Observations are
+        written into preallocated arrays instead of going through subprocess pipes.
+        Arguments:
+            configs: Match configs of the games. A seed is offset by the index of the environment.
+            makeLearningAgent: Function returning a new learning agent, called once per environment.
+            makeOpponentAgent: Function returning a new opponent agent, called once per environment.
+            numEnvs: Number of environments.
+        """
+        self.envs = []
+        for i in range(numEnvs):
+            envConfigs = dict(configs)
+            if envConfigs.get("seed") is not None:
+                envConfigs["seed"] += i
+            self.envs.append(LuxEnvironment(envConfigs, makeLearningAgent(), makeOpponentAgent()))
+        env = self.envs[0]
+        super().__init__(numEnvs, env.observation_space, env.action_space)
+
+        self.bufObs = np.zeros((numEnvs,) + env.observation_space.shape, dtype=env.observation_space.dtype)
+        self.bufRewards = np.zeros(numEnvs, dtype=np.float32)
+        self.bufDones = np.zeros(numEnvs, dtype=bool)
+        self.bufInfos = [{} for i in range(numEnvs)]
+        self.actions = None
+
+    def reset(self):
+        for i, env in enumerate(self.envs):
+            self.bufObs[i] = env.reset()
+        return np.copy(self.bufObs)
+
+    def step_async(self, actions):
+        self.actions = actions
+
+    def step_wait(self):
+        for i, env in enumerate(self.envs):
+            obs, self.bufRewards[i], self.bufDones[i], self.bufInfos[i] = env.step(self.actions[i])
+            if self.bufDones[i]:
+                # The match is over so there is no next observation, start a new match in its place. The infos have
+                # no terminal_observation, matches end on their own and are never bootstrapped from
+                obs = env.reset()
+            self.bufObs[i] = obs
+        return np.copy(self.bufObs), np.copy(self.bufRewards), np.copy(self.bufDones), list(self.bufInfos)
+
+    def seed(self, seed = None):
+        """ Seeds the maps of the next matches, environment i gets seed + i """
+        seeds = []
+        for i, env in enumerate(self.envs):
+            seeds += env.seed(None if seed is None else seed + i)
+        return seeds
+
+    def close(self):
+        for env in self.envs:
+            env.close()
+
+    def get_attr(self, attr_name, indices = None):
+        return [getattr(env, attr_name) for env in self._getEnvs(indices)]
+
+    def set_attr(self, attr_name, value, indices = None):
+        for env in self._getEnvs(indices):
+            setattr(env, attr_name, value)
+
+    def env_method(self, method_name, *method_args, indices = None, **method_kwargs):
+        return [getattr(env, method_name)(*method_args, **method_kwargs) for env in self._getEnvs(indices)]
+
+    def env_is_wrapped(self, wrapper_class, indices = None):
+        return [isinstance(env, wrapper_class) for env in self._getEnvs(indices)]
+
+    def get_images(self):
+        raise NotImplementedError("LuxVecEnv does not render images.")
+
+    def _getEnvs(self, indices):
+        if indices is None:
+            return self.envs
+        if isinstance(indices, int):
+            indices = [indices]
+        return [self.envs[i] for i in indices]
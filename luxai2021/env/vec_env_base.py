@@ -0,0 +1,20 @@
+'''
+Base class of the vectorized Lux environments: the VecEnv of stable-baselines3 when it is installed, otherwise a
+minimal class with the same interface, so the environments can be used and tested without it.
+'''
+try:
+    from stable_baselines3.common.vec_env import VecEnv
+except ImportError:
+    class VecEnv:
+        def __init__(self, num_envs, observation_space, action_space):
+            """
+            Subset of stable_baselines3.common.vec_env.VecEnv that the Lux vectorized environments rely on.
+            """
+            self.num_envs = num_envs
+            self.observation_space = observation_space
+            self.action_space = action_space
+
+        def step(self, actions):
+            """ Steps all the environments, as step_async() then step_wait() """
+            self.step_async(actions)
+            return self.step_wait()
@@ -8,8 +8,10 @@ class Actionable:
         COAL = 'coal'
         URANIUM = 'uranium'
 
-    def __init__(self, configs) -> None:
-        self.configs = configs
+    __slots__ = ("params", "currentActions", "cooldown")
+
+    def __init__(self, params) -> None:
+        self.params = params
         self.currentActions = []
         self.cooldown = 0.0
     
@@ -2,10 +2,14 @@
 '''Implements /src/Actions/index.ts'''
 #from .game_objects import Player, Unit, City, CityTile
 from .constants import Constants
+from .codes import ACTION_CODES
 
 UNIT_TYPES = Constants.UNIT_TYPES
 
 class Action:
+    __slots__ = ("action", "team")
+    code = None # integer code of the action, see codes.ACTION_CODES
+
     def __init__(self, action, team):
         self.action = action
         self.team = team
@@ -19,6 +23,9 @@ class Action:
 
 
 class MoveAction(Action):
+    __slots__ = ("unitid", "direction")
+    code = ACTION_CODES.MOVE
+
     def __init__(self, team, unitid, direction, **kwarg):
         action = Constants.ACTIONS.MOVE
         self.unitid = unitid
@@ -50,6 +57,8 @@ class MoveAction(Action):
         return True
 
 class SpawnAction(Action):
+    __slots__ = ("unitid", "x", "y")
+
     def __init__(self, action, team, unitid, x, y, **kwarg):
         self.unitid = unitid
         self.x = x
@@ -57,6 +66,9 @@ class SpawnAction(Action):
         super().__init__(action, team)
 
 class SpawnCartAction(SpawnAction):
+    __slots__ = ("type",)
+    code = ACTION_CODES.BUILD_CART
+
     def __init__(self, team, unitid, x, y, **kwarg):
         action = Constants.ACTIONS.BUILD_CART
         self.type = UNIT_TYPES.CART
@@ -84,6 +96,9 @@ class SpawnCartAction(SpawnAction):
         return True
 
 class SpawnWorkerAction(SpawnAction):
+    __slots__ = ("type",)
+    code = ACTION_CODES.BUILD_WORKER
+
     def __init__(self, team, unitid, x, y, **kwarg):
         action = Constants.ACTIONS.BUILD_WORKER
         self.type = UNIT_TYPES.WORKER
@@ -117,6 +132,9 @@ class SpawnWorkerAction(SpawnAction):
     
 
 class SpawnCityAction(Action):
+    __slots__ = ("unitid",)
+    code = ACTION_CODES.BUILD_CITY
+
     def __init__(self, team, unitid, **kwarg):
         action = Constants.ACTIONS.BUILD_CITY
         self.unitid = unitid
@@ -151,6 +169,9 @@ class SpawnCityAction(Action):
         return True
 
 class TransferAction(Action):
+    __slots__ = ("srcID", "destID", "resourceType", "amount")
+    code = ACTION_CODES.TRANSFER
+
     def __init__(self, team, srcID, destID, resourceType, amount):
         action = Constants.ACTIONS.TRANSFER
         self.srcID = srcID
@@ -160,12 +181,18 @@ class TransferAction(Action):
         super().__init__(action, team)
 
 class PillageAction(Action):
+    __slots__ = ("unitid",)
+    code = ACTION_CODES.PILLAGE
+
     def __init__(self, team, unitid):
         action = Constants.ACTIONS.PILLAGE
         self.unitid = unitid
         super().__init__(action, team)
 
 class ResearchAction(Action):
+    __slots__ = ("x", "y")
+    code = ACTION_CODES.RESEARCH
+
     def __init__(self, team, x, y):
         action = Constants.ACTIONS.RESEARCH
         self.x = x
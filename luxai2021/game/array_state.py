@@ -0,0 +1,1253 @@
+'''
+Struct-of-arrays game state.
+
+Holds a batch of independent games as dense NumPy arrays (leading dimension is the game index) and
+runs the turn logic of Game.runTurnWithActions() on those arrays instead of on the Cell/Unit/CityTile
+object graph. Every phase works on the whole batch at once: action validation and routing, move collisions,
+moves, cooldowns, mining, deposits, night upkeep and tree regrowth. Only the actions whose outcome depends on
+the units that acted before them (unit spawns, transfers, city building, pillaging and the roads of carts
+sharing a cell) run one by one.
+
+The object graph of a Game can be loaded into a batch slot with loadGame(), and written back as a view
+with writeView().
+'''
+import math
+import random
+
+import numpy as np
+
+from .actions import *
+from .city import City, CityTile
+from .codes import (
+    RESOURCE_NAMES, RESOURCE_INDEX, WOOD, COAL, URANIUM, MINING_ORDER, DIRECTION_NAME_DELTAS, ACTION_CODES
+)
+from .constants import Constants
+from .params import GameParams
+from .movement import resolveMoveArrays
+from .position import getPosition
+from .unit import Worker, Cart, Cargo
+
+UNIT_TYPES = Constants.UNIT_TYPES
+DIRECTIONS = Constants.DIRECTIONS
+
+# Adjacent cell order used by GameMap.getAdjacentCells(): north, east, south, west
+ADJACENT_DELTAS = [(0, -1), (1, 0), (0, 1), (-1, 0)]
+
+NO_TEAM = -1
+CITYTILE_CARGO_SPACE = 9999999 # Matches CityTile.getCargoSpaceLeft()
+
+
+def occurrences(keys):
+    ''' Number of times the key of each entry appears in keys, for small non negative integer keys '''
+    return np.bincount(keys)[keys]
+
+
+def contains(values, keys):
+    ''' Whether each of keys is in values, as np.isin(keys, values), for small non negative integer keys '''
+    if len(keys) == 0:
+        return np.zeros(0, dtype=bool)
+    return np.bincount(values, minlength=keys.max() + 1)[keys] > 0
+
+
+class TurnActions:
+    __slots__ = ["actions", "batch", "code", "slot", "team", "x", "y", "dx", "dy", "complete"]
+
+    def __init__(self, actions, batch, code, slot, team, x, y, dx, dy, complete):
+        """
+        Actions of a turn of all the games of an ArrayState, as arrays with one entry per action. See
+        ArrayState.decodeActions().
+        Args:
+            actions: The Action objects.
+            batch: Game of each action.
+            code: ACTION_CODES of each action.
+            slot: Unit slot of the unit actions, -1 for the city tile actions and the units the team does not have.
+            team: Team of each action, -1 if it is None.
+            x, y: Cell of the city tile of the city tile actions, cell of the unit of the unit actions.
+            dx, dy: Direction of the move actions.
+            complete: False for the actions missing an argument, they are never valid.
+        """
+        self.actions = actions
+        self.batch = batch
+        self.code = code
+        self.slot = slot
+        self.team = team
+        self.x = x
+        self.y = y
+        self.dx = dx
+        self.dy = dy
+        self.complete = complete
+
+    def select(self, mask):
+        ''' Returns the actions where mask is True '''
+        indices = np.nonzero(mask)[0]
+        return TurnActions(
+            [self.actions[i] for i in indices.tolist()],
+            *(getattr(self, name)[indices] for name in TurnActions.__slots__[1:])
+        )
+
+
+class ArrayState:
+    def __init__(self, configs, batchSize=1, height=32, width=32, unitCapacity=16, cityCapacity=8):
+        self.configs = configs
+        self.batchSize = batchSize
+        self.height = height
+        self.width = width
+
+        self.params = GameParams(configs["parameters"])
+        self.fuelRates = np.array(self.params.fuelRates, dtype=np.int64)
+        self.collectionRates = self.params.collectionRates
+        self.cargoCapacity = self.params.resourceCapacity # Indexed by unit type
+        self.cargoCapacities = np.array(self.cargoCapacity, dtype=np.int64)
+
+        shape = (batchSize, height, width)
+        self.mapWidth = np.zeros(batchSize, dtype=np.int64)
+        self.mapHeight = np.zeros(batchSize, dtype=np.int64)
+
+        # Cells
+        self.resourceType = np.full(shape, -1, dtype=np.int8)
+        self.resourceAmount = np.zeros(shape, dtype=np.float64)
+        self.resourceOrder = np.full(shape, -1, dtype=np.int64) # Order of the cell in GameMap.resources
+        self.road = np.zeros(shape, dtype=np.float64)
+        self.unitCount = np.zeros(shape, dtype=np.int64)
+
+        # City tiles, at most one per cell
+        self.cityTileTeam = np.full(shape, NO_TEAM, dtype=np.int8)
+        self.cityTileCity = np.full(shape, -1, dtype=np.int64)
+        self.cityTileCooldown = np.zeros(shape, dtype=np.float64)
+        self.cityTileAdjacent = np.zeros(shape, dtype=np.int64)
+
+        # Units, slots are assigned in spawn order and never reused within a game
+        self._allocateUnits(unitCapacity)
+
+        # Cities, slots are assigned in creation order and never reused within a game
+        self._allocateCities(cityCapacity)
+
+        # Game state
+        self.turn = np.zeros(batchSize, dtype=np.int64)
+        self.globalCityIDCount = np.zeros(batchSize, dtype=np.int64)
+        self.globalUnitIDCount = np.zeros(batchSize, dtype=np.int64)
+        self.arrivalCount = np.zeros(batchSize, dtype=np.int64)
+        self.researchPoints = np.zeros((batchSize, 2), dtype=np.int64)
+        self.researched = np.zeros((batchSize, 2, 3), dtype=bool)
+
+        # Stats
+        self.fuelGenerated = np.zeros((batchSize, 2), dtype=np.int64)
+        self.resourcesCollected = np.zeros((batchSize, 2, 3), dtype=np.int64)
+        self.cityTilesBuilt = np.zeros((batchSize, 2), dtype=np.int64)
+        self.workersBuilt = np.zeros((batchSize, 2), dtype=np.int64)
+        self.cartsBuilt = np.zeros((batchSize, 2), dtype=np.int64)
+        self.roadsBuilt = np.zeros((batchSize, 2), dtype=np.float64)
+        self.roadsPillaged = np.zeros((batchSize, 2), dtype=np.float64)
+
+        # Sparse per game bookkeeping
+        self.unitSlots = [0] * batchSize
+        self.unitIds = [[] for b in range(batchSize)]
+        self.unitIdToSlot = [{} for b in range(batchSize)]
+        self.citySlots = [0] * batchSize
+        self.cityIds = [[] for b in range(batchSize)]
+        self.cityIdToSlot = [{} for b in range(batchSize)]
+        self.cityCells = [{} for b in range(batchSize)] # city slot -> list of (x, y) in City.citycells order
+
+        # Object view bookkeeping, see writeView()
+        self._viewUnits = [{} for b in range(batchSize)]
+        self._viewCities = [{} for b in range(batchSize)]
+        self._dirtyCities = [set() for b in range(batchSize)]
+        self._viewUnitState = [None] * batchSize
+        self._viewTileState = [None] * batchSize
+        self._viewResourceAmount = self.resourceAmount.copy()
+        self._viewRoad = self.road.copy()
+
+    def _allocateUnits(self, capacity):
+        shape = (self.batchSize, capacity)
+        self.unitCapacity = capacity
+        self.unitAlive = np.zeros(shape, dtype=bool)
+        self.unitTeam = np.zeros(shape, dtype=np.int8)
+        self.unitType = np.zeros(shape, dtype=np.int8)
+        self.unitX = np.zeros(shape, dtype=np.int64)
+        self.unitY = np.zeros(shape, dtype=np.int64)
+        self.unitCargo = np.zeros(shape + (3,), dtype=np.int64)
+        self.unitCooldown = np.zeros(shape, dtype=np.float64)
+        self.unitArrival = np.zeros(shape, dtype=np.int64) # Order units entered their cell, matches Cell.units order
+
+    def _growUnits(self):
+        old = (self.unitAlive, self.unitTeam, self.unitType, self.unitX, self.unitY, self.unitCargo, self.unitCooldown, self.unitArrival)
+        capacity = self.unitCapacity
+        self._allocateUnits(capacity * 2)
+        new = (self.unitAlive, self.unitTeam, self.unitType, self.unitX, self.unitY, self.unitCargo, self.unitCooldown, self.unitArrival)
+        for oldArr, newArr in zip(old, new):
+            newArr[:, :capacity] = oldArr
+
+    def _allocateCities(self, capacity):
+        shape = (self.batchSize, capacity)
+        self.cityCapacity = capacity
+        self.cityAlive = np.zeros(shape, dtype=bool)
+        self.cityTeam = np.zeros(shape, dtype=np.int8)
+        self.cityFuel = np.zeros(shape, dtype=np.float64)
+
+    def _growCities(self):
+        old = (self.cityAlive, self.cityTeam, self.cityFuel)
+        capacity = self.cityCapacity
+        self._allocateCities(capacity * 2)
+        new = (self.cityAlive, self.cityTeam, self.cityFuel)
+        for oldArr, newArr in zip(old, new):
+            newArr[:, :capacity] = oldArr
+
+    def clear(self, b):
+        ''' Resets batch slot b to an empty game. '''
+        self.mapWidth[b] = 0
+        self.mapHeight[b] = 0
+        self.resourceType[b] = -1
+        self.resourceAmount[b] = 0
+        self.resourceOrder[b] = -1
+        self.road[b] = self.params.minRoad
+        self.unitCount[b] = 0
+        self.cityTileTeam[b] = NO_TEAM
+        self.cityTileCity[b] = -1
+        self.cityTileCooldown[b] = 0
+        self.cityTileAdjacent[b] = 0
+
+        self.unitAlive[b] = False
+        self.unitCargo[b] = 0
+        self.unitCooldown[b] = 0
+        self.cityAlive[b] = False
+        self.cityFuel[b] = 0
+
+        self.turn[b] = 0
+        self.globalCityIDCount[b] = 0
+        self.globalUnitIDCount[b] = 0
+        self.arrivalCount[b] = 0
+        self.researchPoints[b] = 0
+        self.researched[b] = False
+        self.researched[b, :, WOOD] = True
+
+        self.fuelGenerated[b] = 0
+        self.resourcesCollected[b] = 0
+        self.cityTilesBuilt[b] = 0
+        self.workersBuilt[b] = 0
+        self.cartsBuilt[b] = 0
+        self.roadsBuilt[b] = 0
+        self.roadsPillaged[b] = 0
+
+        self.unitSlots[b] = 0
+        self.unitIds[b] = []
+        self.unitIdToSlot[b] = {}
+        self.citySlots[b] = 0
+        self.cityIds[b] = []
+        self.cityIdToSlot[b] = {}
+        self.cityCells[b] = {}
+
+        self._viewUnits[b] = {}
+        self._viewCities[b] = {}
+        self._dirtyCities[b] = set()
+
+    def loadGame(self, b, game):
+        '''
+        Loads the state of an object engine Game into batch slot b. The game's objects are kept as the
+        view that writeView() updates.
+        '''
+        self.clear(b)
+        gameMap = game.map
+        if gameMap.width > self.width or gameMap.height > self.height:
+            raise ValueError("Map of size %ix%i does not fit in the array state." % (gameMap.width, gameMap.height))
+        self.mapWidth[b] = gameMap.width
+        self.mapHeight[b] = gameMap.height
+
+        for y in range(gameMap.height):
+            for x in range(gameMap.width):
+                cell = gameMap.getCell(x, y)
+                self.road[b, y, x] = cell.road
+                if cell.resource is not None:
+                    self.resourceType[b, y, x] = RESOURCE_INDEX[cell.resource.type]
+                    self.resourceAmount[b, y, x] = cell.resource.amount
+        for i, cell in enumerate(gameMap.resources):
+            self.resourceOrder[b, cell.pos.y, cell.pos.x] = i
+
+        for city in game.cities.values():
+            slot = self._newCitySlot(b, city.team, city.id)
+            self.cityFuel[b, slot] = city.fuel
+            self._viewCities[b][slot] = city
+            for cell in city.citycells:
+                x, y = cell.pos.x, cell.pos.y
+                self.cityCells[b][slot].append((x, y))
+                self.cityTileTeam[b, y, x] = cell.citytile.team
+                self.cityTileCooldown[b, y, x] = cell.citytile.cooldown
+                self.cityTileAdjacent[b, y, x] = cell.citytile.adjacentCityTiles
+        for city in game.cities.values():
+            for cell in city.citycells:
+                self.cityTileCity[b, cell.pos.y, cell.pos.x] = self.cityIdToSlot[b][cell.citytile.cityid]
+
+        units = []
+        for team in [Constants.TEAM.A, Constants.TEAM.B]:
+            units += game.state["teamStates"][team]["units"].values()
+        units.sort(key=lambda unit: int(unit.id.split("_")[-1]))
+        arrival = {}
+        for y in range(gameMap.height):
+            for x in range(gameMap.width):
+                for unitid in gameMap.getCell(x, y).units:
+                    arrival[unitid] = len(arrival)
+        for unit in units:
+            slot = self._newUnitSlot(b, unit.type, unit.team, unit.pos.x, unit.pos.y, unit.id)
+            for i, name in enumerate(RESOURCE_NAMES):
+                self.unitCargo[b, slot, i] = unit.cargo[name]
+            self.unitCooldown[b, slot] = unit.cooldown
+            self.unitArrival[b, slot] = arrival[unit.id]
+            self._viewUnits[b][slot] = unit
+        self.arrivalCount[b] = len(arrival)
+
+        self.turn[b] = game.state["turn"]
+        self.globalCityIDCount[b] = game.globalCityIDCount
+        self.globalUnitIDCount[b] = game.globalUnitIDCount
+        for team in [Constants.TEAM.A, Constants.TEAM.B]:
+            teamState = game.state["teamStates"][team]
+            self.researchPoints[b, team] = teamState["researchPoints"]
+            for i, name in enumerate(RESOURCE_NAMES):
+                self.researched[b, team, i] = teamState["researched"][name]
+            teamStats = game.stats["teamStats"][team]
+            self.fuelGenerated[b, team] = teamStats["fuelGenerated"]
+            for i, name in enumerate(RESOURCE_NAMES):
+                self.resourcesCollected[b, team, i] = teamStats["resourcesCollected"][name]
+            self.cityTilesBuilt[b, team] = teamStats["cityTilesBuilt"]
+            self.workersBuilt[b, team] = teamStats["workersBuilt"]
+            self.cartsBuilt[b, team] = teamStats["cartsBuilt"]
+            self.roadsBuilt[b, team] = teamStats["roadsBuilt"]
+            self.roadsPillaged[b, team] = teamStats["roadsPillaged"]
+
+        self._viewUnitState[b] = self._unitViewState(b)
+        self._viewTileState[b] = self._tileViewState(b)
+        self._viewResourceAmount[b] = self.resourceAmount[b]
+        self._viewRoad[b] = self.road[b]
+
+    def _newUnitSlot(self, b, type, team, x, y, unitid):
+        slot = self.unitSlots[b]
+        if slot >= self.unitCapacity:
+            self._growUnits()
+        self.unitSlots[b] += 1
+        self.unitAlive[b, slot] = True
+        self.unitTeam[b, slot] = team
+        self.unitType[b, slot] = type
+        self.unitX[b, slot] = x
+        self.unitY[b, slot] = y
+        self.unitCargo[b, slot] = 0
+        self.unitCooldown[b, slot] = 0.0
+        self.unitCount[b, y, x] += 1
+        self.unitIds[b].append(unitid)
+        self.unitIdToSlot[b][unitid] = slot
+        return slot
+
+    def _newCitySlot(self, b, team, cityid):
+        slot = self.citySlots[b]
+        if slot >= self.cityCapacity:
+            self._growCities()
+        self.citySlots[b] += 1
+        self.cityAlive[b, slot] = True
+        self.cityTeam[b, slot] = team
+        self.cityFuel[b, slot] = 0
+        self.cityIds[b].append(cityid)
+        self.cityIdToSlot[b][cityid] = slot
+        self.cityCells[b][slot] = []
+        return slot
+
+    def isNight(self):
+        '''
+        Is it night, for each game.
+        Implements src/Game/index.ts -> Game.isNight()
+        '''
+        return (self.turn % self.params.cycleLength) >= self.params.dayLength
+
+    def getUnitSlot(self, b, team, unitid):
+        '''
+        Get the slot of a unit. Raises KeyError like Game.getUnit() if the team has no such unit.
+        '''
+        slot = self.unitIdToSlot[b][unitid]
+        if self.unitTeam[b, slot] != team:
+            raise KeyError(unitid)
+        return slot
+
+    def getCargoSpaceLeft(self, b, slot):
+        return self.cargoCapacity[self.unitType[b, slot]] - int(self.unitCargo[b, slot].sum())
+
+    def getCityLightUpkeeps(self):
+        '''
+        Light upkeep of every city slot, for all games at once.
+        Implements City.getLightUpkeep()
+        '''
+        params = self.params
+        tb, ty, tx = np.nonzero(self.cityTileTeam != NO_TEAM)
+        city = tb * self.cityCapacity + self.cityTileCity[tb, ty, tx]
+        size = self.batchSize * self.cityCapacity
+        tiles = np.bincount(city, minlength=size)
+        adjacent = np.bincount(city, weights=self.cityTileAdjacent[tb, ty, tx], minlength=size)
+        upkeep = tiles * params.cityUpkeep - adjacent * params.cityAdjacencyBonus
+        return upkeep.reshape(self.batchSize, self.cityCapacity)
+
+    def unitCapReached(self, b, team):
+        '''
+        Implements Game.workerUnitCapReached() and Game.cartUnitCapReached()
+        '''
+        units = np.count_nonzero(self.unitAlive[b] & (self.unitTeam[b] == team))
+        cities = np.count_nonzero(self.cityAlive[b] & (self.cityTeam[b] == team))
+        return units >= cities
+
+    def getTeamCounters(self, b):
+        '''
+        Per-team counters of game b, in the format of Game.counters
+        '''
+        alive = self.unitAlive[b]
+        cities = np.bincount(self.cityTeam[b][self.cityAlive[b]], minlength=2).tolist()
+        cityTiles = np.bincount(self.cityTileTeam[b][self.cityTileTeam[b] != NO_TEAM], minlength=2).tolist()
+        workers = np.bincount(self.unitTeam[b][alive & (self.unitType[b] == UNIT_TYPES.WORKER)], minlength=2).tolist()
+        carts = np.bincount(self.unitTeam[b][alive & (self.unitType[b] == UNIT_TYPES.CART)], minlength=2).tolist()
+        return {
+            team: {"cities": cities[team], "cityTiles": cityTiles[team], "workers": workers[team], "carts": carts[team]}
+            for team in [Constants.TEAM.A, Constants.TEAM.B]
+        }
+
+    def getWinningTeam(self, b):
+        '''
+        Implements Game.getWinningTeam()
+        '''
+        # count city tiles, then units, then fuel generation
+        cityTileCount = np.bincount(self.cityTileTeam[b][self.cityTileTeam[b] != NO_TEAM], minlength=2)
+        unitCount = np.bincount(self.unitTeam[b][self.unitAlive[b]], minlength=2)
+        for counts in (cityTileCount, unitCount, self.fuelGenerated[b]):
+            if counts[Constants.TEAM.A] > counts[Constants.TEAM.B]:
+                return Constants.TEAM.A
+            elif counts[Constants.TEAM.A] < counts[Constants.TEAM.B]:
+                return Constants.TEAM.B
+
+        # if still undecided, for now, go by random choice
+        if random.random() > 0.5:
+            return Constants.TEAM.A
+        return Constants.TEAM.B
+
+    def _cellIndices(self, b, x, y):
+        ''' Integer index of cells, unique across the batch '''
+        return (b * self.height + y) * self.width + x
+
+    def runTurn(self, actions, validate = False):
+        '''
+        Runs a single turn for every game in the batch.
+        Implements the same turn as Game.runTurnWithActions()
+        Args:
+            actions: List with one list of actions per game.
+            validate: Drop the invalid actions first, as MatchController.takeAction() does. Otherwise the actions
+                are expected to be valid already.
+        Returns:
+            Bool array, True for the games whose match is over
+        '''
+        night = self.isNight()
+        turnActions = self.decodeActions(actions)
+        if validate:
+            turnActions = turnActions.select(self.validateActions(turnActions))
+
+        # give units and city tiles their actions, then run city tiles and units in the object engine's order
+        unitActions = self._routeUnitActions(turnActions)
+        self._runCityTiles(turnActions)
+        self._runUnits(turnActions, unitActions, night)
+
+        # city tiles cooldown by one each turn, after acting
+        cooling = (self.cityTileTeam != NO_TEAM) & (self.cityTileCooldown > 0)
+        self.cityTileCooldown[cooling] -= 1
+
+        # distribute all resources in order of decreasing fuel efficiency
+        self.distributeAllResources()
+
+        # now we make all units with cargo drop all resources on the city they are standing on
+        self.handleResourceDeposit()
+
+        if night.any():
+            self.handleNight(night)
+
+        # regenerate forests
+        self.regenerateTrees()
+
+        matchOver = self.matchOver()
+
+        self.turn += 1
+
+        self.runCooldowns()
+
+        return matchOver
+
+    def decodeActions(self, actions):
+        '''
+        Flattens one list of actions per game into a TurnActions. Actions of units that the team does not have
+        get slot -1, as Game.getUnit() would raise for them.
+        '''
+        objects = []
+        rows = [] # (game, code, slot, team, x, y, dx, dy, complete) of each action
+        for b, gameActions in enumerate(actions):
+            unitIdToSlot = self.unitIdToSlot[b]
+            for action in gameActions:
+                if action is None:
+                    continue
+                code = action.code
+                x = y = dx = dy = 0
+                isComplete = action.team is not None
+                if code == ACTION_CODES.MOVE:
+                    slot = unitIdToSlot.get(action.unitid, -1)
+                    delta = DIRECTION_NAME_DELTAS.get(action.direction)
+                    if delta is None:
+                        isComplete = False
+                    else:
+                        dx, dy = delta
+                elif code == ACTION_CODES.TRANSFER:
+                    slot = unitIdToSlot.get(action.srcID, -1)
+                elif code == ACTION_CODES.BUILD_CITY or code == ACTION_CODES.PILLAGE:
+                    slot = unitIdToSlot.get(action.unitid, -1)
+                else:
+                    slot = -1
+                    if action.x is None or action.y is None:
+                        isComplete = False
+                    else:
+                        x, y = action.x, action.y
+                objects.append(action)
+                rows.append((b, code, slot, -1 if action.team is None else action.team, x, y, dx, dy, isComplete))
+
+        columns = np.array(rows, dtype=np.int64).reshape(-1, 9).T
+        turnActions = TurnActions(objects, *columns[:8], columns[8].astype(bool))
+        b, slot = turnActions.batch, turnActions.slot
+        units = np.nonzero(slot >= 0)[0]
+        ownUnits = self.unitTeam[b[units], slot[units]] == turnActions.team[units]
+        slot[units[~ownUnits]] = -1
+        units = units[ownUnits]
+        turnActions.x[units] = self.unitX[b[units], slot[units]]
+        turnActions.y[units] = self.unitY[b[units], slot[units]]
+        return turnActions
+
+    def validateActions(self, turnActions):
+        '''
+        Validates the actions of a turn against the state of their games, same outcome as action.isValid(game).
+        Returns: Bool array, False for the invalid actions and the actions of units that do not exist.
+        '''
+        params = self.params
+        b, code, slot, team, x, y = (
+            turnActions.batch, turnActions.code, turnActions.slot, turnActions.team, turnActions.x, turnActions.y
+        )
+        isMove = code == ACTION_CODES.MOVE
+        isBuildCity = code == ACTION_CODES.BUILD_CITY
+        isSpawn = (code == ACTION_CODES.BUILD_WORKER) | (code == ACTION_CODES.BUILD_CART)
+        isUnitAction = isMove | isBuildCity | (code == ACTION_CODES.TRANSFER) | (code == ACTION_CODES.PILLAGE)
+        valid = turnActions.complete & ~(isUnitAction & (slot < 0))
+
+        # units validate they can act, move actions that they stay on the map, collisions are handled in the turn
+        unitSlot = np.maximum(slot, 0)
+        canAct = self.unitCooldown[b, unitSlot] < 1
+        newX, newY = x + turnActions.dx, y + turnActions.dy
+        onMap = (newX >= 0) & (newY >= 0) & (newX < self.mapWidth[b]) & (newY < self.mapHeight[b])
+        valid &= ~isMove | (canAct & onMap)
+
+        # city tiles are built on empty cells, with enough resources
+        cellX, cellY = np.clip(x, 0, self.width - 1), np.clip(y, 0, self.height - 1)
+        hasResource = (self.resourceType[b, cellY, cellX] >= 0) & (self.resourceAmount[b, cellY, cellX] > 0)
+        valid &= ~isBuildCity | (
+            canAct &
+            (self.unitCargo[b, unitSlot].sum(axis=1) >= params.cityBuildCost) &
+            (self.cityTileTeam[b, cellY, cellX] == NO_TEAM) &
+            ~hasResource
+        )
+
+        # units are built by city tiles that can act, while the team has fewer units than city tiles
+        onMap = (x >= 0) & (y >= 0) & (x < self.mapWidth[b]) & (y < self.mapHeight[b])
+        teams = [Constants.TEAM.A, Constants.TEAM.B]
+        units = np.stack([(self.unitAlive & (self.unitTeam == t)).sum(axis=1) for t in teams], axis=1)
+        cities = np.stack([(self.cityAlive & (self.cityTeam == t)).sum(axis=1) for t in teams], axis=1)
+        unitCapReached = (units >= cities)[b, np.maximum(team, 0)]
+        valid &= ~isSpawn | (
+            onMap &
+            (self.cityTileTeam[b, cellY, cellX] != NO_TEAM) &
+            (self.cityTileCooldown[b, cellY, cellX] < 1) &
+            ~unitCapReached
+        )
+        return valid
+
+    def _routeUnitActions(self, turnActions):
+        '''
+        Gives the units their actions, before any unit spawns. Move actions are pruned of collisions, same outcome
+        as Game.handleMovementActions().
+        Returns: Indices of the actions of the units that were given exactly one action.
+        '''
+        b, code, slot = turnActions.batch, turnActions.code, turnActions.slot
+        isMove = code == ACTION_CODES.MOVE
+        given = (slot >= 0) & ~isMove
+
+        moves = np.nonzero((slot >= 0) & isMove)[0]
+        if len(moves) > 0:
+            mb, x, y = b[moves], turnActions.x[moves], turnActions.y[moves]
+            dx, dy = turnActions.dx[moves], turnActions.dy[moves]
+            onMap = (x + dx >= 0) & (y + dy >= 0) & (x + dx < self.mapWidth[mb]) & (y + dy < self.mapHeight[mb])
+            moves, mb, x, y, dx, dy = moves[onMap], mb[onMap], x[onMap], y[onMap], dx[onMap], dy[onMap]
+            origins = self._cellIndices(mb, x, y)
+            destinations = self._cellIndices(mb, x + dx, y + dy)
+            kept = resolveMoveArrays(
+                origins,
+                destinations,
+                self.cityTileTeam.ravel()[destinations] != NO_TEAM,
+                (self.unitCount.ravel()[destinations] == 1) & ~contains(origins, destinations)
+            )
+            # if direction is center, ignore it
+            given[moves[kept & ((dx != 0) | (dy != 0))]] = True
+
+        given = np.nonzero(given)[0]
+        return given[occurrences(b[given] * self.unitCapacity + slot[given]) == 1]
+
+    def _runCityTiles(self, turnActions):
+        '''
+        Runs the city tiles that were given exactly one action, in city then tile order.
+        Implements CityTile.turn(), the cooldown decrement is done for all tiles in runTurn().
+        '''
+        params = self.params
+        code = turnActions.code
+        x, y = turnActions.x, turnActions.y
+        b = turnActions.batch
+        isTileAction = (
+            (code == ACTION_CODES.RESEARCH) | (code == ACTION_CODES.BUILD_WORKER) | (code == ACTION_CODES.BUILD_CART)
+        )
+        isTileAction &= turnActions.complete & (x >= 0) & (y >= 0) & (x < self.mapWidth[b]) & (y < self.mapHeight[b])
+        tileActions = np.nonzero(isTileAction)[0]
+        if len(tileActions) == 0:
+            return
+        b, x, y = b[tileActions], x[tileActions], y[tileActions]
+        acting = (occurrences(self._cellIndices(b, x, y)) == 1) & (self.cityTileTeam[b, y, x] != NO_TEAM)
+        tileActions, b, x, y = tileActions[acting], b[acting], x[acting], y[acting]
+        self.cityTileCooldown[b, y, x] = params.cityActionCooldown
+
+        code = code[tileActions]
+        research = code == ACTION_CODES.RESEARCH
+        if research.any():
+            rb = b[research]
+            team = self.cityTileTeam[rb, y[research], x[research]].astype(np.int64)
+            np.add.at(self.researchPoints, (rb, team), 1)
+            points = self.researchPoints[rb, team]
+            self.researched[rb, team, COAL] |= points >= params.researchRequirements[COAL]
+            self.researched[rb, team, URANIUM] |= points >= params.researchRequirements[URANIUM]
+
+        # units are spawned in city then tile order, which sets their ids
+        spawns = np.nonzero(~research)[0]
+        if len(spawns) > 0:
+            sb, sx, sy = b[spawns].tolist(), x[spawns].tolist(), y[spawns].tolist()
+            citySlots = self.cityTileCity[b[spawns], y[spawns], x[spawns]].tolist()
+            order = sorted(
+                range(len(spawns)),
+                key=lambda i: (sb[i], citySlots[i], self.cityCells[sb[i]][citySlots[i]].index((sx[i], sy[i])))
+            )
+            for i in order:
+                action = turnActions.actions[tileActions[spawns[i]]]
+                unitType = UNIT_TYPES.CART if action.code == ACTION_CODES.BUILD_CART else UNIT_TYPES.WORKER
+                self.spawnUnit(sb[i], unitType, action.team, sx[i], sy[i])
+
+    def _runUnits(self, turnActions, unitActions, night):
+        '''
+        Runs the units that were given exactly one action, and all carts, with the same outcome as running them in
+        team then spawn order. Moves are applied to all games at once, as are the roads of the carts that share
+        their cell with no other cart, builder or pillager. The other actions run in order.
+        Implements Worker.turn() and Cart.turn()
+        '''
+        params = self.params
+        cooldownMultiplier = np.where(night, 2, 1)
+        unitActionCooldown = np.array(params.unitActionCooldown, dtype=np.int64)
+        b, slot, code = turnActions.batch[unitActions], turnActions.slot[unitActions], turnActions.code[unitActions]
+
+        # units that move enter their new cell in team then spawn order
+        moves = np.nonzero(code == ACTION_CODES.MOVE)[0]
+        if len(moves) > 0:
+            moves = moves[np.lexsort((slot[moves], self.unitTeam[b[moves], slot[moves]], b[moves]))]
+            mb, ms = b[moves], slot[moves]
+            x, y = self.unitX[mb, ms], self.unitY[mb, ms]
+            np.subtract.at(self.unitCount, (mb, y, x), 1)
+            x = x + turnActions.dx[unitActions[moves]]
+            y = y + turnActions.dy[unitActions[moves]]
+            np.add.at(self.unitCount, (mb, y, x), 1)
+            self.unitX[mb, ms] = x
+            self.unitY[mb, ms] = y
+            self.unitArrival[mb, ms] = self.arrivalCount[mb] + np.arange(len(mb)) - np.searchsorted(mb, mb)
+            self.arrivalCount += np.bincount(mb, minlength=self.batchSize)
+            types = self.unitType[mb, ms]
+            cooldown = unitActionCooldown[types] * cooldownMultiplier[mb]
+            self.unitCooldown[mb, ms] += cooldown
+            # Cart.turn() adds the cooldown of a move a second time
+            carts = types == UNIT_TYPES.CART
+            self.unitCooldown[mb[carts], ms[carts]] += cooldown[carts]
+
+        # transfers, city building and pillaging depend on the units that acted before, so they run in order
+        others = np.nonzero(code != ACTION_CODES.MOVE)[0]
+        otherB, otherSlot = b[others], slot[others]
+        cartB, cartSlot = np.nonzero(self.unitAlive & (self.unitType == UNIT_TYPES.CART))
+        if len(others) == 0 and len(cartB) == 0:
+            return
+        cartCells = self._cellIndices(cartB, self.unitX[cartB, cartSlot], self.unitY[cartB, cartSlot])
+        changesCell = (self.unitType[otherB, otherSlot] == UNIT_TYPES.WORKER) & (
+            (code[others] == ACTION_CODES.BUILD_CITY) | (code[others] == ACTION_CODES.PILLAGE)
+        )
+        changedB, changedSlot = otherB[changesCell], otherSlot[changesCell]
+        changedCells = self._cellIndices(changedB, self.unitX[changedB, changedSlot], self.unitY[changedB, changedSlot])
+        # carts that transfer are already in order, as are carts sharing a cell with a cart, builder or pillager
+        acted = contains(otherB * self.unitCapacity + otherSlot, cartB * self.unitCapacity + cartSlot)
+        inOrder = ((occurrences(cartCells) > 1) | contains(changedCells, cartCells)) & ~acted
+        sequentialB = np.concatenate((otherB, cartB[inOrder]))
+        sequentialSlot = np.concatenate((otherSlot, cartSlot[inOrder]))
+        sequentialAction = np.concatenate((unitActions[others], np.full(np.count_nonzero(inOrder), -1)))
+        order = np.lexsort((sequentialSlot, self.unitTeam[sequentialB, sequentialSlot], sequentialB))
+        sequential = zip(sequentialB[order].tolist(), sequentialSlot[order].tolist(), sequentialAction[order].tolist())
+        for b, slot, i in sequential:
+            isCart = self.unitType[b, slot] == UNIT_TYPES.CART
+            if i >= 0:
+                action = turnActions.actions[i]
+                code = action.code
+                if code == ACTION_CODES.TRANSFER:
+                    if not self.transferResources(b, action.team, action.srcID, action.destID, action.resourceType, action.amount):
+                        continue
+                elif isCart:
+                    pass # carts only move and transfer, their other actions only cost the cooldown
+                elif code == ACTION_CODES.BUILD_CITY:
+                    self.spawnCityTile(b, action.team, int(self.unitX[b, slot]), int(self.unitY[b, slot]))
+                    self._expendResourcesForCity(b, slot)
+                elif code == ACTION_CODES.PILLAGE:
+                    x, y = self.unitX[b, slot], self.unitY[b, slot]
+                    self.road[b, y, x] = max(self.road[b, y, x] - params.pillageRate, params.minRoad)
+                self.unitCooldown[b, slot] += unitActionCooldown[self.unitType[b, slot]] * cooldownMultiplier[b]
+            if isCart:
+                # auto create roads by increasing the cooldown value of the the cell unit is on currently
+                x, y = self.unitX[b, slot], self.unitY[b, slot]
+                if self.cityTileTeam[b, y, x] == NO_TEAM and self.road[b, y, x] < params.maxRoad:
+                    self.road[b, y, x] = min(self.road[b, y, x] + params.cartRoadDevelopmentRate, params.maxRoad)
+                    self.roadsBuilt[b, self.unitTeam[b, slot]] += params.cartRoadDevelopmentRate
+
+        # the other carts are alone on their cell
+        alone = ~inOrder & ~acted
+        self._buildRoads(cartB[alone], cartSlot[alone])
+
+    def _buildRoads(self, b, slots):
+        '''
+        Carts auto create roads by increasing the cooldown value of the cell they are on, as in the loop of
+        _runUnits(), for carts on distinct cells.
+        '''
+        params = self.params
+        x, y = self.unitX[b, slots], self.unitY[b, slots]
+        building = (self.cityTileTeam[b, y, x] == NO_TEAM) & (self.road[b, y, x] < params.maxRoad)
+        b, slots, x, y = b[building], slots[building], x[building], y[building]
+        self.road[b, y, x] = np.minimum(self.road[b, y, x] + params.cartRoadDevelopmentRate, params.maxRoad)
+        np.add.at(self.roadsBuilt, (b, self.unitTeam[b, slots]), params.cartRoadDevelopmentRate)
+
+    def _expendResourcesForCity(self, b, slot):
+        '''
+        Implements Worker.expendResourcesForCity()
+        '''
+        cost = self.params.cityBuildCost
+        cargo = self.unitCargo[b, slot]
+        spentResources = 0
+        for i in range(3):
+            if spentResources + cargo[i] > cost:
+                cargo[i] -= cost - spentResources
+                break
+            else:
+                spentResources += cargo[i]
+                cargo[i] = 0
+
+    def spawnUnit(self, b, type, team, x, y):
+        '''
+        Spawns a new worker or cart.
+        Implements src/Game/index.ts -> Game.spawnWorker() and Game.spawnCart()
+        '''
+        self.globalUnitIDCount[b] += 1
+        slot = self._newUnitSlot(b, type, team, x, y, "u_%i" % self.globalUnitIDCount[b])
+        self.unitArrival[b, slot] = self.arrivalCount[b]
+        self.arrivalCount[b] += 1
+        if type == UNIT_TYPES.WORKER:
+            self.workersBuilt[b, team] += 1
+        else:
+            self.cartsBuilt[b, team] += 1
+        return slot
+
+    def moveUnit(self, b, slot, direction):
+        '''
+        Implements src/Game/index.ts -> Game.moveUnit()
+        '''
+        dx, dy = DIRECTION_NAME_DELTAS[direction]
+        x, y = self.unitX[b, slot], self.unitY[b, slot]
+        self.unitCount[b, y, x] -= 1
+        self.unitX[b, slot] = x + dx
+        self.unitY[b, slot] = y + dy
+        self.unitCount[b, y + dy, x + dx] += 1
+        self.unitArrival[b, slot] = self.arrivalCount[b]
+        self.arrivalCount[b] += 1
+
+    def transferResources(self, b, team, srcID, destID, resourceType, amount):
+        '''
+        Implements src/Game/index.ts -> transferResources()
+        Returns False where the object engine raises, in which case nothing is transferred.
+        '''
+        try:
+            src = self.getUnitSlot(b, team, srcID)
+            dest = self.getUnitSlot(b, team, destID)
+            i = RESOURCE_INDEX[resourceType]
+            transferAmount = min(amount, int(self.unitCargo[b, src, i]), self.getCargoSpaceLeft(b, dest))
+        except (KeyError, TypeError):
+            return False
+        self.unitCargo[b, src, i] -= transferAmount
+        self.unitCargo[b, dest, i] += transferAmount
+        return True
+
+    def spawnCityTile(self, b, team, x, y):
+        '''
+        Spawns new city tile, merging adjacent cities of the same team.
+        Implements src/Game/index.ts -> Game.spawnCityTile()
+        '''
+        adjSameTeamCityTiles = []
+        citySlotsFound = []
+        for dx, dy in ADJACENT_DELTAS:
+            nx, ny = x + dx, y + dy
+            if nx < 0 or ny < 0 or nx >= self.mapWidth[b] or ny >= self.mapHeight[b]:
+                continue
+            if self.cityTileTeam[b, ny, nx] == team:
+                adjSameTeamCityTiles.append((nx, ny))
+                citySlot = int(self.cityTileCity[b, ny, nx])
+                if citySlot not in citySlotsFound:
+                    citySlotsFound.append(citySlot)
+
+        self.cityTileTeam[b, y, x] = team
+        self.cityTileCooldown[b, y, x] = 0
+
+        # if no adjacent city cells of same team, generate new city
+        if len(adjSameTeamCityTiles) == 0:
+            self.globalCityIDCount[b] += 1
+            citySlot = self._newCitySlot(b, team, "c_%i" % self.globalCityIDCount[b])
+            self.cityTileCity[b, y, x] = citySlot
+            self.cityTileAdjacent[b, y, x] = 0
+            self.cityCells[b][citySlot].append((x, y))
+            self._dirtyCities[b].add(citySlot)
+            return citySlot
+
+        # otherwise add tile to city
+        citySlot = citySlotsFound[0]
+        self.cityTileCity[b, y, x] = citySlot
+
+        # update adjacency counts for bonuses
+        self.cityTileAdjacent[b, y, x] = len(adjSameTeamCityTiles)
+        for nx, ny in adjSameTeamCityTiles:
+            self.cityTileAdjacent[b, ny, nx] += 1
+        self.cityCells[b][citySlot].append((x, y))
+        self._dirtyCities[b].add(citySlot)
+
+        # move the cells of merged cities to the surviving city
+        for oldSlot in citySlotsFound[1:]:
+            for cx, cy in self.cityCells[b][oldSlot]:
+                self.cityTileCity[b, cy, cx] = citySlot
+                self.cityCells[b][citySlot].append((cx, cy))
+            self.cityFuel[b, citySlot] += self.cityFuel[b, oldSlot]
+            self._removeCity(b, oldSlot)
+        return citySlot
+
+    def _removeCity(self, b, citySlot):
+        self.cityAlive[b, citySlot] = False
+        self.cityFuel[b, citySlot] = 0
+        self.cityIdToSlot[b].pop(self.cityIds[b][citySlot])
+        self.cityCells[b].pop(citySlot)
+        self._dirtyCities[b].add(citySlot)
+
+    def destroyCity(self, b, citySlot):
+        '''
+        Implements src/Game/index.ts -> Game.destroyCity()
+        '''
+        for x, y in self.cityCells[b][citySlot]:
+            self.cityTileTeam[b, y, x] = NO_TEAM
+            self.cityTileCity[b, y, x] = -1
+            self.cityTileCooldown[b, y, x] = 0
+            self.cityTileAdjacent[b, y, x] = 0
+            self.road[b, y, x] = self.params.minRoad
+        self._removeCity(b, citySlot)
+
+    def destroyUnits(self, b, slots):
+        '''
+        Implements src/Game/index.ts -> Game.destroyUnit()
+        '''
+        self.unitAlive[b, slots] = False
+        np.subtract.at(self.unitCount[b], (self.unitY[b, slots], self.unitX[b, slots]), 1)
+        for slot in np.atleast_1d(slots).tolist():
+            self.unitIdToSlot[b].pop(self.unitIds[b][slot])
+
+    def distributeAllResources(self):
+        '''
+        Distributes resources to workers and city tiles next to resource cells, for all games at once.
+        Implements src/Game/index.ts -> Game.distributeAllResources() and Game.handleResourceRelease()
+
+        Resource cells release in the order uranium, coal, wood, and within a type in GameMap.resources order.
+        A cell's release only depends on earlier cells through the workers they share (city tiles never fill
+        up), so cells are grouped into waves of cells that share no worker with an unfinished earlier cell.
+        Each wave is then distributed with array operations, in the same float operation order as
+        handleResourceRelease() so the results match exactly.
+        '''
+        receivers = self._miningReceivers()
+        if receivers is None:
+            return
+        candidate, position, arrival, unitSlot, citySlot, team = receivers
+
+        # Resource cells with at least one receiver, in release order
+        candidates, candidate = np.unique(candidate, return_inverse=True)
+        bs, rest = np.divmod(candidates, self.height * self.width)
+        ys, xs = np.divmod(rest, self.width)
+        rtypes = self.resourceType[bs, ys, xs].astype(np.int64)
+        miningRank = np.argsort(MINING_ORDER)[rtypes]
+        releaseOrder = np.lexsort((self.resourceOrder[bs, ys, xs], miningRank, bs))
+        rank = np.empty_like(releaseOrder)
+        rank[releaseOrder] = np.arange(len(releaseOrder))
+        candidate = rank[candidate]
+        bs, ys, xs, rtypes = bs[releaseOrder], ys[releaseOrder], xs[releaseOrder], rtypes[releaseOrder]
+        pairBatch = bs[candidate]
+
+        # A cell's wave is one more than the latest wave of an earlier cell sharing a worker with it
+        wave = np.zeros(len(bs), dtype=np.int64)
+        pairIsUnit = unitSlot >= 0
+        if pairIsUnit.any():
+            entity = pairBatch[pairIsUnit] * self.unitCapacity + unitSlot[pairIsUnit]
+            chain = np.lexsort((candidate[pairIsUnit], entity))
+            entity, linked = entity[chain], candidate[pairIsUnit][chain]
+            shared = entity[1:] == entity[:-1]
+            before, after = linked[:-1][shared], linked[1:][shared]
+            while len(before):
+                updated = wave.copy()
+                np.maximum.at(updated, after, wave[before] + 1)
+                if (updated == wave).all():
+                    break
+                wave = updated
+
+        pairRtype = rtypes[candidate]
+        pairRate = np.array(self.collectionRates, dtype=np.int64)[pairRtype]
+        received = np.zeros(len(candidate), dtype=np.int64)
+
+        for level in range(wave.max() + 1):
+            pairs = np.nonzero(wave[candidate] == level)[0]
+
+            # cargo space left of each receiver, a city tile is never full
+            space = np.full(len(pairs), CITYTILE_CARGO_SPACE, dtype=np.int64)
+            toUnit = pairIsUnit[pairs]
+            b, slot = pairBatch[pairs[toUnit]], unitSlot[pairs[toUnit]]
+            space[toUnit] = self.cargoCapacities[self.unitType[b, slot]] - self.unitCargo[b, slot].sum(axis=1)
+
+            # receivers with the most cargo space left get their share first, ties in neighbour order
+            order = np.lexsort((arrival[pairs], position[pairs], -space, candidate[pairs]))
+            pairs, space = pairs[order], space[order]
+            waveCandidates, first, counts = np.unique(candidate[pairs], return_index=True, return_counts=True)
+            local = np.repeat(np.arange(len(waveCandidates)), counts)
+            receiverIndex = np.arange(len(pairs)) - first[local]
+
+            # find out how many resources to distribute and release, only as much as the cell contains
+            cb, cy, cx = bs[waveCandidates], ys[waveCandidates], xs[waveCandidates]
+            amount = self.resourceAmount[cb, cy, cx]
+            amountToDistribute = np.minimum(pairRate[pairs[first]] * counts, amount)
+            amountDistributed = np.zeros(len(waveCandidates))
+            for i in range(counts.max()):
+                receiving = receiverIndex == i
+                c = local[receiving]
+                distributeAmount = np.minimum(
+                    np.minimum(space[receiving], amountToDistribute[c] / (counts[c] - i)),
+                    pairRate[pairs[receiving]]
+                )
+                # we give workers a floored amount for sake of integers and effectively waste the remainder
+                received[pairs[receiving]] = np.floor(distributeAmount)
+                amountDistributed[c] += distributeAmount
+                amountToDistribute[c] -= distributeAmount
+            self.resourceAmount[cb, cy, cx] = amount - amountDistributed
+
+            # no worker receives twice in one wave
+            unitPairs = pairs[toUnit[order]]
+            self.unitCargo[pairBatch[unitPairs], unitSlot[unitPairs], pairRtype[unitPairs]] += received[unitPairs]
+
+        cityPairs = ~pairIsUnit
+        np.add.at(self.cityFuel, (pairBatch[cityPairs], citySlot[cityPairs]), self.fuelRates[pairRtype[cityPairs]] * received[cityPairs])
+        np.add.at(self.resourcesCollected, (pairBatch, team, pairRtype), received)
+
+    def _miningReceivers(self):
+        '''
+        Finds every (resource cell, receiver) pair of this turn's mining, or None if there are none.
+        Returns arrays of the resource cell's flat index into the (batch, y, x) grid, the receiver's position in
+        the [cell, north, east, south, west] neighbour list, its arrival order on its cell, its unit slot (-1 for a
+        city tile), its city slot (-1 for a unit) and its team.
+        '''
+        hasResource = (self.resourceType >= 0) & (self.resourceAmount > 0)
+        if not hasResource.any():
+            return None
+
+        # A city tile with units on it receives the resource if its team can mine it, otherwise any worker on
+        # the cell that can mine it does
+        tb, ty, tx = np.nonzero((self.cityTileTeam != NO_TEAM) & (self.unitCount > 0))
+        ub, slots = np.nonzero(self.unitAlive & (self.unitType == UNIT_TYPES.WORKER))
+        ux, uy = self.unitX[ub, slots], self.unitY[ub, slots]
+        tiles = len(tb)
+        b = np.concatenate((tb, ub))
+        x = np.concatenate((tx, ux))
+        y = np.concatenate((ty, uy))
+        team = np.concatenate((self.cityTileTeam[tb, ty, tx], self.unitTeam[ub, slots])).astype(np.int64)
+        cellTeam = self.cityTileTeam[b, y, x].astype(np.int64)
+        cellTeam[:tiles] = NO_TEAM
+        arrival = np.concatenate((np.zeros(tiles, dtype=np.int64), self.unitArrival[ub, slots]))
+        unitSlot = np.concatenate((np.full(tiles, -1, dtype=np.int64), slots))
+        citySlot = np.concatenate((self.cityTileCity[tb, ty, tx], np.full(len(ub), -1, dtype=np.int64)))
+
+        # the resource cell is at the receiver's position minus the neighbour offset
+        deltas = np.array([(0, 0)] + ADJACENT_DELTAS, dtype=np.int64)
+        cx = x[:, None] - deltas[:, 0]
+        cy = y[:, None] - deltas[:, 1]
+        receiver, position = np.nonzero((cx >= 0) & (cy >= 0) & (cx < self.width) & (cy < self.height))
+        cx, cy, b = cx[receiver, position], cy[receiver, position], b[receiver]
+        keep = hasResource[b, cy, cx]
+        receiver, position, cx, cy, b = receiver[keep], position[keep], cx[keep], cy[keep], b[keep]
+        rtype = self.resourceType[b, cy, cx].astype(np.int64)
+        keep = self.researched[b, team[receiver], rtype]
+        # workers on a city tile that can mine the resource itself do not receive it
+        onTile = cellTeam[receiver]
+        keep &= ~((onTile != NO_TEAM) & self.researched[b, np.maximum(onTile, 0), rtype])
+        if not keep.any():
+            return None
+        receiver, position, cx, cy, b = receiver[keep], position[keep], cx[keep], cy[keep], b[keep]
+        return (
+            (b * self.height + cy) * self.width + cx,
+            position,
+            arrival[receiver],
+            unitSlot[receiver],
+            citySlot[receiver],
+            team[receiver],
+        )
+
+    def handleResourceDeposit(self):
+        '''
+        Auto deposit resources of units to the friendly city tile they are on.
+        Implements src/Game/index.ts -> Game.handleResourceDeposit()
+        '''
+        bs, slots = np.nonzero(self.unitAlive)
+        xs = self.unitX[bs, slots]
+        ys = self.unitY[bs, slots]
+        onCity = self.cityTileTeam[bs, ys, xs] == self.unitTeam[bs, slots]
+        if not onCity.any():
+            return
+        bs, slots, xs, ys = bs[onCity], slots[onCity], xs[onCity], ys[onCity]
+        fuelGained = self.unitCargo[bs, slots] @ self.fuelRates
+        np.add.at(self.cityFuel, (bs, self.cityTileCity[bs, ys, xs]), fuelGained)
+        np.add.at(self.fuelGenerated, (bs, self.unitTeam[bs, slots]), fuelGained)
+        self.unitCargo[bs, slots] = 0
+
+    def handleNight(self, night):
+        '''
+        Handle nightfall for the games where it is night.
+        Implements /src/logic.ts -> handleNight()
+        '''
+        params = self.params
+
+        # if city does not have enough fuel, destroy it. Destroying a city does not change the upkeep of others
+        upkeep = self.getCityLightUpkeeps()
+        cities = self.cityAlive & night[:, None]
+        starving = cities & (self.cityFuel < upkeep)
+        for b, citySlot in zip(*np.nonzero(starving)):
+            self.destroyCity(int(b), int(citySlot))
+        fed = cities & ~starving
+        self.cityFuel[fed] -= upkeep[fed]
+
+        # units off city tiles burn their cargo to survive, wood first.
+        # Implements Unit.spendFuelToSurvive()
+        bs, slots = np.nonzero(self.unitAlive & night[:, None])
+        xs = self.unitX[bs, slots]
+        ys = self.unitY[bs, slots]
+        exposed = self.cityTileTeam[bs, ys, xs] == NO_TEAM
+        bs, slots = bs[exposed], slots[exposed]
+        if len(bs) == 0:
+            return
+        upkeep = np.where(
+            self.unitType[bs, slots] == UNIT_TYPES.WORKER,
+            params.unitUpkeep[UNIT_TYPES.WORKER],
+            params.unitUpkeep[UNIT_TYPES.CART]
+        ).astype(np.int64)
+        cargo = self.unitCargo[bs, slots]
+        for i in range(3):
+            needed = np.ceil(np.maximum(upkeep, 0) / self.fuelRates[i]).astype(np.int64)
+            used = np.minimum(cargo[:, i], needed)
+            used[upkeep <= 0] = 0
+            upkeep -= used * self.fuelRates[i]
+            cargo[:, i] -= used
+        self.unitCargo[bs, slots] = cargo
+
+        starved = upkeep > 0
+        for b in np.unique(bs[starved]).tolist():
+            self.destroyUnits(b, slots[starved & (bs == b)])
+
+    def regenerateTrees(self):
+        '''
+        Implements src/Game/index.ts -> Game.regenerateTrees()
+        '''
+        params = self.params
+        growing = (
+            (self.resourceType == WOOD) &
+            (self.resourceAmount > 0) &
+            (self.resourceAmount < params.maxWoodAmount)
+        )
+        self.resourceAmount[growing] = np.ceil(
+            np.minimum(
+                self.resourceAmount[growing] * params.woodGrowthRate,
+                params.maxWoodAmount
+            )
+        )
+
+    def matchOver(self):
+        '''
+        Implements /src/logic.ts -> matchOver()
+        '''
+        matchOver = self.turn >= self.params.maxDays - 1
+        for team in [Constants.TEAM.A, Constants.TEAM.B]:
+            units = (self.unitAlive & (self.unitTeam == team)).sum(axis=1)
+            cities = (self.cityAlive & (self.cityTeam == team)).sum(axis=1)
+            matchOver |= units + cities == 0
+        return matchOver
+
+    def runCooldowns(self):
+        '''
+        Implements /src/Game/index.ts -> runCooldowns()
+        '''
+        bs, slots = np.nonzero(self.unitAlive)
+        xs = self.unitX[bs, slots]
+        ys = self.unitY[bs, slots]
+        road = np.where(
+            self.cityTileTeam[bs, ys, xs] != NO_TEAM,
+            self.params.maxRoad,
+            self.road[bs, ys, xs]
+        )
+        self.unitCooldown[bs, slots] = np.maximum(self.unitCooldown[bs, slots] - road - 1, 0)
+
+    def _unitViewState(self, b):
+        return np.concatenate((
+            self.unitAlive[b, :, None],
+            self.unitX[b, :, None],
+            self.unitY[b, :, None],
+            self.unitCargo[b],
+            self.unitCooldown[b, :, None],
+        ), axis=1)
+
+    def _tileViewState(self, b):
+        return np.stack((self.cityTileTeam[b], self.cityTileCity[b], self.cityTileCooldown[b], self.cityTileAdjacent[b]))
+
+    def writeView(self, b, game):
+        '''
+        Writes the state of batch slot b back into the object graph of game, only touching the objects that
+        changed since the last write.
+        '''
+        gameMap = game.map
+        units = self._viewUnits[b]
+        teamStates = game.state["teamStates"]
+
+        # units, compared against the state written last time
+        unitState = self._unitViewState(b)
+        lastUnitState = self._viewUnitState[b]
+        if len(lastUnitState) < len(unitState):
+            lastUnitState = np.concatenate((lastUnitState, np.zeros((len(unitState) - len(lastUnitState), unitState.shape[1]))))
+        changed = np.nonzero((unitState != lastUnitState).any(axis=1))[0]
+        self._viewUnitState[b] = unitState
+
+        arrived = []
+        for slot, (alive, x, y, wood, coal, uranium, cooldown) in zip(changed.tolist(), unitState[changed].tolist()):
+            unit = units.get(slot)
+            if not alive:
+                # unit died, or was created and died within one turn
+                if unit is None:
+                    continue
+                units.pop(slot)
+                gameMap.getCellByPos(unit.pos).units.pop(unit.id)
+                teamStates[unit.team]["units"].pop(unit.id)
+                continue
+            x, y = int(x), int(y)
+            if unit is None:
+                team = int(self.unitTeam[b, slot])
+                unitClass = Worker if self.unitType[b, slot] == UNIT_TYPES.WORKER else Cart
+                unit = unitClass(x, y, team, game.params, 0)
+                unit.id = self.unitIds[b][slot]
+                units[slot] = unit
+                teamStates[team]["units"][unit.id] = unit
+                arrived.append((self.unitArrival[b, slot], slot))
+            elif unit.pos.x != x or unit.pos.y != y:
+                gameMap.getCellByPos(unit.pos).units.pop(unit.id)
+                unit.pos = getPosition(x, y)
+                arrived.append((self.unitArrival[b, slot], slot))
+            unit.cargo = Cargo(int(wood), int(coal), int(uranium))
+            unit.cooldown = cooldown
+
+        # units that spawned or moved enter their cell in the order they arrived
+        arrived.sort()
+        for arrival, slot in arrived:
+            unit = units[slot]
+            gameMap.getCellByPos(unit.pos).units[unit.id] = unit
+
+        # cells
+        changed = np.nonzero(self.resourceAmount[b] != self._viewResourceAmount[b])
+        for y, x, amount in zip(changed[0].tolist(), changed[1].tolist(), self.resourceAmount[b][changed].tolist()):
+            cell = gameMap.getCell(x, y)
+            cell.resource.amount = amount
+            # resources that are depleted are removed from the map
+            if amount <= 0:
+                gameMap.removeResource(cell)
+        self._viewResourceAmount[b] = self.resourceAmount[b]
+
+        changed = np.nonzero(self.road[b] != self._viewRoad[b])
+        for y, x, road in zip(changed[0].tolist(), changed[1].tolist(), self.road[b][changed].tolist()):
+            cell = gameMap.getCell(x, y)
+            cell.road = road
+            gameMap.roadCells.add(cell)
+        self._viewRoad[b] = self.road[b]
+
+        # city tiles
+        tileState = self._tileViewState(b)
+        changed = np.nonzero((tileState != self._viewTileState[b]).any(axis=0))
+        self._viewTileState[b] = tileState
+        for y, x, (team, citySlot, cooldown, adjacent) in zip(changed[0].tolist(), changed[1].tolist(), tileState[:, changed[0], changed[1]].T.tolist()):
+            cell = gameMap.getCell(x, y)
+            if team == NO_TEAM:
+                cell.citytile = None
+                continue
+            if cell.citytile is None or cell.citytile.team != team:
+                cell.setCityTile(int(team), None)
+            cell.citytile.cityid = self.cityIds[b][int(citySlot)]
+            cell.citytile.cooldown = cooldown
+            cell.citytile.adjacentCityTiles = int(adjacent)
+
+        # cities, new cities are created in slot order so game.cities keeps the object engine's order
+        cities = self._viewCities[b]
+        for citySlot in sorted(self._dirtyCities[b]):
+            if not self.cityAlive[b, citySlot]:
+                city = cities.pop(citySlot, None)
+                if city is not None:
+                    game.cities.pop(city.id)
+                continue
+            city = cities.get(citySlot)
+            if city is None:
+                city = City(int(self.cityTeam[b, citySlot]), game.params, 0)
+                city.id = self.cityIds[b][citySlot]
+                cities[citySlot] = city
+                game.cities[city.id] = city
+            city.citycells = [gameMap.getCell(x, y) for x, y in self.cityCells[b][citySlot]]
+            city.adjacencyBonus = sum(
+                int(self.cityTileAdjacent[b, y, x]) for x, y in self.cityCells[b][citySlot]
+            ) * self.params.cityAdjacencyBonus
+        self._dirtyCities[b] = set()
+        fuel = self.cityFuel[b].tolist()
+        for citySlot, city in cities.items():
+            city.fuel = fuel[citySlot]
+
+        # game state and stats
+        game.counters = self.getTeamCounters(b)
+        game.state["turn"] = int(self.turn[b])
+        game.globalCityIDCount = int(self.globalCityIDCount[b])
+        game.globalUnitIDCount = int(self.globalUnitIDCount[b])
+        researchPoints = self.researchPoints[b].tolist()
+        researched = self.researched[b].tolist()
+        fuelGenerated = self.fuelGenerated[b].tolist()
+        resourcesCollected = self.resourcesCollected[b].tolist()
+        roadsBuilt = self.roadsBuilt[b].tolist()
+        roadsPillaged = self.roadsPillaged[b].tolist()
+        built = np.stack((self.cityTilesBuilt[b], self.workersBuilt[b], self.cartsBuilt[b])).T.tolist()
+        for team in [Constants.TEAM.A, Constants.TEAM.B]:
+            teamState = teamStates[team]
+            teamState["researchPoints"] = researchPoints[team]
+            teamStats = game.stats["teamStats"][team]
+            teamStats["fuelGenerated"] = fuelGenerated[team]
+            for i, name in enumerate(RESOURCE_NAMES):
+                teamState["researched"][name] = researched[team][i]
+                teamStats["resourcesCollected"][name] = resourcesCollected[team][i]
+            teamStats["cityTilesBuilt"], teamStats["workersBuilt"], teamStats["cartsBuilt"] = built[team]
+            teamStats["roadsBuilt"] = roadsBuilt[team]
+            teamStats["roadsPillaged"] = roadsPillaged[team]
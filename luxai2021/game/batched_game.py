@@ -0,0 +1,85 @@
+'''
+Runs a batch of independent matches in lockstep on one ArrayState.
+'''
+import random
+
+import numpy as np
+
+from .array_state import ArrayState
+from .constants import Constants
+from .game import Game
+from .game_map import mapSizes
+
+
+class BatchedGame:
+    def __init__(self, configs = None, numGames = 1, autoReset = True):
+        '''
+        Each step runs every phase of the turn on the whole batch at once, so a step has a fixed cost of about a
+        millisecond and only grows slowly with numGames. A single match runs faster on the object engine, the batch
+        is faster than stepping as many separate games from about 16 games on.
+        Args:
+            configs: Match configs, as for Game. A seed makes the sequence of generated maps reproducible.
+            numGames: Number of matches stepped together.
+            autoReset: Start a new match in a game's slot as soon as its match is over.
+        '''
+        if configs is None:
+            configs = {}
+        configs = dict(configs)
+        configs["engine"] = Constants.ENGINE_TYPES.OBJECT
+
+        # Object engine games generate the maps, and are kept as a view of their slot for getGame()
+        self.games = [Game(configs) for b in range(numGames)]
+        self.configs = self.games[0].configs
+        self.seed = configs.get("seed")
+        self.rng = random.Random(self.seed)
+
+        self.numGames = numGames
+        self.autoReset = autoReset
+        size = max(mapSizes)
+        self.state = ArrayState(self.configs, numGames, size, size)
+        self.winners = np.full(numGames, -1, dtype=np.int64) # Winning team of the last match of each game
+        for b in range(numGames):
+            self.reset(b)
+
+    def reset(self, b = None):
+        '''
+        Starts a new match in game b, or in every game if b is None.
+        '''
+        if b is None:
+            for b in range(self.numGames):
+                self.reset(b)
+            return
+
+        # draw the map seed from the batch's own random stream, leaving the game's configs untouched
+        game = self.games[b]
+        seed = game.configs["seed"]
+        if self.seed is not None:
+            game.configs["seed"] = self.rng.getrandbits(32)
+        game.reset()
+        game.configs["seed"] = seed
+        self.state.loadGame(b, game)
+
+    def step(self, actions):
+        '''
+        Runs a single turn of every game.
+        Args:
+            actions: List with one list of actions per game. Invalid actions are dropped, as in
+                MatchController.takeAction()
+        Returns:
+            Bool array, True for the games whose match ended this turn. With autoReset these games already
+            hold a new match, and the result of the ended one is in self.winners.
+        '''
+        matchOver = self.state.runTurn(actions, validate=True)
+        for b in np.nonzero(matchOver)[0].tolist():
+            self.winners[b] = self.state.getWinningTeam(b)
+            if self.autoReset:
+                self.reset(b)
+        return matchOver
+
+    def getGame(self, b):
+        '''
+        Returns game b as an object engine Game, updated to the current state of its slot.
+        '''
+        game = self.games[b]
+        self.state.writeView(b, game)
+        return game
@@ -1,6 +1,6 @@
 '''Implements /src/GameMap/cell.ts'''
 
-from .position import Position
+from .position import getPosition
 from .resource import Resource
 from .city import CityTile
 
@@ -14,13 +14,15 @@ from .city import CityTile
  */
  '''
 class Cell:
-    def __init__(self, x, y, configs):
-        self.pos = Position(x, y)
+    __slots__ = ("pos", "resource", "citytile", "params", "units", "road")
+
+    def __init__(self, x, y, params):
+        self.pos = getPosition(x, y)
         self.resource: Resource = None
         self.citytile = None
-        self.configs = configs
+        self.params = params
         self.units = {}
-        self.road = configs["parameters"]["MIN_ROAD"]
+        self.road = params.minRoad
 
     def setResource(self, resourceType, amount):
         self.resource = Resource(resourceType, amount)
@@ -29,7 +31,7 @@ class Cell:
         return self.resource is not None and self.resource.amount > 0
     
     def setCityTile(self, team, cityid):
-        self.citytile = CityTile(team, self.configs)
+        self.citytile = CityTile(team, self.params)
         self.citytile.pos = self.pos
         self.citytile.cityid = cityid
     
@@ -41,7 +43,7 @@ class Cell:
     
     def getRoad(self):
         if self.isCityTile():
-            return self.configs["parameters"]["MAX_ROAD"]
+            return self.params.maxRoad
         else:
             return self.road
     
@@ -4,44 +4,145 @@ from .actionable import Actionable
 from .position import Position
 from .resource import Resource
 from .actions import *
+from .codes import ACTION_CODES, COAL, URANIUM
 import math
 
+class CitySet:
+    '''
+    Disjoint-set node grouping the city tiles of merged cities. Sets are linked by size and paths are
+    compressed, so resolving the city of a tile is amortized constant time.
+    '''
+    __slots__ = ("parent", "size", "city")
+
+    def __init__(self, city):
+        self.parent = self
+        self.size = 1
+        self.city = city # the city of the set, only kept up to date on the root
+
+    def find(self):
+        root = self
+        while root.parent is not root:
+            root = root.parent
+        node = self
+        while node.parent is not root:
+            node.parent, node = root, node.parent
+        return root
+
+    def union(self, other, city):
+        ''' Links the two sets, city becomes the city of the merged set. Returns the new root '''
+        root, otherRoot = self.find(), other.find()
+        if root.size < otherRoot.size:
+            root, otherRoot = otherRoot, root
+        otherRoot.parent = root
+        root.size += otherRoot.size
+        root.city = city
+        return root
+
+
 '''
 //**
  * A city is composed of adjacent city tiles of the same team
  */
  '''
 class City:
-    def __init__(self, team, configs, idcount):
+    __slots__ = ("team", "params", "id", "fuel", "citySet", "tileCount", "adjacencyBonus", "_cellParts", "_citycells")
+
+    def __init__(self, team, params, idcount):
         self.team = team
-        self.configs = configs
+        self.params = params
         self.id = "c_%i" % idcount
         self.fuel = 0
-        self.citycells = []
+        self.citySet = CitySet(self)
+        self.tileCount = 0
+        self.adjacencyBonus = 0 # running sum of the adjacency bonuses of the city tiles
+
+        # city cells in order, as cells and merged cities. Flattened into citycells when it is read
+        self._cellParts = []
+        self._citycells = []
+
+    @property
+    def citycells(self):
+        if self._citycells is None:
+            citycells = []
+            stack = [iter(self._cellParts)]
+            while stack:
+                for part in stack[-1]:
+                    if not isinstance(part, City):
+                        citycells.append(part)
+                    elif part._citycells is not None:
+                        citycells += part._citycells
+                    else:
+                        stack.append(iter(part._cellParts))
+                        break
+                else:
+                    stack.pop()
+            self._cellParts = list(citycells)
+            self._citycells = citycells
+        return self._citycells
+
+    @citycells.setter
+    def citycells(self, citycells):
+        self._cellParts = list(citycells)
+        self._citycells = citycells
+        self.tileCount = len(citycells)
     
     def getLightUpkeep(self):
-        return len(self.citycells) * self.configs["parameters"]["LIGHT_UPKEEP"]["CITY"] - self.getAdjacencyBonuses()
+        return self.tileCount * self.params.cityUpkeep - self.adjacencyBonus
     
     def getAdjacencyBonuses(self):
-        bonus = 0
-        for cell in self.citycells:
-            bonus += cell.citytile.adjacentCityTiles * self.configs["parameters"]["CITY_ADJACENCY_BONUS"]
-        return bonus
+        return self.adjacencyBonus
     
     def addCityTile(self, cell):
-        self.citycells.append(cell)
+        if self._citycells is not None:
+            self._citycells.append(cell)
+        self._cellParts.append(cell)
+        self.tileCount += 1
+        self.adjacencyBonus += cell.citytile.adjacentCityTiles * self.params.cityAdjacencyBonus
+        cell.citytile.citySet = self.citySet
+
+    def addAdjacentCityTile(self, citytile):
+        """
+        Counts a new city tile next to citytile, which is part of this city
+        """
+        citytile.adjacentCityTiles += 1
+        self.adjacencyBonus += self.params.cityAdjacencyBonus
+
+    def mergeCity(self, city):
+        """
+        Takes over the tiles and fuel of another city of the same team, its tiles resolve to this city from now on
+        """
+        self._cellParts.append(city)
+        self._citycells = None
+        self.tileCount += city.tileCount
+        self.adjacencyBonus += city.adjacencyBonus
+        self.fuel += city.fuel
+        self.citySet = self.citySet.union(city.citySet, self)
 
 
 class CityTile(Actionable):
-    def __init__(self, team, configs) -> None:
+    __slots__ = ("team", "pos", "citySet", "_cityid", "adjacentCityTiles")
+
+    def __init__(self, team, params) -> None:
         self.team = team
         self.pos = None
-        self.cityid = None
+        self.citySet = None # set of the city this tile is part of, see City.addCityTile()
+        self._cityid = None
         self.adjacentCityTiles = 0
-        super().__init__(configs)
+        super().__init__(params)
+
+    @property
+    def cityid(self):
+        if self.citySet is None:
+            return self._cityid
+        return self.citySet.find().city.id
+
+    @cityid.setter
+    def cityid(self, cityid):
+        self._cityid = cityid
+        self.citySet = None
     
     def getTileID(self):
-        return f"{{self.cityid}}_{{self.pos.x}}_{{self.pos.y}}"
+        return f"{self.cityid}_{self.pos.x}_{self.pos.y}"
     
     def canBuildUnit(self):
         return self.canAct()
@@ -55,25 +156,26 @@ class CityTile(Actionable):
     def turn(self, game):
         if (len(self.currentActions) == 1):
             action = self.currentActions[0]
-            if isinstance(action, SpawnCartAction):
+            code = action.code
+            if code == ACTION_CODES.BUILD_CART:
                 game.spawnCart(action.team, action.x, action.y)
                 self.resetCooldown()
-            elif isinstance(action, SpawnWorkerAction):
+            elif code == ACTION_CODES.BUILD_WORKER:
                 game.spawnWorker(action.team, action.x, action.y);
                 self.resetCooldown()
-            elif isinstance(action, ResearchAction):
+            elif code == ACTION_CODES.RESEARCH:
                 self.resetCooldown()
-                game.state.teamStates[self.team]["researchPoints"] += 1
-                if ( game.state["teamStates"][self.team]["researchPoints"] >= self.configs["parameters"]["RESEARCH_REQUIREMENTS"]["COAL"] ):
-                    game.state.teamStates[self.team]["researched"]["coal"] = True
-                if ( game.state.teamStates[self.team]["researchPoints"] >= self.configs["parameters"]["RESEARCH_REQUIREMENTS"]["URANIUM"] ):
-                    game.state.teamStates[self.team]["researched"]["uranium"] = True
+                game.state["teamStates"][self.team]["researchPoints"] += 1
+                if ( game.state["teamStates"][self.team]["researchPoints"] >= self.params.researchRequirements[COAL] ):
+                    game.state["teamStates"][self.team]["researched"]["coal"] = True
+                if ( game.state["teamStates"][self.team]["researchPoints"] >= self.params.researchRequirements[URANIUM] ):
+                    game.state["teamStates"][self.team]["researched"]["uranium"] = True
             
         if (self.cooldown > 0):
             self.cooldown -= 1
 
     def resetCooldown(self):
-        self.cooldown = self.configs["parameters"]["CITY_ACTION_COOLDOWN"]
+        self.cooldown = self.params.cityActionCooldown
 
     
     
@@ -0,0 +1,62 @@
+'''
+Integer codes of resource types, directions and actions used inside the engine, with their lookup tables.
+The string constants of Constants stay the public names; these codes only index tables.
+'''
+from .constants import Constants
+
+DIRECTIONS = Constants.DIRECTIONS
+ACTIONS = Constants.ACTIONS
+
+# Resource types are stored by index into this list
+RESOURCE_NAMES = [
+    Constants.RESOURCE_TYPES.WOOD,
+    Constants.RESOURCE_TYPES.COAL,
+    Constants.RESOURCE_TYPES.URANIUM,
+]
+RESOURCE_KEYS = ["WOOD", "COAL", "URANIUM"] # keys of the resources in the game parameters
+RESOURCE_INDEX = {name: i for i, name in enumerate(RESOURCE_NAMES)}
+WOOD = 0
+COAL = 1
+URANIUM = 2
+
+# Resources are mined in order of decreasing fuel efficiency
+MINING_ORDER = [URANIUM, COAL, WOOD]
+
+# Directions are stored by index into this list
+DIRECTION_NAMES = [
+    DIRECTIONS.NORTH,
+    DIRECTIONS.EAST,
+    DIRECTIONS.SOUTH,
+    DIRECTIONS.WEST,
+    DIRECTIONS.CENTER,
+]
+DIRECTION_INDEX = {name: i for i, name in enumerate(DIRECTION_NAMES)}
+DIRECTION_DELTAS = [(0, -1), (1, 0), (0, 1), (-1, 0), (0, 0)] # (dx, dy) by direction index
+DIRECTION_NAME_DELTAS = dict(zip(DIRECTION_NAMES, DIRECTION_DELTAS)) # (dx, dy) by direction name
+
+class ACTION_CODES:
+    MOVE = 0
+    RESEARCH = 1
+    BUILD_WORKER = 2
+    BUILD_CART = 3
+    BUILD_CITY = 4
+    TRANSFER = 5
+    PILLAGE = 6
+
+ACTION_INDEX = {
+    ACTIONS.MOVE: ACTION_CODES.MOVE,
+    ACTIONS.RESEARCH: ACTION_CODES.RESEARCH,
+    ACTIONS.BUILD_WORKER: ACTION_CODES.BUILD_WORKER,
+    ACTIONS.BUILD_CART: ACTION_CODES.BUILD_CART,
+    ACTIONS.BUILD_CITY: ACTION_CODES.BUILD_CITY,
+    ACTIONS.TRANSFER: ACTION_CODES.TRANSFER,
+    ACTIONS.PILLAGE: ACTION_CODES.PILLAGE,
+}
+
+
+def resourceTable(parameters, name):
+    '''
+    Returns the list of the values of a per-resource game parameter, such as "RESOURCE_TO_FUEL_RATE", indexed by
+    resource code.
+    '''
+    return [parameters[name][key] for key in RESOURCE_KEYS]
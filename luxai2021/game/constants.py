@@ -32,44 +32,47 @@ class Constants:
         EMPTY = 'empty'
         RANDOM = 'random'
         DEBUG = 'debug'
+    class ENGINE_TYPES:
+        OBJECT = 'object' # Cell/Unit/CityTile object graph
+        ARRAY = 'array' # Struct-of-arrays state, the object graph is kept as a view
     # Mirrored Game constant enums. All the available agent actions with specifications as to what they do and restrictions.
     class ACTIONS:
         #
         # Formatted as `m unitid direction`. unitid should be valid and should have empty space in that direction. moves
         # unit with id unitid in the direction
         #
-        MOVE = 'm',
+        MOVE = 'm'
         #
         # Formatted as `r x y`. (x,y) should be an owned city tile, the city tile is commanded to research for
         # the next X turns
         #/
-        RESEARCH = 'r',
+        RESEARCH = 'r'
         # Formatted as `bw x y`. (x,y) should be an owned city tile, where worker is to be built #/
-        BUILD_WORKER = 'bw',
+        BUILD_WORKER = 'bw'
         # Formatted as `bc x y`. (x,y) should be an owned city tile, where the cart is to be built #/
-        BUILD_CART = 'bc',
+        BUILD_CART = 'bc'
         #
         # Formatted as `bcity unitid`. builds city at unitid's pos, unitid should be
         # friendly owned unit that is a worker
         #/
-        BUILD_CITY = 'bcity',
+        BUILD_CITY = 'bcity'
         #
         # Formatted as `t source_unitid destination_unitid resource_type amount`. Both units in transfer should be
         # adjacent. If command valid, it will transfer as much as possible with a max of the amount specified
         #/
-        TRANSFER = 't',
+        TRANSFER = 't'
 
         # formatted as `p unitid`. Unit with the given unitid must be owned and pillages the tile they are on #/
-        PILLAGE = 'p',
+        PILLAGE = 'p'
 
         # formatted as dc <x> <y> #/
-        DEBUG_ANNOTATE_CIRCLE = 'dc',
+        DEBUG_ANNOTATE_CIRCLE = 'dc'
         # formatted as dx <x> <y> #/
-        DEBUG_ANNOTATE_X = 'dx',
+        DEBUG_ANNOTATE_X = 'dx'
         # formatted as dl <x1> <y1> <x2> <y2> #/
-        DEBUG_ANNOTATE_LINE = 'dl',
+        DEBUG_ANNOTATE_LINE = 'dl'
         # formatted as dt <x> <y> <message> <fontsize> #/
-        DEBUG_ANNOTATE_TEXT = 'dt',
+        DEBUG_ANNOTATE_TEXT = 'dt'
         # formatted as dst <message> #/
         DEBUG_ANNOTATE_SIDETEXT = 'dst'
 
@@ -83,5 +86,7 @@ LuxMatchConfigs_Default ={
     "compressReplay": False,
     "debugAnnotations": False,
     "statefulReplay": False,
+    "engine": Constants.ENGINE_TYPES.OBJECT,
+    "mapBank": None, # path of a map bank from map_bank.generateMapBank(), to load seeded maps instead of generating them
     "parameters": GAME_CONSTANTS["PARAMETERS"],
 }
\ No newline at end of file
@@ -0,0 +1,207 @@
+'''
+Per-turn spatial index of the game: for each class of objects, the distance from every cell to the nearest object
+of the class and which object it is, so agents can look up "nearest X, direction, distance" from any cell in O(1).
+'''
+import numpy as np
+
+from .codes import RESOURCE_NAMES
+from .constants import Constants
+
+DIRECTIONS = Constants.DIRECTIONS
+
+# Classes of objects indexed. Resources are indexed for both teams, the others by team
+RESOURCE_CLASSES = list(RESOURCE_NAMES)
+TEAM_CLASSES = ["city", "worker", "cart"]
+
+NO_SOURCE = -1 # distance and source index of the cells of a class with no objects
+
+
+class DistanceField:
+    __slots__ = ["distances", "nearest", "sources", "positions", "second"]
+
+    def __init__(self, distances, nearest, sources, positions):
+        """
+        Distances to the nearest objects of a class, see DistanceIndex.getField().
+        Args:
+            distances: (H, W) array of the Manhattan distance from each cell to the nearest object, NO_SOURCE if
+                there are no objects.
+            nearest: (H, W) array of the index in sources of the nearest object of each cell, NO_SOURCE if there are
+                no objects. Ties go to the first object in sources.
+            sources: Objects of the class, resource cells, CityTiles or Units.
+            positions: (N, 2) array of the (x, y) of the sources.
+        """
+        self.distances = distances
+        self.nearest = nearest
+        self.sources = sources
+        self.positions = positions
+        self.second = None # (distances, nearest) of the next nearest objects, see DistanceIndex.nearest()
+
+
+def computeField(xs, ys, width, height):
+    '''
+    Computes the distance to the nearest of the sources at (xs, ys) from every cell of the map, as a multi-source
+    BFS on the open grid would. Rows are reduced first, then columns with a running minimum down and up the map, in
+    O((N + H) * W) instead of O(N * H * W).
+    Distances and source indices are packed in a single integer, distance * N + index, so that the minimum picks
+    the nearest source and the first one among equally near sources.
+    Returns: distances, nearest, as DistanceField
+    '''
+    numSources = len(xs)
+    if numSources == 0:
+        empty = np.full((height, width), NO_SOURCE, dtype=np.int64)
+        return empty, empty.copy()
+    xs, ys = np.asarray(xs, dtype=np.int64), np.asarray(ys, dtype=np.int64)
+    columns = np.arange(width)
+    rows = np.arange(height)
+
+    # nearest source of each cell among the sources of each row
+    packed = np.abs(xs[:, None] - columns[None, :]) * numSources + np.arange(numSources)[:, None]
+    rowBest = np.full((height, width), np.iinfo(np.int64).max // 2, dtype=np.int64)
+    np.minimum.at(rowBest, (np.broadcast_to(ys[:, None], packed.shape), np.broadcast_to(columns, packed.shape)), packed)
+
+    # then among the rows above, min(rowBest[y'] + (y - y') * N) for y' <= y, and the rows below
+    offsets = (rows * numSources)[:, None]
+    best = np.minimum.accumulate(rowBest - offsets, axis=0) + offsets
+    below = np.minimum.accumulate((rowBest + offsets)[::-1], axis=0)[::-1] - offsets
+    best = np.minimum(best, below)
+    return best // numSources, best % numSources
+
+
+def computeSecondField(xs, ys, width, height):
+    '''
+    Computes the distance to the second nearest of the sources at (xs, ys) from every cell of the map, the nearest
+    one once the source computeField() picks for the cell is left out. As computeField(), with the two best packed
+    values of each cell kept through the row pass and through the column pass, which is a prefix scan that doubles
+    the rows it spans at each step. Equal packed values are the same source, so it is only counted once.
+    Returns: distances, nearest, as DistanceField, NO_SOURCE where there is no second source
+    '''
+    numSources = len(xs)
+    if numSources < 2:
+        empty = np.full((height, width), NO_SOURCE, dtype=np.int64)
+        return empty, empty.copy()
+    xs, ys = np.asarray(xs, dtype=np.int64), np.asarray(ys, dtype=np.int64)
+    columns = np.arange(width)
+    noSource = np.iinfo(np.int64).max // 4
+
+    # two nearest sources of each cell among the sources of each row
+    packed = np.abs(xs[:, None] - columns[None, :]) * numSources + np.arange(numSources)[:, None]
+    cells = (np.broadcast_to(ys[:, None], packed.shape), np.broadcast_to(columns, packed.shape))
+    rowBest = np.full((height, width), noSource, dtype=np.int64)
+    np.minimum.at(rowBest, cells, packed)
+    rowSecond = np.full((height, width), noSource, dtype=np.int64)
+    np.minimum.at(rowSecond, cells, np.where(packed == rowBest[ys], noSource, packed))
+
+    def merge(best, second, otherBest, otherSecond):
+        ''' Two best of two pairs of packed values '''
+        mergedBest = np.minimum(best, otherBest)
+        mergedSecond = np.minimum(second, otherSecond)
+        mergedSecond = np.minimum(mergedSecond, np.where(best == mergedBest, noSource, best))
+        return mergedBest, np.minimum(mergedSecond, np.where(otherBest == mergedBest, noSource, otherBest))
+
+    def scan(best, second):
+        ''' Two best of the rows above each row, inclusive '''
+        step = 1
+        while step < height:
+            best[step:], second[step:] = merge(best[step:], second[step:], best[:-step], second[:-step])
+            step *= 2
+        return best, second
+
+    # min(rowBest[y'] + (y - y') * N) for y' <= y, and the rows below
+    offsets = (np.arange(height) * numSources)[:, None]
+    downBest, downSecond = scan(rowBest - offsets, rowSecond - offsets)
+    upBest, upSecond = scan((rowBest + offsets)[::-1], (rowSecond + offsets)[::-1])
+    best, second = merge(downBest + offsets, downSecond + offsets, upBest[::-1] - offsets, upSecond[::-1] - offsets)
+    missing = second >= noSource // 2 # stays out of the map's range once offset
+    return np.where(missing, NO_SOURCE, second // numSources), np.where(missing, NO_SOURCE, second % numSources)
+
+
+def directionTo(x, y, targetX, targetY):
+    '''
+    Returns the direction of a first step of a shortest path from (x, y) to (targetX, targetY) on the open grid,
+    along the axis with the longest way to go, horizontally on ties. CENTER if they are the same cell.
+    '''
+    dx, dy = targetX - x, targetY - y
+    if dx == 0 and dy == 0:
+        return DIRECTIONS.CENTER
+    if abs(dx) >= abs(dy):
+        return DIRECTIONS.EAST if dx > 0 else DIRECTIONS.WEST
+    return DIRECTIONS.SOUTH if dy > 0 else DIRECTIONS.NORTH
+
+
+class DistanceIndex:
+    def __init__(self, game):
+        """
+        Distance fields of the objects of a game, computed when first asked for in a turn and kept until the turn
+        advances. Game.restore() invalidates them, as should any change to the game made outside of a turn.
+        Distances are Manhattan distances, they ignore the units and enemy cities in the way.
+        """
+        self.game = game
+        self.fields = {}
+        self.turn = None
+
+    def invalidate(self):
+        """ Drops the fields, they are computed again when asked for """
+        self.fields = {}
+        self.turn = None
+
+    def getField(self, objectClass, team = None):
+        """
+        Returns the DistanceField of a class of objects, valid for the current turn.
+        Args:
+            objectClass: A resource type, to index the resource cells of this type, or one of "city", "worker",
+                "cart" to index the CityTiles or Units of a team.
+            team: Team of the objects of the "city", "worker" and "cart" classes. Pass 1 - team for the enemy's.
+        """
+        turn = self.game.state["turn"]
+        if turn != self.turn:
+            self.fields = {}
+            self.turn = turn
+        key = (objectClass, team)
+        field = self.fields.get(key)
+        if field is None:
+            field = self._computeField(objectClass, team)
+            self.fields[key] = field
+        return field
+
+    def nearest(self, objectClass, x, y, team = None, exclude = None):
+        """
+        Returns (source, distance, direction) of the nearest object of a class from (x, y), with the direction of a
+        first step towards it, or None if there are no objects of the class. See getField().
+        Args:
+            exclude: Object of the class to leave out, such as the unit or city tile asking, which is otherwise its
+                own nearest object. The next nearest object is returned in its place, also in O(1).
+        """
+        field = self.getField(objectClass, team)
+        distances, nearest = field.distances, field.nearest
+        i = nearest[y, x]
+        if exclude is not None and i != NO_SOURCE and field.sources[i] is exclude:
+            if field.second is None:
+                field.second = computeSecondField(
+                    field.positions[:, 0], field.positions[:, 1], distances.shape[1], distances.shape[0]
+                )
+            distances, nearest = field.second
+            i = nearest[y, x]
+        if i == NO_SOURCE:
+            return None
+        targetX, targetY = field.positions[i]
+        return field.sources[i], int(distances[y, x]), directionTo(x, y, targetX, targetY)
+
+    def _computeField(self, objectClass, team):
+        game = self.game
+        if objectClass in RESOURCE_CLASSES:
+            sources = list(game.map.resources_by_type[objectClass])
+        elif objectClass not in TEAM_CLASSES:
+            raise Exception("Unknown object class %s." % objectClass)
+        elif team is None:
+            raise Exception("Object class %s needs a team." % objectClass)
+        elif objectClass == "city":
+            sources = [
+                cell.citytile for city in game.cities.values() if city.team == team for cell in city.citycells
+            ]
+        else:
+            unitType = Constants.UNIT_TYPES.WORKER if objectClass == "worker" else Constants.UNIT_TYPES.CART
+            sources = [unit for unit in game.getTeamsUnits(team).values() if unit.type == unitType]
+
+        positions = np.array([(source.pos.x, source.pos.y) for source in sources], dtype=np.int64).reshape(-1, 2)
+        distances, nearest = computeField(positions[:, 0], positions[:, 1], game.map.width, game.map.height)
+        return DistanceField(distances, nearest, sources, positions)
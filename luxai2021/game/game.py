@@ -3,10 +3,25 @@ from .constants import Constants, LuxMatchConfigs_Default
 from .game_map import GameMap
 import traceback
 
-from .unit import Unit, Worker, Cart
-from .city import City
+from .unit import Unit, Worker, Cart, Cargo
+from .city import City, CitySet
+from .game_map import ResourceIndex
+from .position import getPosition
+from .resource import Resource
+from .array_state import ArrayState
+from .movement import resolveMoves
+from .map_bank import MapBank
+from .codes import WOOD, COAL, URANIUM
+from .params import GameParams
+from .distance_index import DistanceIndex
+from .journal import (
+    MOVE, CARGO, RESOURCE, REMOVE_RESOURCE, COOLDOWN, FUEL, SPAWN_UNIT, DESTROY_UNIT, SPAWN_CITY_TILE, DESTROY_CITY,
+    Snapshot, cityState, turnHeader, undoLog, position
+)
+import copy
 import math
 import random
+import weakref
 
 INPUT_CONSTANTS = Constants.INPUT_CONSTANTS
 DIRECTIONS = Constants.DIRECTIONS
@@ -14,9 +29,11 @@ DIRECTIONS = Constants.DIRECTIONS
 class Game:
     def __init__(self, configs = None, agents = []):
         # Initializations from src/Game/index.ts -> Game()
-        self.configs = LuxMatchConfigs_Default
-        self.configs.update(configs) # Override default config from specified config
+        self.configs = dict(LuxMatchConfigs_Default) # Copied, the defaults are shared by all games
+        if configs is not None:
+            self.configs.update(configs) # Override default config from specified config
         self.agents = []
+        self.distanceIndex = DistanceIndex(self) # nearest objects from every cell, see getDistanceIndex()
         self.reset()
         self.logFile = None
 
@@ -25,6 +42,19 @@ class Game:
         self.globalCityIDCount = 0
         self.globalUnitIDCount = 0
         self.cities = {} # string -> City
+        self.depletedResources = [] # resource cells mined out this turn, dropped from the map at the end of the turn
+        self.journal = [] # undo logs of the journaled turns, see undoTurn()
+        self.undoLog = None # undo log the mutators append to while a journaled turn runs, see journal.py
+        self.history = [] # undo logs of the turns run since the oldest held snapshot, see snapshot()
+        self.snapshots = weakref.WeakSet() # snapshots of the history that are still held
+
+        self.params = GameParams(self.configs["parameters"]) # the engine reads the parameters only from here
+
+        # Per-team counters, kept up to date by the spawn and destroy methods. See validateCounters()
+        self.counters = {
+            Constants.TEAM.A: {"cities": 0, "cityTiles": 0, "workers": 0, "carts": 0},
+            Constants.TEAM.B: {"cities": 0, "cityTiles": 0, "workers": 0, "carts": 0},
+        }
         self.stats = {
             "teamStats": {
                 Constants.TEAM.A: {
@@ -79,9 +109,278 @@ class Game:
             }
         }
 
-        # Generate the map
-        self.map = GameMap(self.configs)
-        self.map.generateMap(self)
+        # Generate the map, or load it from the map bank
+        self.map = GameMap(self.configs, self.params)
+        if not self._loadBankedMap():
+            self.map.generateMap(self)
+
+        # With the array engine the generated objects become a view of the array state
+        self.arrays = None
+        if self.configs["engine"] == Constants.ENGINE_TYPES.ARRAY:
+            self.arrays = ArrayState(self.configs, 1, self.map.height, self.map.width)
+            self.arrays.loadGame(0, self)
+
+        # the turn counter starts over, so the fields of the previous game would look current
+        self.distanceIndex.invalidate()
+
+    def __getstate__(self):
+        ''' Held snapshots belong to this game, a pickled copy starts without them '''
+        state = dict(self.__dict__)
+        state["history"] = []
+        del state["snapshots"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.snapshots = weakref.WeakSet()
+
+    def _loadBankedMap(self):
+        ''' Loads the map of the seed from the configured map bank, returning False if it is not there '''
+        if (self.configs.get("mapBank") is None or self.configs["seed"] is None or
+                self.configs["mapType"] != Constants.MAP_TYPES.RANDOM):
+            return False
+        return MapBank.open(self.configs["mapBank"]).loadMap(self, self.configs["seed"])
+
+    def snapshot(self):
+        """
+        Captures the state of the game between turns, to go back to it later with restore().
+        With the object engine a snapshot costs the same whatever the size of the game: while one is held, every turn
+        records what it changes, as journaled turns do, and restore() undoes the turns run since the snapshot. So
+        restoring costs as much as what those turns changed, and holding a snapshot makes turns about a third slower.
+        Changes made to the game outside of runTurnWithActions() are not recorded, take the snapshot after them.
+        The array engine changes its arrays in bulk and records nothing, its snapshots capture the whole state.
+        """
+        if self.arrays is not None:
+            return Snapshot([], self._captureState())
+        snapshot = Snapshot(self.history)
+        self.snapshots.add(snapshot)
+        return snapshot
+
+    def restore(self, snapshot):
+        """
+        Puts the game back in the state captured by snapshot(). A snapshot can be restored any number of times, as
+        long as the game was not reset and the turns before the snapshot were not undone.
+        """
+        if snapshot.state is not None:
+            self._restoreState(snapshot.state)
+            return
+        if not snapshot.reachable(self.history):
+            raise Exception("The snapshot can't be restored, the game was reset or the turns before it were undone.")
+        while len(self.history) > snapshot.depth:
+            log = self.history.pop()
+            if len(self.journal) > 0 and self.journal[-1] is log:
+                self.journal.pop()
+            undoLog(self, log)
+        self.distanceIndex.invalidate()
+
+    def _captureState(self):
+        """
+        Captures the whole mutable state of the game, for the snapshots of the array engine.
+        Every live unit, city tile and resource cell, and every road that was changed, is captured.
+        """
+        units = []
+        for team in [Constants.TEAM.A, Constants.TEAM.B]:
+            for unit in self.state["teamStates"][team]["units"].values():
+                units.append((unit, unit.pos.x, unit.pos.y, (unit.cargo.wood, unit.cargo.coal, unit.cargo.uranium), unit.cooldown))
+        occupiedCells = {}
+        for unit, x, y, cargo, cooldown in units:
+            cell = self.map.getCell(x, y)
+            if cell not in occupiedCells:
+                occupiedCells[cell] = list(cell.units.values())
+        cities = []
+        for city in self.cities.values():
+            citycells = list(city.citycells)
+            tiles = [(cell.citytile, cell.citytile.cooldown, cell.citytile.adjacentCityTiles) for cell in citycells]
+            cities.append((city, city.fuel, city.adjacencyBonus, citycells, tiles))
+        return {
+            "turn": self.state["turn"],
+            "globalCityIDCount": self.globalCityIDCount,
+            "globalUnitIDCount": self.globalUnitIDCount,
+            "research": {
+                team: (teamState["researchPoints"], dict(teamState["researched"]))
+                for team, teamState in self.state["teamStates"].items()
+            },
+            "stats": {
+                team: dict(teamStats, resourcesCollected=dict(teamStats["resourcesCollected"]))
+                for team, teamStats in self.stats["teamStats"].items()
+            },
+            "counters": {team: dict(counters) for team, counters in self.counters.items()},
+            "units": units,
+            "occupiedCells": occupiedCells,
+            "cities": cities,
+            "resources": [(cell, cell.resource.amount) for cell in self.map.resources],
+            "roads": [(cell, cell.road) for cell in self.map.roadCells],
+        }
+
+    def _restoreState(self, snapshot):
+        """
+        Puts the game back in the state captured by _captureState(), which can be restored any number of times.
+        """
+        gameMap = self.map
+        self.state["turn"] = snapshot["turn"]
+        self.globalCityIDCount = snapshot["globalCityIDCount"]
+        self.globalUnitIDCount = snapshot["globalUnitIDCount"]
+        for team, (researchPoints, researched) in snapshot["research"].items():
+            self.state["teamStates"][team]["researchPoints"] = researchPoints
+            self.state["teamStates"][team]["researched"] = dict(researched)
+        for team, teamStats in snapshot["stats"].items():
+            self.stats["teamStats"][team] = dict(teamStats, resourcesCollected=dict(teamStats["resourcesCollected"]))
+        self.counters = {team: dict(counters) for team, counters in snapshot["counters"].items()}
+        self.depletedResources = []
+
+        # units
+        for team in [Constants.TEAM.A, Constants.TEAM.B]:
+            for unit in self.state["teamStates"][team]["units"].values():
+                gameMap.getCellByPos(unit.pos).units = {}
+            self.state["teamStates"][team]["units"] = {}
+        for unit, x, y, cargo, cooldown in snapshot["units"]:
+            unit.pos = getPosition(x, y)
+            unit.cargo = Cargo(*cargo)
+            unit.cooldown = cooldown
+            unit.currentActions = []
+            self.state["teamStates"][unit.team]["units"][unit.id] = unit
+        for cell, units in snapshot["occupiedCells"].items():
+            cell.units = {unit.id: unit for unit in units}
+
+        # cities and their tiles
+        for city in self.cities.values():
+            for cell in city.citycells:
+                cell.citytile = None
+        self.cities = {}
+        for city, fuel, adjacencyBonus, citycells, tiles in snapshot["cities"]:
+            city.fuel = fuel
+            city.citycells = list(citycells)
+            city.adjacencyBonus = adjacencyBonus
+            city.citySet = CitySet(city)
+            for cell, (citytile, cooldown, adjacentCityTiles) in zip(citycells, tiles):
+                cell.citytile = citytile
+                citytile.citySet = city.citySet
+                citytile.cooldown = cooldown
+                citytile.adjacentCityTiles = adjacentCityTiles
+                citytile.currentActions = []
+            self.cities[city.id] = city
+
+        # resources, the index is rebuilt as cells depleted since the snapshot are back
+        gameMap.resources = ResourceIndex()
+        gameMap.resources_by_type = {resourceType: ResourceIndex() for resourceType in gameMap.resources_by_type}
+        for cell, amount in snapshot["resources"]:
+            cell.resource.amount = amount
+            gameMap.resources.add(cell)
+            gameMap.resources_by_type[cell.resource.type].add(cell)
+
+        # roads
+        roads = dict(snapshot["roads"])
+        for cell in gameMap.roadCells:
+            if cell not in roads:
+                cell.road = self.params.minRoad
+        for cell, road in roads.items():
+            cell.road = road
+        gameMap.roadCells = set(roads)
+
+        if self.arrays is not None:
+            self.arrays.loadGame(0, self)
+        self.distanceIndex.invalidate()
+
+    def undoTurn(self):
+        """
+        Rolls back the last turn run with journal=True. Journaled turns are undone in reverse order, so a search
+        can apply and undo turns in place instead of copying the game at every node.
+        """
+        if len(self.journal) == 0:
+            raise Exception("No journaled turn to undo.")
+        log = self.journal.pop()
+        if len(self.history) > 0 and self.history[-1] is log:
+            self.history.pop()
+        undoLog(self, log)
+        self.distanceIndex.invalidate()
+
+    def clone(self):
+        """
+        Returns an independent copy of the game. Cheaper than copy.deepcopy() as configs are shared and only the
+        mutable objects are copied.
+        """
+        game = Game.__new__(Game)
+        game.configs = self.configs
+        game.agents = []
+        game.logFile = None
+        game.globalCityIDCount = self.globalCityIDCount
+        game.globalUnitIDCount = self.globalUnitIDCount
+        game.depletedResources = []
+        game.journal = []
+        game.undoLog = None
+        game.history = []
+        game.snapshots = weakref.WeakSet()
+        game.params = self.params
+        game.counters = {team: dict(counters) for team, counters in self.counters.items()}
+        game.stats = {"teamStats": {
+            team: dict(teamStats, resourcesCollected=dict(teamStats["resourcesCollected"]))
+            for team, teamStats in self.stats["teamStats"].items()
+        }}
+        game.state = {"turn": self.state["turn"], "teamStates": {}}
+        for team, teamState in self.state["teamStates"].items():
+            game.state["teamStates"][team] = {
+                "researchPoints": teamState["researchPoints"],
+                "units": {},
+                "researched": dict(teamState["researched"]),
+            }
+
+        # map, cells are copied with their resources and roads
+        game.map = copy.copy(self.map)
+        cells = []
+        for cell in self.map.cells:
+            newCell = copy.copy(cell)
+            newCell.units = {}
+            if cell.resource is not None:
+                newCell.resource = Resource(cell.resource.type, cell.resource.amount)
+            cells.append(newCell)
+        game.map.setCells(cells)
+
+        def cellOf(cell):
+            return cells[cell.pos.y * game.map.width + cell.pos.x]
+
+        game.map.roadCells = set(cellOf(cell) for cell in self.map.roadCells)
+        game.map.resources = ResourceIndex()
+        game.map.resources_by_type = {resourceType: ResourceIndex() for resourceType in self.map.resources_by_type}
+        for cell in self.map.resources:
+            game.map.resources.add(cellOf(cell))
+            game.map.resources_by_type[cell.resource.type].add(cellOf(cell))
+
+        # units, keeping the order of the units on each cell
+        for team, teamState in self.state["teamStates"].items():
+            for unit in teamState["units"].values():
+                newUnit = copy.copy(unit)
+                newUnit.pos = unit.pos
+                newUnit.cargo = copy.copy(unit.cargo)
+                newUnit.currentActions = []
+                game.state["teamStates"][team]["units"][unit.id] = newUnit
+        for team, teamState in self.state["teamStates"].items():
+            for unit in teamState["units"].values():
+                cell = self.map.getCellByPos(unit.pos)
+                newCell = cellOf(cell)
+                if len(newCell.units) == 0:
+                    for unitid, cellUnit in cell.units.items():
+                        newCell.units[unitid] = game.state["teamStates"][cellUnit.team]["units"][unitid]
+
+        # cities and their tiles
+        game.cities = {}
+        for city in self.cities.values():
+            newCity = copy.copy(city)
+            newCity.citycells = [cellOf(cell) for cell in city.citycells]
+            newCity.citySet = CitySet(newCity)
+            for cell in city.citycells:
+                newTile = copy.copy(cell.citytile)
+                newTile.pos = cellOf(cell).pos
+                newTile.citySet = newCity.citySet
+                newTile.currentActions = []
+                cellOf(cell).citytile = newTile
+            game.cities[city.id] = newCity
+
+        game.arrays = None
+        if self.arrays is not None:
+            game.arrays = ArrayState(game.configs, 1, game.map.height, game.map.width)
+            game.arrays.loadGame(0, game)
+        game.distanceIndex = DistanceIndex(game)
+        return game
 
     def _genInitialAccumulatedActionStats(self):
         """
@@ -102,15 +401,49 @@ class Game:
             }
     
 
-    def runTurnWithActions(self, actions):
+    def runTurnWithActions(self, actions, journal = False):
         """
         Runs a single game turn with the specified actions
+        Args:
+            journal: Record the turn so it can be rolled back with undoTurn(). Only the object engine records its
+                turns, the array engine raises an exception
         Returns:
             True if game is still running
             False if game is over
         """
+        if self.arrays is not None:
+            if journal:
+                # the array engine changes its arrays in bulk, it has no mutators to record the changes of a turn
+                raise Exception("Journaled turns need the object engine, the array engine can't undo its turns.")
+            return self._runTurn(actions)
+        # held snapshots go back to the state before the turn by undoing it
+        recorded = len(self.snapshots) > 0
+        if not recorded and len(self.history) > 0:
+            self.history = []
+        if not journal and not recorded:
+            return self._runTurn(actions)
+
+        self.undoLog = [turnHeader(self)]
+        if journal:
+            self.journal.append(self.undoLog)
+        if recorded:
+            self.history.append(self.undoLog)
+        try:
+            return self._runTurn(actions)
+        finally:
+            self.undoLog = None
+
+    def _runTurn(self, actions):
         if "log" in self.configs and self.configs["log"]:
             self.log('Processing turn ' + self.game.state["turn"])
+
+        if self.arrays is not None:
+            # Run the turn on the array state, then update the object view
+            matchOver = self.arrays.runTurn([actions])[0]
+            self.arrays.writeView(0, self)
+            if self.configs["debug"]:
+                self.validateCounters()
+            return bool(matchOver)
         
         # Loop over commands and validate and map into internal action representations
         actionsMap = {}
@@ -174,8 +507,12 @@ class Game:
                 self.getUnit(action.team, action.unitid).giveAction(action)
 
         # now we go through every actionable entity and execute actions
+        undoLog = self.undoLog
         for city in self.cities.values():
             for citycell in city.citycells:
+                # the cooldown of a tile only changes if it acts or is cooling down
+                if undoLog is not None and (citycell.citytile.currentActions or citycell.citytile.cooldown > 0):
+                    undoLog.append((COOLDOWN, citycell.citytile, citycell.citytile.cooldown))
                 try:
                     citycell.citytile.handleTurn(self)
                 except Exception as e:
@@ -186,6 +523,8 @@ class Game:
         teams = [Constants.TEAM.A, Constants.TEAM.B]
         for team in teams:
             for unit in self.state["teamStates"][team]["units"].values():
+                if undoLog is not None and unit.currentActions:
+                    undoLog.append((COOLDOWN, unit, unit.cooldown))
                 try:
                     unit.handleTurn(self)
                 except Exception as e:
@@ -205,18 +544,14 @@ class Game:
             self.handleNight()
 
         # remove resources that are depleted from map
-        newResourcesMap = []
-        self.map.resources_by_type = {}
-        for i in range(len(self.map.resources)):
-            cell = self.map.resources[i]
-            if (cell.resource.amount > 0):
-                newResourcesMap.append(cell)
-                if cell.resource.type not in self.map.resources_by_type:
-                    self.map.resources_by_type[cell.resource.type] = [cell]
-                else:
-                    self.map.resources_by_type[cell.resource.type].append(cell)
-
-        self.map.resources = newResourcesMap
+        for cell in self.depletedResources:
+            if undoLog is not None and cell in self.map.resources:
+                undoLog.append((
+                    REMOVE_RESOURCE, cell, position(self.map.resources.cells, cell),
+                    position(self.map.resources_by_type[cell.resource.type].cells, cell)
+                ))
+            self.map.removeResource(cell)
+        self.depletedResources = []
 
         # regenerate forests
         self.regenerateTrees()
@@ -232,6 +567,9 @@ class Game:
 
         self.runCooldowns()
 
+        if self.configs["debug"]:
+            self.validateCounters()
+
         if (matchOver):
             #if (self.replay):
             #    self.replay.writeOut(self.getResults(match))
@@ -248,18 +586,24 @@ class Game:
         * Handle nightfall and update state accordingly
         */
         """
+        undoLog = self.undoLog
         for city in list(self.cities.values()):
             # if city does not have enough fuel, destroy it
             # TODO, probably add this event to replay
             if (city.fuel < city.getLightUpkeep()):
                 self.destroyCity(city.team, city.id)
             else:
+                if undoLog is not None:
+                    undoLog.append((FUEL, city, city.fuel))
                 city.fuel -= city.getLightUpkeep()
         
         for team in [Constants.TEAM.A, Constants.TEAM.B]:
             for unit in list(self.state["teamStates"][team]["units"].values()):
                 # TODO: add condition for different light upkeep for units stacked on a city.
                 if (not self.map.getCellByPos(unit.pos).isCityTile()):
+                    if undoLog is not None:
+                        cargo = unit.cargo
+                        undoLog.append((CARGO, unit, cargo.wood, cargo.coal, cargo.uranium))
                     if (not unit.spendFuelToSurvive()):
                         # delete unit
                         self.destroyUnit(unit.team, unit.id)
@@ -268,9 +612,12 @@ class Game:
         """
         Implements /src/Game/index.ts -> runCooldowns()
         """
+        undoLog = self.undoLog
         for team in [Constants.TEAM.A, Constants.TEAM.B]:
             units = self.getTeamsUnits(team).values()
             for unit in units:
+                if undoLog is not None and unit.cooldown > 0:
+                    undoLog.append((COOLDOWN, unit, unit.cooldown))
                 unit.cooldown -= self.map.getCellByPos(unit.pos).getRoad()
                 unit.cooldown = max(unit.cooldown - 1, 0)
     
@@ -282,18 +629,13 @@ class Game:
         */
         """
 
-        if (self.state["turn"] >= self.configs["parameters"]["MAX_DAYS"] - 1):
+        if (self.state["turn"] >= self.params.maxDays - 1):
             return True
-        
-        # over if at least one team has no units left or city tiles
-        teams = [Constants.TEAM.A, Constants.TEAM.B]
-        cityCount = [0, 0]
-
-        for city in self.cities.values():
-            cityCount[city.team] += 1
 
-        for team in teams:
-            if len(self.getTeamsUnits(team)) + cityCount[team] == 0:
+        # over if at least one team has no units left or city tiles
+        for team in [Constants.TEAM.A, Constants.TEAM.B]:
+            counters = self.counters[team]
+            if counters["workers"] + counters["carts"] + counters["cities"] == 0:
                 return True
 
         return False
@@ -304,9 +646,10 @@ class Game:
         """
         
         # count city tiles
-        cityTileCount = [0, 0]
-        for city in self.cities.values():
-            cityTileCount[city.team] += len(city.citycells)
+        cityTileCount = [
+            self.counters[Constants.TEAM.A]["cityTiles"],
+            self.counters[Constants.TEAM.B]["cityTiles"],
+        ]
         
         if (cityTileCount[Constants.TEAM.A] > cityTileCount[Constants.TEAM.B]):
             return Constants.TEAM.A
@@ -315,8 +658,8 @@ class Game:
         
         # if tied, count by units
         unitCount = [
-            len(self.getTeamsUnits(Constants.TEAM.A)),
-            len(self.getTeamsUnits(Constants.TEAM.B)),
+            self.counters[Constants.TEAM.A]["workers"] + self.counters[Constants.TEAM.A]["carts"],
+            self.counters[Constants.TEAM.B]["workers"] + self.counters[Constants.TEAM.B]["carts"],
         ]
         if unitCount[Constants.TEAM.A] > unitCount[Constants.TEAM.B]:
             return Constants.TEAM.A
@@ -374,19 +717,15 @@ class Game:
         Returns True if unit cap reached
         Implements src/Game/index.ts -> Game.workerUnitCapReached()
         """
-        team_city_count = 0
-        for city in self.cities.values():
-            if city.team == team:
-                team_city_count += 1
-        
-        return len(self.state["teamStates"][team]["units"]) + offset >= team_city_count
+        counters = self.counters[team]
+        return counters["workers"] + counters["carts"] + offset >= counters["cities"]
     
     def cartUnitCapReached(self, team, offset = 0):
         """
         Returns True if unit cap reached
         Implements src/Game/index.ts -> Game.cartUnitCapReached()
         """
-        return self.worker_unit_cap_reached(team, offset)
+        return self.workerUnitCapReached(team, offset)
     
     def spawnWorker(self, team, x, y, unitid = None):
         """
@@ -398,7 +737,7 @@ class Game:
             x,
             y,
             team,
-            self.configs,
+            self.params,
             self.globalUnitIDCount + 1
         )
 
@@ -408,9 +747,12 @@ class Game:
             self.globalUnitIDCount += 1
         
         cell.units[unit.id] = unit
+        if self.undoLog is not None:
+            self.undoLog.append((SPAWN_UNIT, unit, cell))
 
         self.state["teamStates"][team]["units"][unit.id] = unit
         self.stats["teamStats"][team]["workersBuilt"] += 1
+        self.counters[team]["workers"] += 1
         return unit
 
     def spawnCart(self, team, x, y, unitid = None):
@@ -419,15 +761,18 @@ class Game:
         Implements src/Game/index.ts -> Game.spawnCart()
         """
         cell = self.map.getCell(x, y)
-        unit = Cart(x, y, team, self.configs, self.globalUnitIDCount + 1)
+        unit = Cart(x, y, team, self.params, self.globalUnitIDCount + 1)
         if unitid:
             unit.id = unitid
         else:
             self.globalUnitIDCount += 1
         
         cell.units[unit.id] = unit
+        if self.undoLog is not None:
+            self.undoLog.append((SPAWN_UNIT, unit, cell))
         self.state["teamStates"][team]["units"][unit.id] = unit
         self.stats["teamStats"][team]["cartsBuilt"] += 1
+        self.counters[team]["carts"] += 1
         return unit
 
     def spawnCityTile(self, team, x, y, cityid = None):
@@ -440,17 +785,25 @@ class Game:
         # now update the cities field accordingly
         adjCells = self.map.getAdjacentCells(cell)
 
-        cityIdsFound = set()
+        cityIdsFound = [] # ordered, so merges are deterministic
+        self.counters[team]["cityTiles"] += 1
 
         adjSameTeamCityTiles = []
-        for cell in adjCells:
-            if cell.isCityTile() and cell.citytile.team == team:
-                adjSameTeamCityTiles.append(cell)
-                cityIdsFound.add(cell.citytile.cityid)
+        for adjCell in adjCells:
+            if adjCell.isCityTile() and adjCell.citytile.team == team:
+                adjSameTeamCityTiles.append(adjCell)
+                if adjCell.citytile.cityid not in cityIdsFound:
+                    cityIdsFound.append(adjCell.citytile.cityid)
+
+        mergedCities = [] # with their position in the cities, to put them back in order
+        if self.undoLog is not None:
+            self.undoLog.append((
+                SPAWN_CITY_TILE, cell, None, mergedCities, [cityState(self.cities[id]) for id in cityIdsFound]
+            ))
 
         # if no adjacent city cells of same team, generate new city
         if len(adjSameTeamCityTiles) == 0:
-            city = City(team, self.configs, self.globalCityIDCount + 1)
+            city = City(team, self.params, self.globalCityIDCount + 1)
 
             if cityid != None:
                 city.id = cityid
@@ -460,6 +813,9 @@ class Game:
             cell.setCityTile(team, city.id)
             city.addCityTile(cell)
             self.cities[city.id] = city
+            self.counters[team]["cities"] += 1
+            if self.undoLog is not None:
+                self.undoLog[-1] = (SPAWN_CITY_TILE, cell, city, [], [])
             return cell.citytile
         
         else:
@@ -471,19 +827,18 @@ class Game:
             # update adjacency counts for bonuses
             cell.citytile.adjacentCityTiles = len(adjSameTeamCityTiles)
             for adjCell in adjSameTeamCityTiles:
-                adjCell.citytile.adjacentCityTiles += 1
+                self.cities[adjCell.citytile.cityid].addAdjacentCityTile(adjCell.citytile)
             city.addCityTile(cell)
 
-            # update all merged cities' cells with merged cityid, move to merged city and delete old city
+            # merge the other adjacent cities into this one, their tiles resolve to it through the city sets
             for id in cityIdsFound:
                 if id != cityid:
                     oldcity = self.cities[id]
-                    for cell in oldcity.citycells:
-                        cell.citytile.cityid = cityid
-                        city.addCityTile(cell)
-                
-                    city.fuel += oldcity.fuel
+                    city.mergeCity(oldcity)
+                    if self.undoLog is not None:
+                        mergedCities.append((oldcity, position(self.cities, oldcity.id)))
                     self.cities.pop(oldcity.id)
+                    self.counters[team]["cities"] -= 1
             
             return cell.citytile
 
@@ -495,7 +850,10 @@ class Game:
         unit = self.getUnit(team, unitid)
 
         # remove unit from old cell and move to new one and update unit pos
-        self.map.getCellByPos(unit.pos).units.pop(unit.id)
+        cell = self.map.getCellByPos(unit.pos)
+        if self.undoLog is not None:
+            self.undoLog.append((MOVE, unit, cell, list(cell.units.values()) if len(cell.units) > 1 else None))
+        cell.units.pop(unit.id)
         unit.pos = unit.pos.translate(direction, 1)
         self.map.getCellByPos(unit.pos).units[unit.id] = unit
 
@@ -510,12 +868,24 @@ class Game:
             Constants.RESOURCE_TYPES.WOOD,
         ]
 
+        # Only cells next to a unit can release anything, as every receiver is a worker or a city tile
+        # with units on it. Skip the others without building their neighbour lists.
+        width = self.map.width
+        neighbours = self.map.neighbours
+        nearUnits = set()
+        for team in [Constants.TEAM.A, Constants.TEAM.B]:
+            for unit in self.state["teamStates"][team]["units"].values():
+                index = unit.pos.y * width + unit.pos.x
+                nearUnits.add(index)
+                nearUnits.update(neighbours[index])
+
         # Note: I optimized this loop from the base game to potentially improve perf. Seemed
         # like this may have been one of the more-costly part of the update loop.
         for curType in miningOrder:
             if curType in self.map.resources_by_type:
                 for cell in self.map.resources_by_type[curType]:
-                    self.handleResourceRelease(cell)
+                    if cell.pos.y * width + cell.pos.x in nearUnits:
+                        self.handleResourceRelease(cell)
 
     def handleResourceRelease(self, originalCell):
         """
@@ -535,7 +905,8 @@ class Game:
         """
         if (originalCell.hasResource()):
             type = originalCell.resource.type
-            cells = [originalCell] + self.map.getAdjacentCells(originalCell)
+            code = originalCell.resource.code
+            cells = (originalCell,) + self.map.getAdjacentCells(originalCell)
             workersToReceiveResources = []
             for cell in cells:
                 if (cell.isCityTile() and len(cell.units) > 0 and self.state["teamStates"][cell.citytile.team]["researched"][type]):
@@ -549,13 +920,8 @@ class Game:
             def isWorker(pet):
                 return isinstance(pet, Worker)
             
-            type_map = {
-                Constants.RESOURCE_TYPES.WOOD : "WOOD",
-                Constants.RESOURCE_TYPES.COAL : "COAL",
-                Constants.RESOURCE_TYPES.URANIUM : "URANIUM",
-            }
-            rate = self.configs["parameters"]["WORKER_COLLECTION_RATE"][type_map[type]]
-            conversionRate = self.configs["parameters"]["RESOURCE_TO_FUEL_RATE"][type_map[type]]
+            rate = self.params.collectionRates[code]
+            conversionRate = self.params.fuelRates[code]
 
             # find out how many resources to distribute and release
             amountToDistribute = rate * len(workersToReceiveResources)
@@ -571,6 +937,9 @@ class Game:
             # sort from least space to most so those with more capacity will have the correct distribution of resources before we reach cargo capacity
             workersToReceiveResources.sort(key=lambda s: s.getCargoSpaceLeft(), reverse=True) # TODO: Validate Cities get prioritized correctly here. Cities get last priority with this.
             
+            undoLog = self.undoLog
+            if undoLog is not None:
+                undoLog.append((RESOURCE, originalCell, originalCell.resource.amount))
             for i, entity in enumerate(workersToReceiveResources):
                 spaceLeft = entity.getCargoSpaceLeft()
                 maxReceivable = amountToDistribute / (len(workersToReceiveResources) - i)
@@ -578,9 +947,14 @@ class Game:
                 distributeAmount = min(spaceLeft, maxReceivable, rate)
                 # we give workers a floored amount for sake of integers and effectiely waste the remainder
                 if (isWorker(entity)):
+                    if undoLog is not None:
+                        cargo = entity.cargo
+                        undoLog.append((CARGO, entity, cargo.wood, cargo.coal, cargo.uranium))
                     entity.cargo[type] += math.floor(distributeAmount)
                 else:
                     city = self.cities.get(entity.cityid)
+                    if undoLog is not None:
+                        undoLog.append((FUEL, city, city.fuel))
                     city.fuel += conversionRate * math.floor(distributeAmount)
 
                 amountDistributed += distributeAmount
@@ -592,6 +966,8 @@ class Game:
                 amountToDistribute -= distributeAmount
             
             originalCell.resource.amount -= amountDistributed
+            if originalCell.resource.amount <= 0:
+                self.depletedResources.append(originalCell)
 
         
     
@@ -603,19 +979,20 @@ class Game:
         cell = self.map.getCellByPos(unit.pos)
         if (cell.isCityTile() and cell.citytile.team == unit.team):
             city = self.cities.get(cell.citytile.cityid)
+            if self.undoLog is not None:
+                cargo = unit.cargo
+                self.undoLog.append((FUEL, city, city.fuel))
+                self.undoLog.append((CARGO, unit, cargo.wood, cargo.coal, cargo.uranium))
+            fuelRates = self.params.fuelRates
             fuelGained = 0
-            fuelGained += unit.cargo["wood"] * self.configs["parameters"]["RESOURCE_TO_FUEL_RATE"]["WOOD"]
-            fuelGained += unit.cargo["coal"] * self.configs["parameters"]["RESOURCE_TO_FUEL_RATE"]["COAL"]
-            fuelGained += unit.cargo["uranium"] * self.configs["parameters"]["RESOURCE_TO_FUEL_RATE"]["URANIUM"]
+            fuelGained += unit.cargo.wood * fuelRates[WOOD]
+            fuelGained += unit.cargo.coal * fuelRates[COAL]
+            fuelGained += unit.cargo.uranium * fuelRates[URANIUM]
             city.fuel += fuelGained
 
             self.stats["teamStats"][unit.team]["fuelGenerated"] += fuelGained
 
-            unit.cargo = {
-                "wood": 0,
-                "uranium": 0,
-                "coal": 0,
-            }
+            unit.cargo.clear()
 
     def getTeamsUnits(self, team):
         """
@@ -640,7 +1017,7 @@ class Game:
         srcunit = self.getUnit(team, srcID)
         destunit = self.getUnit(team, destID)
         # the amount to actually transfer is the minimum of:
-        transferAmount = math.min(
+        transferAmount = min(
             # the amount requested
             amount,
             # and all that we have if that's less than requested
@@ -648,6 +1025,9 @@ class Game:
             # and no more than destination-unit's remaining cargo-space
             destunit.getCargoSpaceLeft()
         )
+        if self.undoLog is not None:
+            for unit in [srcunit, destunit]:
+                self.undoLog.append((CARGO, unit, unit.cargo.wood, unit.cargo.coal, unit.cargo.uranium))
         srcunit.cargo[resourceType] -= transferAmount
         destunit.cargo[resourceType] += transferAmount
     
@@ -657,10 +1037,17 @@ class Game:
         Implements src/Game/index.ts -> Game.destroyCity()
         """
         city = self.cities.get(cityID)
+        if self.undoLog is not None:
+            self.undoLog.append((
+                DESTROY_CITY, city, position(self.cities, cityID),
+                [(cell, cell.citytile, cell.road) for cell in city.citycells]
+            ))
         self.cities.pop(cityID)
+        self.counters[city.team]["cities"] -= 1
+        self.counters[city.team]["cityTiles"] -= len(city.citycells)
         for cell in city.citycells:
             cell.citytile = None
-            cell.road = self.configs["parameters"]["MIN_ROAD"]
+            cell.road = self.params.minRoad
     
     def destroyUnit(self, team, unitid):
         """
@@ -668,8 +1055,45 @@ class Game:
         Implements src/Game/index.ts -> Game.destroyUnit()
         """
         unit = self.getUnit(team, unitid);
-        self.map.getCellByPos(unit.pos).units.pop(unitid)
+        cell = self.map.getCellByPos(unit.pos)
+        if self.undoLog is not None:
+            self.undoLog.append((
+                DESTROY_UNIT, unit, position(self.state["teamStates"][team]["units"], unitid), cell,
+                list(cell.units.items())
+            ))
+        cell.units.pop(unitid)
         self.state["teamStates"][team]["units"].pop(unitid)
+        if unit.type == Constants.UNIT_TYPES.WORKER:
+            self.counters[team]["workers"] -= 1
+        else:
+            self.counters[team]["carts"] -= 1
+
+    def countTeams(self):
+        """
+        Recounts the per-team counters from the cities and units
+        """
+        counters = {
+            Constants.TEAM.A: {"cities": 0, "cityTiles": 0, "workers": 0, "carts": 0},
+            Constants.TEAM.B: {"cities": 0, "cityTiles": 0, "workers": 0, "carts": 0},
+        }
+        for city in self.cities.values():
+            counters[city.team]["cities"] += 1
+            counters[city.team]["cityTiles"] += len(city.citycells)
+        for team in [Constants.TEAM.A, Constants.TEAM.B]:
+            for unit in self.state["teamStates"][team]["units"].values():
+                if unit.type == Constants.UNIT_TYPES.WORKER:
+                    counters[team]["workers"] += 1
+                else:
+                    counters[team]["carts"] += 1
+        return counters
+
+    def validateCounters(self):
+        """
+        Cross-checks the maintained per-team counters against a full recount. Raises if they disagree
+        """
+        counters = self.countTeams()
+        if counters != self.counters:
+            raise Exception("Team counters %s do not match recount %s; turn %i" % (self.counters, counters, self.state["turn"]))
 
     def regenerateTrees(self):
         """
@@ -684,13 +1108,18 @@ class Game:
         */
         """
         if Constants.RESOURCE_TYPES.WOOD in self.map.resources_by_type:
+            maxWoodAmount = self.params.maxWoodAmount
+            woodGrowthRate = self.params.woodGrowthRate
+            undoLog = self.undoLog
             for cell in self.map.resources_by_type[Constants.RESOURCE_TYPES.WOOD]:
                 # add this condition so we let forests near a city start large (but not regrow until below a max)
-                if (cell.resource.amount < self.configs["parameters"]["MAX_WOOD_AMOUNT"]):
+                if (cell.resource.amount < maxWoodAmount):
+                    if undoLog is not None:
+                        undoLog.append((RESOURCE, cell, cell.resource.amount))
                     cell.resource.amount = math.ceil(
                         min(
-                            cell.resource.amount * self.configs["parameters"]["WOOD_GROWTH_RATE"],
-                            self.configs["parameters"]["MAX_WOOD_AMOUNT"]
+                            cell.resource.amount * woodGrowthRate,
+                            maxWoodAmount
                         )
                     )
 
@@ -711,89 +1140,49 @@ class Game:
         * `origcell` and then deleting that mapping, and then recursively reverting the actions mapped from `origcell`
         *
         */
+        The recursive revert is done iteratively by resolveMoves(), in O(moves).
         """
-        cellsToActionsToThere = {}
+        # Cells are identified by their integer index y * width + x
+        width = self.map.width
+        origins = []
+        destinations = []
+        movingActions = []
         movingUnits = set()
-
         for action in actions:
-            newcell = self.map.getCellByPos(
-                self.getUnit(action.team, action.unitid).pos.translate(action.direction, 1)
-            )
-            if newcell != None:
-                #newcell = action.newcell
-                if newcell in cellsToActionsToThere:
-                    cellsToActionsToThere[newcell] += [action]
-                else:
-                    cellsToActionsToThere[newcell] = [action]
-                
+            pos = self.getUnit(action.team, action.unitid).pos
+            newpos = pos.translate(action.direction, 1)
+            if self.map.inMap(newpos):
+                origins.append(pos.y * width + pos.x)
+                destinations.append(newpos.y * width + newpos.x)
+                movingActions.append(action)
                 movingUnits.add(action.unitid)
 
-        def revertAction(action):
-            # reverts a given action such that cellsToActionsToThere has no collisions due to action and all related actions
-            self.log(f"turn {{self.state['turn']}} Unit {{action.unitid}} collided when trying to move {{action.direction}} to ({{action.newcell.pos.x}}, {{action.newcell.pos.y}})")
-            
-            origcell = self.map.getCellByPos(
-                self.getUnit(action.team, action.unitid).pos
-            )
+        cells = self.map.cells
 
-            # get the colliding actions caused by a revert of the given action and then delete them from the mapped origcell provided it is not a city tile
-            collidingActions = cellsToActionsToThere[origcell] if origcell in cellsToActionsToThere else None
-            if (not origcell.isCityTile()):
-                if (collidingActions is not None):
-                    cellsToActionsToThere.pop(origcell)
-
-                    # for each colliding action, revert it.
-                    for collidingAction in collidingActions:
-                        revertAction(collidingAction)
-
-        actionedCells = list(cellsToActionsToThere.keys())
-        for cell in actionedCells:
-            if cell in cellsToActionsToThere:
-                currActions = cellsToActionsToThere[cell]
-                actionsToRevert = []
-                if (currActions != None):
-                    if (len(currActions) > 1):
-                        # only revert actions that are going to the same tile that is not a city
-                        # if going to the same city tile, we know those actions are from same team units, and is allowed
-                        if (not cell.isCityTile()):
-                            actionsToRevert += currActions
-                    elif (len(currActions) == 1):
-                        # if there is just one move action, check there isn't a unit on there that is not moving and not a city tile
-                        action = currActions[0]
-                        if (not cell.isCityTile()):
-                            if (len(cell.units) == 1):
-                                unitThereIsStill = True
-                                for unit in cell.units.values():
-                                    if (unit.id in movingUnits):
-                                        unitThereIsStill = False
-                                if (unitThereIsStill):
-                                    actionsToRevert.append(action)
-            
-            # if there are collisions, revert those actions and remove the mapping
-            for action in actionsToRevert:
-                revertAction(action)
-            for action in actionsToRevert:
-                newcell = self.map.getCellByPos(
-                    self.getUnit(action.team, action.unitid).pos.translate(action.direction, 1)
-                )
-                if newcell in cellsToActionsToThere:
-                    cellsToActionsToThere.pop(newcell)
-        
-        prunedActions = []
-        for currActions in cellsToActionsToThere.values():
-            prunedActions += currActions
+        def isCityTile(index):
+            return cells[index].isCityTile()
+
+        def hasStillUnit(index):
+            # if there is just one unit there, check it is not moving
+            units = cells[index].units
+            return len(units) == 1 and next(iter(units)) not in movingUnits
 
-        return prunedActions
+        return [movingActions[i] for i in resolveMoves(origins, destinations, isCityTile, hasStillUnit)]
         
 
+    def getDistanceIndex(self):
+        """
+        Returns the DistanceIndex of the game, with the distances from every cell to the nearest resources, cities
+        and units of the current turn.
+        """
+        return self.distanceIndex
+
     def isNight(self):
         """
         Is it night.
         Implements src/Game/index.ts -> Game.isNight()
         """
-        dayLength = self.configs["parameters"]["DAY_LENGTH"]
-        cycleLength = dayLength + self.configs["parameters"]["NIGHT_LENGTH"]
-        return (self.state["turn"] % cycleLength) >= dayLength
+        return self.params.isNight(self.state["turn"])
     
     def toStateObject(self):
         """
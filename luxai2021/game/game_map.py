@@ -2,11 +2,15 @@ from .unit import Cart
 from .actions import UNIT_TYPES
 import math
 import random
+from operator import itemgetter
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 from typing import List
 from .cell import Cell
-from .position import Position
+from .position import getPosition
 
 from .constants import Constants
+from .codes import RESOURCE_INDEX
 
 DIRECTIONS = Constants.DIRECTIONS
 RESOURCE_TYPES = Constants.RESOURCE_TYPES
@@ -36,17 +40,104 @@ def sign(value):
         return -1
     return 0
 
+# Force of a resource at each offset of the resource gravitation window, in src/ kernelForce() loop order
+KERNEL_SIZE = 5
+
+def _kernelForceTable(axis):
+    forces = []
+    for oy in range(-KERNEL_SIZE, KERNEL_SIZE):
+        for ox in range(-KERNEL_SIZE, KERNEL_SIZE):
+            delta = [-ox, -oy][axis]
+            mdist = abs(ox) + abs(oy)
+            forces.append(math.pow(delta/mdist, 2) * sign(delta) if delta != 0 else 0.0)
+    return np.array(forces)
+
+KERNEL_FORCES_X = _kernelForceTable(0)
+KERNEL_FORCES_Y = _kernelForceTable(1)
+
+def _singleGetter(index):
+    return lambda cells: (cells[index],)
+
+_neighbourTables = {} # (width, height) -> neighbour tables, see getNeighbourTable()
+
+def getNeighbourTable(width, height):
+    '''
+    Returns the neighbour tables of a map size, computed once per size.
+    Entry y * width + x of the first table is the tuple of the indices of the cells north, east, south and west of
+    (x, y) that are in the map, in that order. The second table has getters that pick these cells out of a flat
+    list of cells as a tuple.
+    '''
+    if (width, height) not in _neighbourTables:
+        table = []
+        for y in range(height):
+            for x in range(width):
+                neighbours = []
+                if y > 0: neighbours.append((y - 1) * width + x)
+                if x < width - 1: neighbours.append(y * width + x + 1)
+                if y < height - 1: neighbours.append((y + 1) * width + x)
+                if x > 0: neighbours.append(y * width + x - 1)
+                table.append(tuple(neighbours))
+        getters = tuple(itemgetter(*neighbours) if len(neighbours) > 1 else _singleGetter(neighbours[0])
+                        for neighbours in table)
+        _neighbourTables[(width, height)] = (tuple(table), getters)
+    return _neighbourTables[(width, height)]
+
+class ResourceIndex:
+    '''
+    Live set of resource cells, iterated in the order the cells were added.
+    Membership, removal and counts are O(1).
+    '''
+    def __init__(self):
+        self.cells = {} # cell -> None, dicts keep insertion order
+
+    def add(self, cell):
+        self.cells[cell] = None
+
+    def remove(self, cell):
+        self.cells.pop(cell, None)
+
+    def __contains__(self, cell):
+        return cell in self.cells
+
+    def __iter__(self):
+        return iter(self.cells)
+
+    def __len__(self):
+        return len(self.cells)
+
 '''Implements /src/GameMap/index.ts'''
 class GameMap:
-    def __init__(self, configs):
+    def __init__(self, configs, params):
         self.configs = configs
-        self.resources = []
+        self.params = params # GameParams of the game, shared by the cells
+        self.roadCells = set() # cells whose road may have been changed from MIN_ROAD
+        self.resources = ResourceIndex()
         self.resources_by_type = {
-                                    Constants.RESOURCE_TYPES.WOOD : [],
-                                    Constants.RESOURCE_TYPES.COAL : [],
-                                    Constants.RESOURCE_TYPES.URANIUM : [],
+                                    Constants.RESOURCE_TYPES.WOOD : ResourceIndex(),
+                                    Constants.RESOURCE_TYPES.COAL : ResourceIndex(),
+                                    Constants.RESOURCE_TYPES.URANIUM : ResourceIndex(),
                                 }
 
+    def createCells(self, size):
+        ''' Creates the empty map tiles of a map of the given size '''
+        if ("width" not in self.configs):
+            self.configs["width"] = size
+        
+        if ("height" not in self.configs):
+            self.configs["height"] = size
+
+        self.width = size
+        self.height = size
+        
+        # Create map tiles, as a flat list indexed by y * width + x. The rows of self.map hold the same cells
+        self.setCells([Cell(x, y, self.params) for y in range(self.height) for x in range(self.width)])
+
+    def setCells(self, cells):
+        ''' Sets the flat list of map tiles, and builds the rows and neighbours of the cells from it '''
+        self.cells: List[Cell] = cells
+        self.map: List[List[Cell]] = [cells[y * self.width:(y + 1) * self.width] for y in range(self.height)]
+        self.neighbours, self.neighbourGetters = getNeighbourTable(self.width, self.height)
+
     def generateMap(self, game):
         ''' Initialize the random map '''
         '''Implements /src/Game/gen.ts'''
@@ -57,21 +148,7 @@ class GameMap:
             rng = random.Random()
         
         size = mapSizes[math.floor(rng.random() * len(mapSizes))]
-        if ("width" not in self.configs):
-            self.configs["width"] = size
-        
-        if ("height" not in self.configs):
-            self.configs["height"] = size
-
-        self.width = size
-        self.height = size
-        
-        # Create map tiles
-        self.map: List[List[Cell]] = [None] * self.height
-        for y in range(0, self.height):
-            self.map[y] = [None] * self.width
-            for x in range(0, self.width):
-                self.map[y][x] = Cell(x, y, self.configs)
+        self.createCells(size)
 
         if (self.configs["mapType"] == Constants.MAP_TYPES.EMPTY):
             return
@@ -148,7 +225,7 @@ class GameMap:
                 else:
                     nx2 = self.width - nx - 1
                 
-                if not self.inMap(Position(nx, ny)) or not self.inMap(Position(nx2, ny2)):
+                if not self.inMap(getPosition(nx, ny)) or not self.inMap(getPosition(nx2, ny2)):
                     continue
                 
                 if not self.getCell(nx, ny).hasResource() and self.getCell(nx, ny).citytile == None:
@@ -285,57 +362,64 @@ class GameMap:
         return arr
 
     def _simulateGOL(self, arr, options):
+        '''
+        Runs a round of the Game of Life on the inner cells of arr, in place.
+        As in src/, cells are updated in row-major order, so a cell counts the new state of its neighbours above
+        and to its left and the old state of the others. The neighbours above and below are summed per column
+        for a whole row at once, then the row is swept left to right carrying the state of the left neighbour.
+        '''
         # high birthlimit = unlikely to deviate from initial random spots
         # high deathlimit = lots of patches die
         padding = 1
         deathLimit = options["deathLimit"]
         birthLimit = options["birthLimit"]
         for i in range( padding, len(arr) - padding ):
-            for j in range( padding, len(arr[0]) - padding ):
-                alive = 0
-                for k in range( len(MOVE_DELTAS) ):
-                    delta = MOVE_DELTAS[k]
-                    ny = i + delta[1]
-                    nx = j + delta[0]
-                    if (arr[ny][nx] == 1):
-                        alive += 1
-                
-                if (arr[i][j] == 1):
-                    if (alive < deathLimit):
-                        arr[i][j] = 0
-                    else:
-                        arr[i][j] = 1
+            row = arr[i]
+            columns = [above + below for above, below in zip(arr[i - 1], arr[i + 1])]
+            left = row[0]
+            for j in range( padding, len(row) - padding ):
+                alive = columns[j - 1] + columns[j] + columns[j + 1] + left + row[j + 1]
+                if (row[j] == 1):
+                    left = 0 if alive < deathLimit else 1
                 else:
-                    if (alive > birthLimit):
-                        arr[i][j] = 1
-                    else:
-                        arr[i][j] = 0
+                    left = 1 if alive > birthLimit else 0
+                row[j] = left
         
         return arr
 
 
-    def _kernelForce(self, resourcesMap, rx, ry):
-        force = [0, 0]
-        resource = resourcesMap[ry][rx]
-        kernelSize = 5
+    def _kernelForces(self, resourcesMap):
+        '''
+        Computes the force of src/ kernelForce() on every resource of resourcesMap at once.
+        Each resource in a 10x10 window around a resource pulls it if it has the same type, and pushes it otherwise.
+        The window offsets are added one at a time in the order of the cell by cell loop, and empty cells add an
+        exact zero, so the forces are the same floats and seeded maps do not change.
+        Returns:
+            Lists of the x and y positions of the resources in row-major order, and arrays of their x and y forces
+        '''
+        height = len(resourcesMap)
+        width = len(resourcesMap[0])
+
+        # resource types as integers, -1 for empty cells, padded so every window fits in the array
+        types = np.full((height + 2 * KERNEL_SIZE, width + 2 * KERNEL_SIZE), -1, dtype=np.int64)
+        for y, row in enumerate(resourcesMap):
+            for x, res in enumerate(row):
+                if (res != None):
+                    types[y + KERNEL_SIZE, x + KERNEL_SIZE] = RESOURCE_INDEX[res["type"]]
+        ys, xs = np.nonzero(types[KERNEL_SIZE:KERNEL_SIZE + height, KERNEL_SIZE:KERNEL_SIZE + width] >= 0)
+        centers = types[ys + KERNEL_SIZE, xs + KERNEL_SIZE]
 
-        for y in range(ry - kernelSize, ry + kernelSize):
-            for x in range(rx - kernelSize, rx + kernelSize):
-                if (x < 0 or y < 0 or x >= len(resourcesMap[0]) or y >= len(resourcesMap)): continue
+        # window of each resource, one row per offset in loop order
+        windows = sliding_window_view(types, (2 * KERNEL_SIZE, 2 * KERNEL_SIZE))[ys, xs]
+        others = np.ascontiguousarray(windows.reshape(len(ys), -1).T)
+        # +1 pushes away from resources of another type, -1 pulls towards the same type, 0 for empty cells
+        direction = np.where(others < 0, 0.0, np.where(others == centers, -1.0, 1.0))
 
-                r2 = resourcesMap[y][x]
-                if (r2 != None):
-                    dx = rx - x
-                    dy = ry - y
-                    mdist = abs(dx) + abs(dy)
-                    if (r2["type"] != resource["type"]):
-                        if (dx != 0): force[0] += math.pow(dx/mdist, 2) * sign(dx)
-                        if (dy != 0): force[1] += math.pow(dy/mdist, 2) * sign(dy)
-                    else:
-                        if (dx != 0): force[0] -= math.pow(dx/mdist, 2) * sign(dx)
-                        if (dy != 0): force[1] -= math.pow(dy/mdist, 2) * sign(dy)
-        
-        return force
+        # a running sum over the offsets adds them in order, where sum() could pair them up
+        forceX = np.cumsum(direction * KERNEL_FORCES_X[:, None], axis=0)[-1]
+        forceY = np.cumsum(direction * KERNEL_FORCES_Y[:, None], axis=0)[-1]
+
+        return ys.tolist(), xs.tolist(), forceX, forceY
 
 
     def _gravitateResources(self, resourcesMap):
@@ -344,72 +428,56 @@ class GameMap:
         # 
         # Add's a force direction to each cell.
         #
-        newResourcesMap = []
-        for y in range(len(resourcesMap)):
-            newResourcesMap.append([])
-            for x in range(len(resourcesMap[y])):
-                newResourcesMap[y].append(None)
-                res = resourcesMap[y][x]
-                if (res != None):
-                    f = self._kernelForce(resourcesMap, x, y)
-                    resourcesMap[y][x]["force"] = f
+        ys, xs, forceX, forceY = self._kernelForces(resourcesMap)
+        stepsX = np.sign(forceX).astype(np.int64).tolist()
+        stepsY = np.sign(forceY).astype(np.int64).tolist()
 
+        newResourcesMap = []
         for y in range(len(resourcesMap)):
-            for x in range(len(resourcesMap[y])):
-                res = resourcesMap[y][x]
-                if (res != None):
-                    nx = x + sign(res["force"][0])*1
-                    ny = y + sign(res["force"][1])*1
-                    if (nx < 0): nx = 0
-                    if (ny < 0): ny = 0
-                    if (nx >= len(resourcesMap[0])): nx = len(resourcesMap[0])-1
-                    if (ny >= len(resourcesMap)): ny = len(resourcesMap) - 1
-                    if (newResourcesMap[ny][nx] == None):
-                        newResourcesMap[ny][nx] = res
-                    else:
-                        newResourcesMap[y][x] = res
+            newResourcesMap.append([None] * len(resourcesMap[y]))
+
+        for y, x, stepX, stepY in zip(ys, xs, stepsX, stepsY):
+            res = resourcesMap[y][x]
+            nx = x + stepX
+            ny = y + stepY
+            if (nx < 0): nx = 0
+            if (ny < 0): ny = 0
+            if (nx >= len(resourcesMap[0])): nx = len(resourcesMap[0])-1
+            if (ny >= len(resourcesMap)): ny = len(resourcesMap) - 1
+            if (newResourcesMap[ny][nx] == None):
+                newResourcesMap[ny][nx] = res
+            else:
+                newResourcesMap[y][x] = res
         
         return newResourcesMap
 
     def addResource(self, x, y, resourceType, amount):
         cell = self.getCell(x, y)
         cell.setResource(resourceType, amount)
-        self.resources.append(cell)
-        self.resources_by_type[resourceType].append(cell)
+        self.resources.add(cell)
+        self.resources_by_type[resourceType].add(cell)
         return cell
 
+    def removeResource(self, cell):
+        ''' Drops a depleted resource cell from the resource index '''
+        self.resources.remove(cell)
+        self.resources_by_type[cell.resource.type].remove(cell)
+
     def getCellByPos(self, pos) -> Cell:
-        if pos.y >= len(self.map) or pos.x >= len(self.map[0]) or pos.y < 0 or pos.x < 0:
+        if pos.x < 0 or pos.y < 0 or pos.x >= self.width or pos.y >= self.height:
             return None
-        return self.map[pos.y][pos.x]
+        return self.cells[pos.y * self.width + pos.x]
         
 
     def getCell(self, x, y) -> Cell:
-        return self.map[y][x]
+        return self.cells[y * self.width + x]
     
     def getRow(self, y):
         return self.map[y]
     
     def getAdjacentCells(self, cell):
-        cells = []
-
-        # NORTH
-        if cell.pos.y > 0:
-            cells.append(self.getCell(cell.pos.x, cell.pos.y - 1))
-        
-        # EAST
-        if cell.pos.x < self.width - 1:
-            cells.append(self.getCell(cell.pos.x + 1, cell.pos.y))
-        
-        # SOUTH
-        if cell.pos.y < self.height - 1:
-            cells.append(self.getCell(cell.pos.x, cell.pos.y + 1))
-        
-        # WEST
-        if cell.pos.x > 0:
-            cells.append(self.getCell(cell.pos.x - 1, cell.pos.y))
-        
-        return cells
+        ''' Returns the tuple of the cells north, east, south and west of cell that are in the map '''
+        return self.neighbourGetters[cell.pos.y * self.width + cell.pos.x](self.cells)
     
     def inMap(self, pos):
         return not (pos.x < 0 or pos.y < 0 or pos.x >= self.width or pos.y >= self.height )
@@ -0,0 +1,165 @@
+'''
+Undo log of a journaled turn, see Game.runTurnWithActions(journal=True) and Game.undoTurn().
+The mutators of the object engine append an entry with the previous value of what they are about to change, and
+undoTurn() replays the entries in reverse, so undoing a turn costs as much as what the turn changed. Keys removed
+from the ordered collections (units of a team, cities, resource indices) are recorded with their ordinal position,
+which is found by a scan that copies nothing. The order of such a collection is only rebuilt when a key that was
+not the last one is put back.
+'''
+from operator import indexOf
+
+from .city import CitySet
+
+# Entries are tuples starting with one of these codes
+MOVE = 0 # (MOVE, unit, fromCell, units of fromCell in order if it had several, else None)
+CARGO = 1 # (CARGO, unit, wood, coal, uranium)
+RESOURCE = 2 # (RESOURCE, cell, amount)
+REMOVE_RESOURCE = 3 # (REMOVE_RESOURCE, cell, position in the resource index, position in the index of its type)
+ROAD = 4 # (ROAD, cell, road, whether the cell was in the roadCells)
+COOLDOWN = 5 # (COOLDOWN, actionable, cooldown)
+FUEL = 6 # (FUEL, city, fuel)
+SPAWN_UNIT = 7 # (SPAWN_UNIT, unit, cell)
+DESTROY_UNIT = 8 # (DESTROY_UNIT, unit, position in the units of its team, cell, units of the cell in order)
+SPAWN_CITY_TILE = 9 # (SPAWN_CITY_TILE, cell, new city or None, [(merged city, position in the cities)], cities)
+DESTROY_CITY = 10 # (DESTROY_CITY, city, position in the cities, [(cell, citytile, road)])
+
+
+def position(items, key):
+    ''' Ordinal position of key in the ordered dict items, recorded before removing it '''
+    return indexOf(items, key)
+
+
+def reinsert(items, key, value, position):
+    ''' Puts key back at its ordinal position in the ordered dict items '''
+    if position == len(items):
+        items[key] = value
+        return
+    entries = list(items.items())
+    entries.insert(position, (key, value))
+    items.clear()
+    items.update(entries)
+
+
+class Snapshot:
+    '''
+    State of a game between turns, see Game.snapshot(). With the object engine it is a position in the history of
+    undo logs of the game, with the array engine a copy of the whole state.
+    '''
+    __slots__ = ("history", "depth", "last", "state", "__weakref__")
+
+    def __init__(self, history, state = None):
+        self.history = history # undo logs of the turns run since the oldest held snapshot
+        self.depth = len(history)
+        self.last = history[-1] if len(history) > 0 else None # log of the turn before, to tell it was not undone
+        self.state = state
+
+    def reachable(self, history):
+        ''' Whether the game can get back to the snapshot by undoing the turns of history '''
+        return (
+            history is self.history and len(history) >= self.depth and
+            (self.depth == 0 or history[self.depth - 1] is self.last)
+        )
+
+
+def cityState(city):
+    ''' Entry of the cities of SPAWN_CITY_TILE, what spawning a tile next to the city can change '''
+    citycells = list(city.citycells)
+    return city, city.fuel, city.adjacencyBonus, citycells, [cell.citytile.adjacentCityTiles for cell in citycells]
+
+
+def turnHeader(game):
+    ''' Scalar state of the game before a turn, the first entry of its log '''
+    return (
+        game.state["turn"],
+        game.globalCityIDCount,
+        game.globalUnitIDCount,
+        {
+            team: (teamState["researchPoints"], dict(teamState["researched"]))
+            for team, teamState in game.state["teamStates"].items()
+        },
+        {
+            team: dict(teamStats, resourcesCollected=dict(teamStats["resourcesCollected"]))
+            for team, teamStats in game.stats["teamStats"].items()
+        },
+        {team: dict(counters) for team, counters in game.counters.items()},
+    )
+
+
+def undoLog(game, log):
+    '''
+    Rolls the game back to the state before the turn of log, by replaying its entries in reverse.
+    '''
+    gameMap = game.map
+    for i in range(len(log) - 1, 0, -1):
+        entry = log[i]
+        code = entry[0]
+        if code == COOLDOWN:
+            entry[1].cooldown = entry[2]
+        elif code == CARGO:
+            cargo = entry[1].cargo
+            cargo["wood"] = entry[2]
+            cargo["coal"] = entry[3]
+            cargo["uranium"] = entry[4]
+        elif code == RESOURCE:
+            entry[1].resource.amount = entry[2]
+        elif code == FUEL:
+            entry[1].fuel = entry[2]
+        elif code == MOVE:
+            unit, fromCell, fromUnits = entry[1], entry[2], entry[3]
+            gameMap.getCellByPos(unit.pos).units.pop(unit.id)
+            unit.pos = fromCell.pos
+            if fromUnits is None:
+                fromCell.units[unit.id] = unit
+            else:
+                fromCell.units.clear()
+                fromCell.units.update((other.id, other) for other in fromUnits)
+        elif code == ROAD:
+            cell = entry[1]
+            cell.road = entry[2]
+            if not entry[3]:
+                gameMap.roadCells.discard(cell)
+        elif code == REMOVE_RESOURCE:
+            cell = entry[1]
+            reinsert(gameMap.resources.cells, cell, None, entry[2])
+            reinsert(gameMap.resources_by_type[cell.resource.type].cells, cell, None, entry[3])
+        elif code == SPAWN_UNIT:
+            unit, cell = entry[1], entry[2]
+            cell.units.pop(unit.id)
+            game.state["teamStates"][unit.team]["units"].pop(unit.id)
+        elif code == DESTROY_UNIT:
+            unit, cell, cellUnits = entry[1], entry[3], entry[4]
+            reinsert(game.state["teamStates"][unit.team]["units"], unit.id, unit, entry[2])
+            cell.units.clear()
+            cell.units.update(cellUnits)
+        elif code == SPAWN_CITY_TILE:
+            cell, newCity, mergedCities, cityStates = entry[1], entry[2], entry[3], entry[4]
+            cell.citytile = None
+            if newCity is not None:
+                game.cities.pop(newCity.id)
+            for city, cityPosition in reversed(mergedCities):
+                reinsert(game.cities, city.id, city, cityPosition)
+            for city, fuel, adjacencyBonus, citycells, adjacentCityTiles in cityStates:
+                city.fuel = fuel
+                city.adjacencyBonus = adjacencyBonus
+                city.citycells = citycells
+                city.citySet = CitySet(city)
+                for citycell, adjacent in zip(citycells, adjacentCityTiles):
+                    citycell.citytile.citySet = city.citySet
+                    citycell.citytile.adjacentCityTiles = adjacent
+        elif code == DESTROY_CITY:
+            city = entry[1]
+            reinsert(game.cities, city.id, city, entry[2])
+            for cell, citytile, road in entry[3]:
+                cell.citytile = citytile
+                cell.road = road
+
+    turn, globalCityIDCount, globalUnitIDCount, research, stats, counters = log[0]
+    game.state["turn"] = turn
+    game.globalCityIDCount = globalCityIDCount
+    game.globalUnitIDCount = globalUnitIDCount
+    for team, (researchPoints, researched) in research.items():
+        game.state["teamStates"][team]["researchPoints"] = researchPoints
+        game.state["teamStates"][team]["researched"] = researched
+    game.stats["teamStats"] = stats
+    game.counters = counters
+    game.depletedResources = []
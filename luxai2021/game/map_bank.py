@@ -0,0 +1,161 @@
+'''
+Bank of pregenerated maps, so Game.reset() can load the map of a seed instead of generating it.
+
+The bank is a single binary file:
+    header: magic and number of maps
+    index: one record per map, sorted by seed
+    resources: the resources of every map, in the order they were added to the map
+The file is memory-mapped read only, so the processes that use a bank share it through the page cache.
+
+To generate a bank for seeds 0 to 9999 with 8 processes:
+    python -m luxai2021.game.map_bank maps.bin --start 0 --count 10000 --processes 8
+'''
+import argparse
+import mmap
+import multiprocessing
+import struct
+
+import numpy as np
+
+from .constants import Constants
+from .codes import RESOURCE_INDEX, RESOURCE_NAMES
+from .game_map import SYMMETRY
+
+MAGIC = b"LUXMAPS1"
+HEADER = struct.Struct("<8sQ")
+INDEX_DTYPE = np.dtype([
+    ("seed", "<i8"),
+    ("offset", "<u4"), # first resource of the map
+    ("count", "<u4"), # number of resources of the map
+    ("size", "u1"),
+    ("symmetry", "u1"),
+    ("spawnAX", "u1"),
+    ("spawnAY", "u1"),
+    ("spawnBX", "u1"),
+    ("spawnBY", "u1"),
+    ("padding", "u1", 2),
+])
+RESOURCE_DTYPE = np.dtype([
+    ("x", "u1"),
+    ("y", "u1"),
+    ("type", "u1"),
+    ("padding", "u1"),
+    ("amount", "<u2"),
+])
+
+_openBanks = {} # path -> MapBank, banks are opened once per process
+
+
+def _generateEntry(seed):
+    ''' Generates the map of a seed, returning its index fields and its resources '''
+    # Imported here as game imports this module
+    from .game import Game
+    game = Game({
+        "seed": seed,
+        "mapType": Constants.MAP_TYPES.RANDOM,
+        "mapBank": None,
+        "engine": Constants.ENGINE_TYPES.OBJECT,
+    })
+    gameMap = game.map
+    spawnA = list(game.getTeamsUnits(Constants.TEAM.A).values())[0].pos
+    spawnB = list(game.getTeamsUnits(Constants.TEAM.B).values())[0].pos
+    symmetry = SYMMETRY.HORIZONTAL if spawnA.x == spawnB.x else SYMMETRY.VERTICAL
+    resources = [
+        (cell.pos.x, cell.pos.y, RESOURCE_INDEX[cell.resource.type], 0, cell.resource.amount)
+        for cell in gameMap.resources
+    ]
+    return (seed, gameMap.width, symmetry, spawnA.x, spawnA.y, spawnB.x, spawnB.y), resources
+
+
+def generateMapBank(path, seeds, processes = None):
+    '''
+    Generates the maps of the seeds with a pool of processes, and writes them to a bank file.
+    Args:
+        path: File to write.
+        seeds: Seeds of the maps.
+        processes: Number of processes, by default one per CPU.
+    '''
+    seeds = sorted(set(seeds))
+    with multiprocessing.Pool(processes) as pool:
+        entries = pool.map(_generateEntry, seeds, chunksize=16)
+
+    index = np.zeros(len(entries), dtype=INDEX_DTYPE)
+    resources = []
+    for i, ((seed, size, symmetry, spawnAX, spawnAY, spawnBX, spawnBY), mapResources) in enumerate(entries):
+        index[i] = (seed, len(resources), len(mapResources), size, symmetry, spawnAX, spawnAY, spawnBX, spawnBY, 0)
+        resources += mapResources
+
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(index)))
+        f.write(index.tobytes())
+        f.write(np.array(resources, dtype=RESOURCE_DTYPE).tobytes())
+
+
+class MapBank:
+    def __init__(self, path):
+        '''
+        Opens a bank file written by generateMapBank(). Use MapBank.open() to share one instance per process.
+        '''
+        self.path = path
+        with open(path, "rb") as f:
+            self.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, count = HEADER.unpack_from(self.mmap, 0)
+        if magic != MAGIC:
+            raise Exception("%s is not a map bank." % path)
+        self.index = np.frombuffer(self.mmap, dtype=INDEX_DTYPE, count=count, offset=HEADER.size)
+        self.resources = np.frombuffer(self.mmap, dtype=RESOURCE_DTYPE, offset=HEADER.size + self.index.nbytes)
+        self.seeds = self.index["seed"]
+
+    @staticmethod
+    def open(path):
+        if path not in _openBanks:
+            _openBanks[path] = MapBank(path)
+        return _openBanks[path]
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, seed):
+        return self._find(seed) is not None
+
+    def _find(self, seed):
+        i = int(np.searchsorted(self.seeds, seed))
+        if i < len(self.seeds) and self.seeds[i] == seed:
+            return i
+        return None
+
+    def loadMap(self, game, seed):
+        '''
+        Loads the map of a seed into game.map, with the same spawns GameMap.generateMap() makes.
+        Returns:
+            False if the seed is not in the bank
+        '''
+        i = self._find(seed)
+        if i is None:
+            return False
+        entry = self.index[i]
+        game.map.createCells(int(entry["size"]))
+
+        resources = self.resources[entry["offset"]:entry["offset"] + entry["count"]]
+        for x, y, resourceType, amount in zip(
+            resources["x"].tolist(), resources["y"].tolist(), resources["type"].tolist(), resources["amount"].tolist()
+        ):
+            game.map.addResource(x, y, RESOURCE_NAMES[resourceType], amount)
+
+        game.spawnWorker(Constants.TEAM.A, int(entry["spawnAX"]), int(entry["spawnAY"]))
+        game.spawnCityTile(Constants.TEAM.A, int(entry["spawnAX"]), int(entry["spawnAY"]))
+        game.spawnWorker(Constants.TEAM.B, int(entry["spawnBX"]), int(entry["spawnBY"]))
+        game.spawnCityTile(Constants.TEAM.B, int(entry["spawnBX"]), int(entry["spawnBY"]))
+        return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Pregenerates the maps of a range of seeds into a map bank.')
+    parser.add_argument('path', help='Map bank file to write', type=str)
+    parser.add_argument('--start', help='First seed', type=int, default=0)
+    parser.add_argument('--count', help='Number of seeds', type=int, default=10000)
+    parser.add_argument('--processes', help='Number of processes, one per CPU by default', type=int)
+    args = parser.parse_args()
+
+    generateMapBank(args.path, range(args.start, args.start + args.count), args.processes)
+    print("Wrote %i maps to %s" % (args.count, args.path))
@@ -73,6 +73,36 @@ class MatchController():
             print("Critical error in logging")
         
 
+    def getActionableEntities(self, team):
+        """
+        Returns the units and the city tiles of a team that can act this turn, in the order they are controlled.
+        """
+        units = [unit for unit in self.game.state["teamStates"][team]["units"].values() if unit.canAct()]
+        citytiles = []
+        for city in self.game.cities.values():
+            if city.team == team:
+                for cell in city.citycells:
+                    if cell.citytile.canAct():
+                        citytiles.append(cell.citytile)
+        return units, citytiles
+
+    def runTurn(self):
+        """
+        Plays the turn with the buffered actions.
+        Returns: True if the match is over
+        """
+        try:
+            gameOver = self.game.runTurnWithActions(self.actionBuffer)
+        except Exception as e:
+            # Log exception
+            self.logError("ERROR: Critical error occurred in turn simulation.")
+            self.logError(repr(e))
+            self.logError( ''.join(traceback.format_exception(None, e, e.__traceback__)) )
+            raise GameStepFailedException("Critical error occurred in turn simulation.")
+
+        self.actionBuffer = []
+        return gameOver
+
     def runToNextObservation(self):
         """ 
             Generator function that gets the observation at the next Unit/City
@@ -92,39 +122,41 @@ class MatchController():
                     newTurn = True
                     startTime = time.time()
 
-                    units = self.game.state["teamStates"][agent.team]["units"].values()
+                    units, citytiles = self.getActionableEntities(agent.team)
                     for unit in units:
-                        if unit.canAct():
-                            # RL training agent that is controlling the simulation
-                            # The enviornment then handles this unit, and calls take_action() to buffer a requested action
-                            yield (unit, None, unit.team, newTurn)
-                            newTurn = False
+                        # RL training agent that is controlling the simulation
+                        # The enviornment then handles this unit, and calls take_action() to buffer a requested action
+                        yield (unit, None, unit.team, newTurn)
+                        newTurn = False
                     
-                    cities = self.game.cities.values()
-                    for city in cities:
-                        if city.team == agent.team:
-                            for cell in city.citycells:
-                                citytile = cell.citytile
-                                if citytile.canAct():
-                                    # RL training agent that is controlling the simulation
-                                    # The enviornment then handles this city, and calls take_action() to buffer a requested action
-                                    yield (None, citytile, citytile.team, newTurn)
-                                    newTurn = False
+                    for citytile in citytiles:
+                        # RL training agent that is controlling the simulation
+                        # The enviornment then handles this city, and calls take_action() to buffer a requested action
+                        yield (None, citytile, citytile.team, newTurn)
+                        newTurn = False
                     
                     timeTaken = time.time() - startTime
                     if timeTaken > 0.5: # Warn if larger than 0.5 seconds.
                         print("WARNING: Turn took %.3f seconds for computing actions. Limit is 1 second." % (timeTaken))
             
             # Now let the game actually process the requested actions and play the turn
-            try:
-                gameOver = self.game.runTurnWithActions(self.actionBuffer)
-            except Exception as e:
-                # Log exception
-                self.logError("ERROR: Critical error occurred in turn simulation.")
-                self.logError(repr(e))
-                self.logError( ''.join(traceback.format_exception(None, e, e.__traceback__)) )
-                raise GameStepFailedException("Critical error occurred in turn simulation.")
+            gameOver = self.runTurn()
 
-            
-            self.actionBuffer = []
+    def runToNextTurn(self):
+        """
+            Generator function that gets all the Units/Cities of the learning agent to be controlled this turn at once.
+            Turns where none of them can act are played without yielding.
+            Returns: tuple (units, citytiles, team), the environment buffers the actions of all of them before resuming
+        """
+        gameOver = False
+        while not gameOver:
+            for agent in self.agents:
+                if agent.getAgentType() == Constants.AGENT_TYPE.AGENT:
+                    actions = agent.processTurn(self.game, agent.team)
+                    self.takeActions(actions)
+                elif agent.getAgentType() == Constants.AGENT_TYPE.LEARNING:
+                    units, citytiles = self.getActionableEntities(agent.team)
+                    if len(units) > 0 or len(citytiles) > 0:
+                        yield (units, citytiles, agent.team)
 
+            gameOver = self.runTurn()
@@ -0,0 +1,87 @@
+'''
+Collision resolution for unit moves, shared by Game and ArrayState.
+Implements the pruning of src/Game/index.ts -> Game.handleMovementActions()
+'''
+import numpy as np
+
+
+def resolveMoves(origins, destinations, isCityTile, hasStillUnit):
+    '''
+    Finds the moves that can all be executed with no collisions.
+
+    Moves into a cell that is not a city tile bump if several units move there, or if a single unit that is not
+    moving stands there. Bumped moves are reverted, which leaves their units on their cells, so the moves into
+    those cells are reverted as well unless they are city tiles. The reverts are followed with a worklist, so
+    each cell is handled once and chains of moves of any length never recurse.
+
+    Args:
+        origins: Integer cell index of the unit of each move.
+        destinations: Integer cell index each move goes to, inside the map.
+        isCityTile: Function of a cell index, True if the cell is a city tile.
+        hasStillUnit: Function of a cell index, True if exactly one unit is on the cell and it is not moving.
+    Returns:
+        Indices of the moves that are kept, grouped by destination in order of first appearance.
+    '''
+    movesToCell = {} # destination -> indices of the moves into it
+    for i, destination in enumerate(destinations):
+        if destination in movesToCell:
+            movesToCell[destination].append(i)
+        else:
+            movesToCell[destination] = [i]
+
+    # cells where units bump into each other, or into a unit that stays put
+    bumped = [
+        cell for cell, moves in movesToCell.items()
+        if not isCityTile(cell) and (len(moves) > 1 or hasStillUnit(cell))
+    ]
+
+    # reverting a move leaves that unit on its cell, so moves into that cell are reverted as well
+    reverted = set()
+    while bumped:
+        cell = bumped.pop()
+        if cell in reverted:
+            continue
+        reverted.add(cell)
+        for i in movesToCell[cell]:
+            origin = origins[i]
+            if origin in movesToCell and origin not in reverted and not isCityTile(origin):
+                bumped.append(origin)
+
+    keptMoves = []
+    for cell, moves in movesToCell.items():
+        if cell not in reverted:
+            keptMoves += moves
+    return keptMoves
+
+
+def resolveMoveArrays(origins, destinations, isCityTile, hasStillUnit):
+    '''
+    Same as resolveMoves(), for the moves of a whole batch of games at once. Cells are small non negative integer
+    indices that are unique across the batch, and the reverts are spread one step along all chains at a time.
+
+    Args:
+        origins: Integer array of the cell index of the unit of each move.
+        destinations: Integer array of the cell index each move goes to, inside the map.
+        isCityTile: Bool array, True for the moves into a city tile.
+        hasStillUnit: Bool array, True for the moves into a cell with exactly one unit, which is not moving.
+    Returns:
+        Bool array, True for the moves that are kept.
+    '''
+    if len(destinations) == 0:
+        return np.zeros(0, dtype=bool)
+    cellCount = max(origins.max(), destinations.max()) + 1
+    counts = np.bincount(destinations, minlength=cellCount)
+
+    # cells where units bump into each other, or into a unit that stays put
+    reverted = np.zeros(cellCount, dtype=bool)
+    reverted[destinations] = (counts[destinations] > 1) | hasStillUnit
+
+    # reverting a move leaves that unit on its cell, so moves into that cell are reverted as well. Units stack on
+    # city tiles, so moves into a city tile are never reverted
+    revertible = ~isCityTile
+    while True:
+        spreading = revertible & reverted[destinations]
+        if reverted[origins[spreading]].all():
+            break
+        reverted[origins[spreading]] = True
+    return isCityTile | ~reverted[destinations]
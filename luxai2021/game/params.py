@@ -0,0 +1,103 @@
+'''
+Game parameters compiled once per game from configs["parameters"], with the values the engine derives from them
+precomputed. The engine reads only this object, never the nested configs dicts.
+'''
+from collections.abc import Mapping
+from types import MappingProxyType
+
+from .codes import resourceTable
+
+# Per unit type tables are indexed by Constants.UNIT_TYPES
+UNIT_TYPE_KEYS = ["WORKER", "CART"]
+
+
+def freeze(value):
+    ''' Read only copy of a nested parameters value, dicts become mapping proxies and lists tuples '''
+    if isinstance(value, Mapping):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def thaw(value):
+    ''' Plain dict copy of frozen parameters, as the configs hold them '''
+    if isinstance(value, Mapping):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [thaw(item) for item in value]
+    return value
+
+
+class GameParams:
+    __slots__ = (
+        "parameters",
+        "dayLength", "nightLength", "cycleLength", "maxDays", "nightTable",
+        "cityUpkeep", "unitUpkeep", "cityAdjacencyBonus", "cityBuildCost", "cityActionCooldown",
+        "unitActionCooldown", "resourceCapacity",
+        "collectionRates", "fuelRates", "researchRequirements",
+        "woodGrowthRate", "maxWoodAmount",
+        "minRoad", "maxRoad", "cartRoadDevelopmentRate", "pillageRate",
+    )
+
+    def __init__(self, parameters):
+        '''
+        Compiles the game parameters. Read only once made, a game that needs other parameters compiles new ones.
+        Args:
+            parameters: configs["parameters"], formatted as GAME_CONSTANTS["PARAMETERS"]. It is copied, the
+                parameters attribute holds a read only copy.
+        '''
+        parameters = freeze(parameters)
+        dayLength = parameters["DAY_LENGTH"]
+        cycleLength = dayLength + parameters["NIGHT_LENGTH"]
+        values = {
+            "parameters": parameters,
+            "dayLength": dayLength,
+            "nightLength": parameters["NIGHT_LENGTH"],
+            "cycleLength": cycleLength,
+            "maxDays": parameters["MAX_DAYS"],
+            # is it night, by turn
+            "nightTable": tuple(turn % cycleLength >= dayLength for turn in range(parameters["MAX_DAYS"] + 1)),
+            "cityUpkeep": parameters["LIGHT_UPKEEP"]["CITY"],
+            "unitUpkeep": tuple(parameters["LIGHT_UPKEEP"][key] for key in UNIT_TYPE_KEYS),
+            "cityAdjacencyBonus": parameters["CITY_ADJACENCY_BONUS"],
+            "cityBuildCost": parameters["CITY_BUILD_COST"],
+            "cityActionCooldown": parameters["CITY_ACTION_COOLDOWN"],
+            "unitActionCooldown": tuple(parameters["UNIT_ACTION_COOLDOWN"][key] for key in UNIT_TYPE_KEYS),
+            "resourceCapacity": tuple(parameters["RESOURCE_CAPACITY"][key] for key in UNIT_TYPE_KEYS),
+            # per resource tables are indexed by resource code, wood needs no research
+            "collectionRates": tuple(resourceTable(parameters, "WORKER_COLLECTION_RATE")),
+            "fuelRates": tuple(resourceTable(parameters, "RESOURCE_TO_FUEL_RATE")),
+            "researchRequirements": (
+                0, parameters["RESEARCH_REQUIREMENTS"]["COAL"], parameters["RESEARCH_REQUIREMENTS"]["URANIUM"]
+            ),
+            "woodGrowthRate": parameters["WOOD_GROWTH_RATE"],
+            "maxWoodAmount": parameters["MAX_WOOD_AMOUNT"],
+            "minRoad": parameters["MIN_ROAD"],
+            "maxRoad": parameters["MAX_ROAD"],
+            "cartRoadDevelopmentRate": parameters["CART_ROAD_DEVELOPMENT_RATE"],
+            "pillageRate": parameters["PILLAGE_RATE"],
+        }
+        for name, value in values.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("GameParams are read only, compile new ones to change %s." % name)
+
+    def __delattr__(self, name):
+        raise AttributeError("GameParams are read only, compile new ones to change %s." % name)
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return (GameParams, (thaw(self.parameters),))
+
+    def isNight(self, turn):
+        ''' Is it night on the given turn '''
+        if turn < len(self.nightTable):
+            return self.nightTable[turn]
+        return turn % self.cycleLength >= self.dayLength
@@ -5,9 +5,32 @@ from .constants import Constants
 DIRECTIONS = Constants.DIRECTIONS
 
 class Position:
+    # Positions are read only, so the positions on and next to the maps are shared instances from getPosition(),
+    # each with its neighbours precomputed for translate(). Move things by giving them another position.
+    __slots__ = ("x", "y", "neighbours")
+
     def __init__(self, x, y):
-        self.x = x
-        self.y = y
+        object.__setattr__(self, "x", x)
+        object.__setattr__(self, "y", y)
+        object.__setattr__(self, "neighbours", None) # direction -> Position one unit away, for the interned positions
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Positions are read only and shared, use getPosition() to change %s." % name)
+
+    def __delattr__(self, name):
+        raise AttributeError("Positions are read only and shared, use getPosition() to change %s." % name)
+
+    def __hash__(self):
+        return hash((self.x, self.y))
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return (getPosition, (self.x, self.y))
 
     def __sub__(self, pos) -> int:
         return abs(pos.x - self.x) + abs(pos.y - self.y)
@@ -23,6 +46,8 @@ class Position:
         return (self - pos) <= 1
 
     def __eq__(self, pos) -> bool:
+        if self is pos:
+            return True
         if pos == None:
             return False
         return self.x == pos.x and self.y == pos.y
@@ -31,16 +56,18 @@ class Position:
         return self == pos
 
     def translate(self, direction, units) -> 'Position':
+        if units == 1 and self.neighbours is not None:
+            return self.neighbours.get(direction)
         if direction == DIRECTIONS.NORTH:
-            return Position(self.x, self.y - units)
+            return getPosition(self.x, self.y - units)
         elif direction == DIRECTIONS.EAST:
-            return Position(self.x + units, self.y)
+            return getPosition(self.x + units, self.y)
         elif direction == DIRECTIONS.SOUTH:
-            return Position(self.x, self.y + units)
+            return getPosition(self.x, self.y + units)
         elif direction == DIRECTIONS.WEST:
-            return Position(self.x - units, self.y)
+            return getPosition(self.x - units, self.y)
         elif direction == DIRECTIONS.CENTER:
-            return Position(self.x, self.y)
+            return self
 
     def directionTo(self, target_pos: 'Position') -> DIRECTIONS:
         """
@@ -64,3 +91,33 @@ class Position:
 
     def __str__(self) -> str:
         return f"({self.x}, {self.y})"
+
+
+# Interned positions cover every map size, up to 32x32, and one unit off the map on each side
+INTERNED_MIN = -1
+INTERNED_SIZE = 34
+_interned = [[Position(x, y) for x in range(INTERNED_MIN, INTERNED_MIN + INTERNED_SIZE)]
+             for y in range(INTERNED_MIN, INTERNED_MIN + INTERNED_SIZE)]
+
+def getPosition(x, y) -> Position:
+    """
+    Returns the shared Position for (x, y), or a new one if (x, y) is too far off the maps to be interned
+    """
+    i = x - INTERNED_MIN
+    j = y - INTERNED_MIN
+    if 0 <= i < INTERNED_SIZE and 0 <= j < INTERNED_SIZE:
+        return _interned[j][i]
+    return Position(x, y)
+
+def _linkNeighbours():
+    for row in _interned:
+        for pos in row:
+            object.__setattr__(pos, "neighbours", {
+                DIRECTIONS.NORTH: getPosition(pos.x, pos.y - 1),
+                DIRECTIONS.EAST: getPosition(pos.x + 1, pos.y),
+                DIRECTIONS.SOUTH: getPosition(pos.x, pos.y + 1),
+                DIRECTIONS.WEST: getPosition(pos.x - 1, pos.y),
+                DIRECTIONS.CENTER: pos,
+            })
+
+_linkNeighbours()
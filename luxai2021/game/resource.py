@@ -1,5 +1,6 @@
 
 '''Implements /src/Resource/index.ts'''
+from .codes import RESOURCE_INDEX
 
 class Resource:
     ''' Enum implemenation '''
@@ -8,6 +9,9 @@ class Resource:
         COAL = 'coal'
         URANIUM = 'uranium'
 
+    __slots__ = ("type", "amount", "code")
+
     def __init__(self, type, amount) -> None:
         self.type = type
         self.amount = amount
+        self.code = RESOURCE_INDEX.get(type) # integer code of the type, see codes.RESOURCE_NAMES
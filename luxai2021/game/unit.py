@@ -2,27 +2,96 @@
 Implements /src/Unit/index.ts -> Unit()
 """
 from .actionable import Actionable
-from .position import Position
+from .position import getPosition
 from .resource import Resource
 from .constants import Constants
-from .game_constants import GAME_CONSTANTS
 from .actions import *
+from .codes import ACTION_CODES, WOOD, COAL, URANIUM
+from .journal import CARGO, ROAD
 import math
 
 UNIT_TYPES = Constants.UNIT_TYPES
 
+class Cargo:
+    """
+    Resources carried by a unit, in fixed slots with the total kept in used.
+    Reads and writes go through cargo[resourceType] as with the dict it replaces, writes keep used up to date.
+    The amounts can also be read as attributes, but not written, so used can't get out of date.
+    """
+    __slots__ = ("_wood", "_coal", "_uranium", "_used")
+    KEYS = ("wood", "uranium", "coal")
+    SLOTS = {"wood": "_wood", "coal": "_coal", "uranium": "_uranium"} # slot of each resource type
+
+    def __init__(self, wood = 0, coal = 0, uranium = 0):
+        self._wood = wood
+        self._coal = coal
+        self._uranium = uranium
+        self._used = wood + coal + uranium
+
+    @property
+    def wood(self):
+        return self._wood
+
+    @property
+    def coal(self):
+        return self._coal
+
+    @property
+    def uranium(self):
+        return self._uranium
+
+    @property
+    def used(self):
+        return self._used
+
+    def __getitem__(self, resourceType):
+        return getattr(self, Cargo.SLOTS[resourceType])
+
+    def __setitem__(self, resourceType, amount):
+        slot = Cargo.SLOTS[resourceType]
+        self._used += amount - getattr(self, slot)
+        setattr(self, slot, amount)
+
+    def __iter__(self):
+        return iter(Cargo.KEYS)
+
+    def __len__(self):
+        return len(Cargo.KEYS)
+
+    def __eq__(self, other):
+        if not hasattr(other, "items"):
+            return NotImplemented
+        return dict(self.items()) == dict(other.items())
+
+    def keys(self):
+        return Cargo.KEYS
+
+    def values(self):
+        return (self._wood, self._uranium, self._coal)
+
+    def items(self):
+        return zip(Cargo.KEYS, self.values())
+
+    def clear(self):
+        self._wood = 0
+        self._coal = 0
+        self._uranium = 0
+        self._used = 0
+
+    def __str__(self) -> str:
+        return f"Cargo | Wood: {self.wood}, Coal: {self.coal}, Uranium: {self.uranium}"
+
+
 class Unit(Actionable):
-    def __init__(self, x, y, type, team, configs, idcount):
-        super().__init__(configs)
-        self.pos = Position(x, y)
+    __slots__ = ("pos", "team", "type", "id", "cargo")
+
+    def __init__(self, x, y, type, team, params, idcount):
+        super().__init__(params)
+        self.pos = getPosition(x, y)
         self.team = team
         self.type = type
         self.id = "u_%i" % idcount
-        self.cargo = {
-            "wood": 0,
-            "uranium": 0,
-            "coal": 0,
-        }
+        self.cargo = Cargo()
     
     def isWorker(self) -> bool:
         return self.type == UNIT_TYPES.WORKER
@@ -34,41 +103,38 @@ class Unit(Actionable):
         """
         get cargo space left in this unit
         """
-        spaceused = self.cargo["wood"] + self.cargo["coal"] + self.cargo["uranium"]
-        if self.type == UNIT_TYPES.WORKER:
-            return GAME_CONSTANTS["PARAMETERS"]["RESOURCE_CAPACITY"]["WORKER"] - spaceused
-        else:
-            return GAME_CONSTANTS["PARAMETERS"]["RESOURCE_CAPACITY"]["CART"] - spaceused
+        return self.params.resourceCapacity[self.type] - self.cargo.used
 
     def spendFuelToSurvive(self):
         """
         Implements /src/Unit/index.ts -> Unit.spendFuelToSurvive()
         """
         fuelNeeded = self.getLightUpkeep()
+        fuelRates = self.params.fuelRates
         woodNeeded = math.ceil(
-            fuelNeeded / self.configs["parameters"]["RESOURCE_TO_FUEL_RATE"]["WOOD"]
+            fuelNeeded / fuelRates[WOOD]
         )
         woodUsed = min(self.cargo["wood"], woodNeeded)
-        fuelNeeded -= woodUsed * self.configs["parameters"]["RESOURCE_TO_FUEL_RATE"]["WOOD"]
+        fuelNeeded -= woodUsed * fuelRates[WOOD]
         self.cargo["wood"] -= woodUsed
         if fuelNeeded <= 0:
             return True
 
         coalNeeded = math.ceil(
-            fuelNeeded / self.configs["parameters"]["RESOURCE_TO_FUEL_RATE"]["COAL"]
+            fuelNeeded / fuelRates[COAL]
         )
         coalUsed = min(self.cargo["coal"], coalNeeded)
-        fuelNeeded -= coalUsed * self.configs["parameters"]["RESOURCE_TO_FUEL_RATE"]["COAL"]
+        fuelNeeded -= coalUsed * fuelRates[COAL]
         self.cargo["coal"] -= coalUsed
 
         if fuelNeeded <= 0:
             return True
 
         uraniumNeeded = math.ceil(
-            fuelNeeded / self.configs["parameters"]["RESOURCE_TO_FUEL_RATE"]["URANIUM"]
+            fuelNeeded / fuelRates[URANIUM]
         )
         uraniumUsed = min(self.cargo["uranium"], uraniumNeeded)
-        fuelNeeded -= uraniumUsed * self.configs["parameters"]["RESOURCE_TO_FUEL_RATE"]["URANIUM"]
+        fuelNeeded -= uraniumUsed * fuelRates[URANIUM]
         self.cargo["uranium"] -= uraniumUsed
 
         if fuelNeeded <= 0:
@@ -81,7 +147,7 @@ class Unit(Actionable):
         whether or not the unit can build where it is right now
         """
         cell = game_map.getCellByPos(self.pos)
-        if not cell.hasResource() and self.canAct() and (self.cargo["wood"] + self.cargo["coal"] + self.cargo["uranium"]) >= GAME_CONSTANTS["PARAMETERS"]["CITY_BUILD_COST"]:
+        if not cell.hasResource() and self.canAct() and self.cargo.used >= self.params.cityBuildCost:
             return True
         return False
 
@@ -124,37 +190,28 @@ class Unit(Actionable):
 
 
 
-class Cargo:
-    def __init__(self):
-        self.wood = 0
-        self.coal = 0
-        self.uranium = 0
-
-    def __str__(self) -> str:
-        return f"Cargo | Wood: {self.wood}, Coal: {self.coal}, Uranium: {self.uranium}"
-
-
-
-
 class Worker(Unit):
     """
     Worker class. Mirrors /src/Unit/index.ts -> Worker()
     """
-    def __init__(self, x, y, team, configs, idcount):
-        super().__init__(x, y, Constants.UNIT_TYPES.WORKER, team, configs, idcount)
+    __slots__ = ()
+
+    def __init__(self, x, y, team, params, idcount):
+        super().__init__(x, y, Constants.UNIT_TYPES.WORKER, team, params, idcount)
     
     def getLightUpkeep(self):
-        return self.configs["parameters"]["LIGHT_UPKEEP"]["WORKER"]
+        return self.params.unitUpkeep[UNIT_TYPES.WORKER]
     
     def canMove(self):
         return self.canAct()
     
     def expendResourcesForCity(self):
         # use wood, then coal, then uranium for building
+        cityBuildCost = self.params.cityBuildCost
         spentResources = 0
         for rtype in ["wood", "coal", "uranium"]:
-            if (spentResources + self.cargo[rtype] > self.configs["parameters"]["CITY_BUILD_COST"]):
-                rtypeSpent = self.configs["parameters"]["CITY_BUILD_COST"] - spentResources
+            if (spentResources + self.cargo[rtype] > cityBuildCost):
+                rtypeSpent = cityBuildCost - spentResources
                 self.cargo[rtype] -= rtypeSpent
                 break
             else:
@@ -169,9 +226,10 @@ class Worker(Unit):
         if len(self.currentActions) == 1:
             action = self.currentActions[0]
             acted = True
-            if isinstance(action, MoveAction):
+            code = action.code
+            if code == ACTION_CODES.MOVE:
                 game.moveUnit(action.team, action.unitid, action.direction)
-            elif isinstance(action, TransferAction):
+            elif code == ACTION_CODES.TRANSFER:
                 game.transferResources(
                     action.team,
                     action.srcID,
@@ -179,30 +237,37 @@ class Worker(Unit):
                     action.resourceType,
                     action.amount
                 )
-            elif isinstance(action, SpawnCityAction):
+            elif code == ACTION_CODES.BUILD_CITY:
                 game.spawnCityTile(action.team, self.pos.x, self.pos.y);
+                if game.undoLog is not None:
+                    game.undoLog.append((CARGO, self, self.cargo.wood, self.cargo.coal, self.cargo.uranium))
                 self.expendResourcesForCity()
-            elif isinstance(action, PillageAction):
+            elif code == ACTION_CODES.PILLAGE:
+                if game.undoLog is not None:
+                    game.undoLog.append((ROAD, cell, cell.road, cell in game.map.roadCells))
                 cell.road = max(
-                    cell.road - self.configs["parameters"]["PILLAGE_RATE"],
-                    self.configs["parameters"]["MIN_ROAD"]
+                    cell.road - self.params.pillageRate,
+                    self.params.minRoad
                 )
+                game.map.roadCells.add(cell)
             else:
                 acted = False
             
             if acted:
-                self.cooldown += self.configs["parameters"]["UNIT_ACTION_COOLDOWN"]["WORKER"] * cooldownMultiplier
+                self.cooldown += self.params.unitActionCooldown[UNIT_TYPES.WORKER] * cooldownMultiplier
     
 
 class Cart(Unit):
     """
     Cart class. Mirrors /src/Unit/index.ts -> Cart()
     """
-    def __init__(self, x, y, team, configs, idcount):
-        super().__init__(x, y, Constants.UNIT_TYPES.CART, team, configs, idcount)
+    __slots__ = ()
+
+    def __init__(self, x, y, team, params, idcount):
+        super().__init__(x, y, Constants.UNIT_TYPES.CART, team, params, idcount)
     
     def getLightUpkeep(self):
-        return self.configs["parameters"]["LIGHT_UPKEEP"]["CART"]
+        return self.params.unitUpkeep[UNIT_TYPES.CART]
     
     def canMove(self):
         return self.canAct()
@@ -215,10 +280,11 @@ class Cart(Unit):
         if len(self.currentActions) == 1:
             action = self.currentActions[0]
             acted = True
-            if isinstance(action, MoveAction):
+            code = action.code
+            if code == ACTION_CODES.MOVE:
                 game.moveUnit(action.team, action.unitid, action.direction)
-                self.cooldown += self.configs["parameters"]["UNIT_ACTION_COOLDOWN"]["CART"] * cooldownMultiplier
-            elif isinstance(action, TransferAction):
+                self.cooldown += self.params.unitActionCooldown[UNIT_TYPES.CART] * cooldownMultiplier
+            elif code == ACTION_CODES.TRANSFER:
                 game.transferResources(
                     action.team,
                     action.srcID,
@@ -226,15 +292,18 @@ class Cart(Unit):
                     action.resourceType,
                     action.amount
                 )
-            self.cooldown += self.configs["parameters"]["UNIT_ACTION_COOLDOWN"]["CART"] * cooldownMultiplier
+            self.cooldown += self.params.unitActionCooldown[UNIT_TYPES.CART] * cooldownMultiplier
         
         endcell = game.map.getCellByPos(self.pos)
 
         # auto create roads by increasing the cooldown value of the the cell unit is on currently
-        if endcell.getRoad() < self.configs["parameters"]["MAX_ROAD"]:
+        if endcell.getRoad() < self.params.maxRoad:
+            if game.undoLog is not None:
+                game.undoLog.append((ROAD, endcell, endcell.road, endcell in game.map.roadCells))
             endcell.road = min(
-                endcell.road + self.configs["parameters"]["CART_ROAD_DEVELOPMENT_RATE"],
-                self.configs.parameters.MAX_ROAD
+                endcell.road + self.params.cartRoadDevelopmentRate,
+                self.params.maxRoad
             )
-            game.stats.teamStats[self.team].roadsBuilt += self.configs["parameters"]["CART_ROAD_DEVELOPMENT_RATE"]
+            game.map.roadCells.add(endcell)
+            game.stats["teamStats"][self.team]["roadsBuilt"] += self.params.cartRoadDevelopmentRate
         
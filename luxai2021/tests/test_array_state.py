@@ -0,0 +1,134 @@
+from unittest import TestCase
+
+import copy
+import random
+from ..game.game import Game
+from ..game.actions import (
+    MoveAction, SpawnCityAction, SpawnWorkerAction, SpawnCartAction, ResearchAction, PillageAction, TransferAction
+)
+from ..game.constants import Constants
+
+
+def randomTransfer(game, rng, unit):
+    ''' Transfer of part of the cargo of a unit to an adjacent unit of its team, None if there is no such unit '''
+    neighbours = [
+        other for direction in [Constants.DIRECTIONS.NORTH, Constants.DIRECTIONS.EAST, Constants.DIRECTIONS.SOUTH,
+                                Constants.DIRECTIONS.WEST]
+        if game.map.inMap(unit.pos.translate(direction, 1))
+        for other in game.map.getCellByPos(unit.pos.translate(direction, 1)).units.values()
+        if other.team == unit.team
+    ]
+    if len(neighbours) == 0 or not unit.canAct():
+        return None
+    resourceType = rng.choice([Constants.RESOURCE_TYPES.WOOD, Constants.RESOURCE_TYPES.COAL,
+                               Constants.RESOURCE_TYPES.URANIUM])
+    return TransferAction(unit.team, unit.id, rng.choice(neighbours).id, resourceType, rng.randint(0, 100))
+
+
+def randomActions(game, rng):
+    actions = []
+    directions = [Constants.DIRECTIONS.NORTH, Constants.DIRECTIONS.EAST, Constants.DIRECTIONS.SOUTH,
+                  Constants.DIRECTIONS.WEST, Constants.DIRECTIONS.CENTER]
+    for team in [Constants.TEAM.A, Constants.TEAM.B]:
+        for unit in game.state["teamStates"][team]["units"].values():
+            r = rng.random()
+            if r < 0.6:
+                actions.append(MoveAction(team, unit.id, rng.choice(directions)))
+            elif r < 0.75:
+                transfer = randomTransfer(game, rng, unit)
+                if transfer is not None:
+                    actions.append(transfer)
+            elif unit.type == Constants.UNIT_TYPES.CART:
+                continue # carts only move and transfer
+            elif r < 0.9:
+                actions.append(SpawnCityAction(team, unit.id))
+            elif r < 0.95:
+                actions.append(PillageAction(team, unit.id))
+    for city in game.cities.values():
+        for cell in city.citycells:
+            r = rng.random()
+            if r < 0.3:
+                actions.append(SpawnWorkerAction(city.team, None, cell.pos.x, cell.pos.y))
+            elif r < 0.7:
+                actions.append(SpawnCartAction(city.team, None, cell.pos.x, cell.pos.y))
+            else:
+                actions.append(ResearchAction(city.team, cell.pos.x, cell.pos.y))
+    # Only valid actions reach the game, as in MatchController
+    return [action for action in actions if action.isValid(game)]
+
+
+def populate(game, rng):
+    '''
+    Gives both teams cities with workers and carts carrying cargo, which random play rarely gets to, so that carts,
+    roads and transfers are exercised from the first turns.
+    '''
+    emptyCells = [cell for cell in game.map.cells if not cell.hasResource() and not cell.isCityTile()]
+    for team in [Constants.TEAM.A, Constants.TEAM.B]:
+        for cell in rng.sample(emptyCells, 6):
+            if cell.isCityTile():
+                continue
+            game.spawnCityTile(team, cell.pos.x, cell.pos.y)
+            for spawn in [game.spawnWorker, game.spawnCart]:
+                unit = spawn(team, cell.pos.x, cell.pos.y)
+                unit.cargo["wood"] = rng.randint(0, 50)
+                unit.cargo["coal"] = rng.randint(0, 20)
+    if game.arrays is not None:
+        game.arrays.loadGame(0, game)
+
+
+def summarize(game):
+    units = []
+    for team in [Constants.TEAM.A, Constants.TEAM.B]:
+        for unit in game.state["teamStates"][team]["units"].values():
+            units.append((unit.id, unit.pos.x, unit.pos.y, dict(unit.cargo), unit.cooldown))
+    cities = [(city.id, city.fuel, [(cell.pos.x, cell.pos.y) for cell in city.citycells])
+              for city in game.cities.values()]
+    resources = [(cell.pos.x, cell.pos.y, cell.resource.amount) for cell in game.map.resources]
+    roads = [(x, y, game.map.getCell(x, y).road)
+             for y in range(game.map.height) for x in range(game.map.width)]
+    return game.state["turn"], units, cities, resources, roads, copy.deepcopy(game.stats)
+
+
+class TestArrayState(TestCase):
+    def test_array_engine_matches_object_engine(self):
+        for seed in [1, 2, 3]:
+            objectGame = Game({"seed": seed, "engine": Constants.ENGINE_TYPES.OBJECT})
+            arrayGame = Game({"seed": seed, "engine": Constants.ENGINE_TYPES.ARRAY})
+            self.assertEqual(summarize(objectGame), summarize(arrayGame))
+
+            objectRng = random.Random(seed)
+            arrayRng = random.Random(seed)
+            for turn in range(120):
+                objectOver = objectGame.runTurnWithActions(randomActions(objectGame, objectRng))
+                arrayOver = arrayGame.runTurnWithActions(randomActions(arrayGame, arrayRng))
+                self.assertEqual(summarize(objectGame), summarize(arrayGame), "seed %i turn %i" % (seed, turn))
+                self.assertEqual(objectOver, arrayOver)
+                if objectOver:
+                    break
+
+    def test_array_engine_matches_object_engine_with_carts(self):
+        for seed in [1, 2]:
+            objectGame = Game({"seed": seed, "engine": Constants.ENGINE_TYPES.OBJECT})
+            arrayGame = Game({"seed": seed, "engine": Constants.ENGINE_TYPES.ARRAY})
+            populate(objectGame, random.Random(seed))
+            populate(arrayGame, random.Random(seed))
+            self.assertEqual(summarize(objectGame), summarize(arrayGame))
+
+            objectRng = random.Random(seed)
+            arrayRng = random.Random(seed)
+            for turn in range(60):
+                objectOver = objectGame.runTurnWithActions(randomActions(objectGame, objectRng))
+                arrayOver = arrayGame.runTurnWithActions(randomActions(arrayGame, arrayRng))
+                self.assertEqual(summarize(objectGame), summarize(arrayGame), "seed %i turn %i" % (seed, turn))
+                self.assertEqual(objectOver, arrayOver)
+
+    def test_team_counters(self):
+        for engine in [Constants.ENGINE_TYPES.OBJECT, Constants.ENGINE_TYPES.ARRAY]:
+            # debug cross-checks the maintained counters against a recount every turn
+            game = Game({"seed": 4, "engine": engine, "debug": True})
+            rng = random.Random(4)
+            gameOver = False
+            while not gameOver:
+                gameOver = game.runTurnWithActions(randomActions(game, rng))
+            self.assertEqual(game.counters, game.countTeams())
+            game.configs["debug"] = False
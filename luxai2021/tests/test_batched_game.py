@@ -0,0 +1,71 @@
+from unittest import TestCase
+
+import copy
+import random
+from ..game.actions import MoveAction, SpawnCityAction, SpawnWorkerAction
+from ..game.batched_game import BatchedGame
+from ..game.constants import Constants
+from .test_array_state import populate, randomActions, summarize
+
+
+def validActions(game, actions):
+    ''' The actions MatchController.takeAction() would pass on, actions of units the team does not have included '''
+    valid = []
+    for action in actions:
+        try:
+            if action is not None and action.isValid(game):
+                valid.append(action)
+        except KeyError:
+            pass
+    return valid
+
+
+class TestBatchedGame(TestCase):
+    def test_batch_matches_separate_games(self):
+        batch = BatchedGame({"seed": 5}, numGames=3, autoReset=False)
+        games = [copy.deepcopy(batch.getGame(b)) for b in range(3)]
+        rngs = [random.Random(b) for b in range(3)]
+        for turn in range(80):
+            actions = [randomActions(game, rng) for game, rng in zip(games, rngs)]
+            matchOver = batch.step(actions)
+            for b, game in enumerate(games):
+                self.assertEqual(bool(matchOver[b]), game.runTurnWithActions(actions[b]))
+                self.assertEqual(summarize(batch.getGame(b)), summarize(game), "game %i turn %i" % (b, turn))
+
+    def test_invalid_actions_are_dropped(self):
+        batch = BatchedGame({"seed": 6}, numGames=2, autoReset=False)
+        for b in range(2):
+            populate(batch.games[b], random.Random(b))
+            batch.state.loadGame(b, batch.games[b])
+        games = [copy.deepcopy(batch.getGame(b)) for b in range(2)]
+        rngs = [random.Random(b) for b in range(2)]
+        for turn in range(40):
+            actions = []
+            for game, rng in zip(games, rngs):
+                enemy = list(game.getTeamsUnits(Constants.TEAM.B).values())
+                gameActions = randomActions(game, rng) + [
+                    MoveAction(Constants.TEAM.A, "u_999", Constants.DIRECTIONS.NORTH),
+                    MoveAction(Constants.TEAM.A, enemy[0].id if enemy else None, Constants.DIRECTIONS.SOUTH),
+                    SpawnCityAction(None, "u_1"),
+                    SpawnWorkerAction(Constants.TEAM.B, None, 0, 0),
+                    None,
+                ]
+                # units that cannot act this turn
+                gameActions += [
+                    MoveAction(unit.team, unit.id, Constants.DIRECTIONS.WEST)
+                    for unit in game.getTeamsUnits(Constants.TEAM.A).values() if not unit.canAct()
+                ]
+                actions.append(gameActions)
+            batch.step(actions)
+            for b, game in enumerate(games):
+                game.runTurnWithActions(validActions(game, actions[b]))
+                self.assertEqual(summarize(batch.getGame(b)), summarize(game), "game %i turn %i" % (b, turn))
+
+    def test_auto_reset(self):
+        batch = BatchedGame({"seed": 5}, numGames=2)
+        batch.state.turn[1] = batch.configs["parameters"]["MAX_DAYS"] - 1
+        matchOver = batch.step([[], []])
+        self.assertEqual(list(matchOver), [False, True])
+        self.assertIn(batch.winners[1], [0, 1])
+        self.assertEqual(batch.getGame(1).state["turn"], 0)
+        self.assertEqual(batch.getGame(0).state["turn"], 1)
@@ -0,0 +1,45 @@
+from unittest import TestCase
+
+from ..game.game import Game
+from ..game.constants import Constants
+
+
+class TestCity(TestCase):
+    def test_merge_cities(self):
+        game = Game({"seed": 2, "engine": Constants.ENGINE_TYPES.OBJECT})
+        for cell in list(game.map.resources):
+            game.map.removeResource(cell)
+            cell.resource = None
+        for city in list(game.cities.values()):
+            game.destroyCity(city.team, city.id)
+
+        # three separate cities in a row, then the gaps are filled so they merge. A new tile joins the city of
+        # its first neighbour in north, east, south, west order, so the city on the right survives
+        y = 5
+        for x in [1, 3, 5]:
+            game.spawnCityTile(Constants.TEAM.A, x, y)
+        survivor = game.map.getCell(5, y).citytile.cityid
+        for city in game.cities.values():
+            city.fuel = 10
+        game.spawnCityTile(Constants.TEAM.A, 4, y)
+        game.spawnCityTile(Constants.TEAM.A, 2, y)
+
+        self.assertEqual(len(game.cities), 1)
+        city = game.cities[survivor]
+        self.assertEqual([(cell.pos.x, cell.pos.y) for cell in city.citycells], [(x, y) for x in [5, 4, 3, 2, 1]])
+        for x in range(1, 6):
+            self.assertEqual(game.map.getCell(x, y).citytile.cityid, city.id)
+        self.assertEqual(city.fuel, 30)
+        self.assertEqual(city.getAdjacencyBonuses(), 8 * game.configs["parameters"]["CITY_ADJACENCY_BONUS"])
+        self.assertEqual(game.counters, game.countTeams())
+
+    def test_spawn_city_tile_position(self):
+        # the tile is placed on the cell asked for, not on one of its neighbours, so each team starts with its
+        # worker on its city tile
+        for seed in range(10):
+            game = Game({"seed": seed, "engine": Constants.ENGINE_TYPES.OBJECT})
+            for team in [Constants.TEAM.A, Constants.TEAM.B]:
+                for unit in game.getTeamsUnits(team).values():
+                    cell = game.map.getCellByPos(unit.pos)
+                    self.assertTrue(cell.isCityTile())
+                    self.assertEqual(cell.citytile.team, team)
@@ -0,0 +1,30 @@
+from unittest import TestCase
+
+from ..game.actions import MoveAction, SpawnCityAction, ResearchAction
+from ..game.codes import ACTION_CODES, ACTION_INDEX, DIRECTION_NAME_DELTAS, RESOURCE_INDEX, resourceTable
+from ..game.constants import Constants, LuxMatchConfigs_Default
+from ..game.resource import Resource
+
+
+class TestCodes(TestCase):
+    def test_action_codes(self):
+        self.assertEqual(Constants.ACTIONS.MOVE, 'm')
+        self.assertEqual(Constants.ACTIONS.BUILD_CITY, 'bcity')
+
+        actions = [
+            MoveAction(Constants.TEAM.A, "u_1", Constants.DIRECTIONS.NORTH),
+            SpawnCityAction(Constants.TEAM.A, "u_1"),
+            ResearchAction(Constants.TEAM.B, 1, 2),
+        ]
+        for action in actions:
+            self.assertEqual(action.code, ACTION_INDEX[action.action])
+        self.assertEqual(actions[0].code, ACTION_CODES.MOVE)
+        self.assertEqual(DIRECTION_NAME_DELTAS[actions[0].direction], (0, -1))
+
+    def test_resource_tables(self):
+        params = LuxMatchConfigs_Default["parameters"]
+        fuelRates = resourceTable(params, "RESOURCE_TO_FUEL_RATE")
+        for name, key in [("wood", "WOOD"), ("coal", "COAL"), ("uranium", "URANIUM")]:
+            resource = Resource(name, 10)
+            self.assertEqual(resource.code, RESOURCE_INDEX[name])
+            self.assertEqual(fuelRates[resource.code], params["RESOURCE_TO_FUEL_RATE"][key])
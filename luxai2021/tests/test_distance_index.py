@@ -0,0 +1,121 @@
+from unittest import TestCase
+
+import random
+import numpy as np
+from ..game.constants import Constants
+from ..game.distance_index import NO_SOURCE, RESOURCE_CLASSES, TEAM_CLASSES, computeSecondField, directionTo
+from ..game.game import Game
+from .test_array_state import populate
+from .test_snapshot import playTurns
+
+
+def bruteForceNearest(field, x, y, exclude = None):
+    ''' Nearest source of a cell by a full scan, the first one on ties, leaving out the source at index exclude '''
+    distances = [abs(sx - x) + abs(sy - y) for sx, sy in field.positions.tolist()]
+    candidates = [(distance, i) for i, distance in enumerate(distances) if i != exclude]
+    if len(candidates) == 0:
+        return NO_SOURCE, NO_SOURCE
+    return min(candidates)
+
+
+class TestDistanceIndex(TestCase):
+    def test_fields_match_brute_force(self):
+        for engine in [Constants.ENGINE_TYPES.OBJECT, Constants.ENGINE_TYPES.ARRAY]:
+            game = Game({"seed": 4, "engine": engine})
+            playTurns(game, 3, 30)
+            index = game.getDistanceIndex()
+            classes = [(objectClass, None) for objectClass in RESOURCE_CLASSES]
+            classes += [(objectClass, team) for objectClass in TEAM_CLASSES for team in [0, 1]]
+            for objectClass, team in classes:
+                field = index.getField(objectClass, team)
+                self.assertEqual(field.distances.shape, (game.map.height, game.map.width))
+                for y in range(game.map.height):
+                    for x in range(game.map.width):
+                        self.assertEqual(
+                            (field.distances[y, x], field.nearest[y, x]), bruteForceNearest(field, x, y)
+                        )
+
+            unit = list(game.getTeamsUnits(Constants.TEAM.A).values())[0]
+            source, distance, direction = index.nearest("worker", unit.pos.x, unit.pos.y, Constants.TEAM.A)
+            self.assertEqual(distance, 0)
+            self.assertEqual(direction, Constants.DIRECTIONS.CENTER)
+
+    def test_nearest_excluding(self):
+        game = Game({"seed": 4, "engine": Constants.ENGINE_TYPES.OBJECT})
+        populate(game, random.Random(4))
+        index = game.getDistanceIndex()
+        for objectClass, team in [("wood", None), ("city", Constants.TEAM.A), ("worker", Constants.TEAM.B)]:
+            field = index.getField(objectClass, team)
+            for source in field.sources:
+                i = field.sources.index(source)
+                for y in range(game.map.height):
+                    for x in range(game.map.width):
+                        nearest = index.nearest(objectClass, x, y, team, exclude=source)
+                        if field.nearest[y, x] != i:
+                            # only the object the cell would pick is left out
+                            self.assertEqual(nearest, index.nearest(objectClass, x, y, team))
+                            continue
+                        distance, j = bruteForceNearest(field, x, y, exclude=i)
+                        if j == NO_SOURCE:
+                            self.assertIsNone(nearest)
+                        else:
+                            self.assertIs(nearest[0], field.sources[j])
+                            self.assertEqual(nearest[1], distance)
+
+        # a unit's nearest worker is another one, unless it is the only one
+        unit = index.getField("worker", Constants.TEAM.B).sources[0]
+        source, distance, direction = index.nearest("worker", unit.pos.x, unit.pos.y, Constants.TEAM.B, exclude=unit)
+        self.assertIsNot(source, unit)
+        game = Game({"seed": 4, "engine": Constants.ENGINE_TYPES.OBJECT})
+        unit = game.getDistanceIndex().getField("worker", Constants.TEAM.B).sources[0]
+        self.assertIsNone(game.getDistanceIndex().nearest("worker", unit.pos.x, unit.pos.y, Constants.TEAM.B, exclude=unit))
+
+    def test_second_field_matches_brute_force(self):
+        rng = np.random.default_rng(0)
+        for sources in [0, 1, 2, 5, 40]:
+            xs, ys = rng.integers(0, 12, sources), rng.integers(0, 9, sources)
+            distances, nearest = computeSecondField(xs, ys, 12, 9)
+            for y in range(9):
+                for x in range(12):
+                    ranked = sorted((abs(xs[i] - x) + abs(ys[i] - y), i) for i in range(sources))
+                    expected = ranked[1] if sources > 1 else (NO_SOURCE, NO_SOURCE)
+                    self.assertEqual((distances[y, x], nearest[y, x]), expected)
+
+    def test_fields_are_per_turn(self):
+        game = Game({"seed": 4, "engine": Constants.ENGINE_TYPES.OBJECT})
+        index = game.getDistanceIndex()
+        snapshot = game.snapshot()
+        field = index.getField("worker", Constants.TEAM.B)
+        self.assertIs(index.getField("worker", Constants.TEAM.B), field)
+
+        playTurns(game, 3, 1)
+        self.assertIsNot(index.getField("worker", Constants.TEAM.B), field)
+
+        # restoring to an earlier turn drops the fields too
+        field = index.getField("worker", Constants.TEAM.B)
+        game.restore(snapshot)
+        self.assertIsNot(index.getField("worker", Constants.TEAM.B), field)
+        self.assertIsNot(game.clone().getDistanceIndex(), index)
+
+        with self.assertRaises(Exception):
+            index.getField("city")
+
+    def test_reset_invalidates_fields(self):
+        game = Game({"seed": 4, "engine": Constants.ENGINE_TYPES.OBJECT})
+        index = game.getDistanceIndex()
+        field = index.getField("worker", Constants.TEAM.A)
+
+        # a new game starts on the same turn, its fields are computed again
+        game.configs["seed"] = 5
+        game.reset()
+        self.assertIs(game.getDistanceIndex(), index)
+        newField = index.getField("worker", Constants.TEAM.A)
+        self.assertIsNot(newField, field)
+        unit = list(game.getTeamsUnits(Constants.TEAM.A).values())[0]
+        self.assertEqual(newField.sources, [unit])
+
+    def test_direction(self):
+        self.assertEqual(directionTo(3, 3, 3, 3), Constants.DIRECTIONS.CENTER)
+        self.assertEqual(directionTo(3, 3, 5, 4), Constants.DIRECTIONS.EAST)
+        self.assertEqual(directionTo(3, 3, 2, 0), Constants.DIRECTIONS.NORTH)
+        self.assertEqual(directionTo(3, 3, 1, 5), Constants.DIRECTIONS.WEST)
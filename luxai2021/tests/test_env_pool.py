@@ -0,0 +1,39 @@
+from unittest import TestCase
+
+import numpy as np
+from ..env.agent import Agent
+from ..env.env_pool import LuxEnvPool
+from .test_lux_env import MovingAgent
+
+
+class TestEnvPool(TestCase):
+    def test_env_pool(self):
+        numEnvs = 4
+        pool = LuxEnvPool({"seed": 1}, MovingAgent, Agent, numEnvs, batchSize=2, numWorkers=4)
+        try:
+            pool.async_reset()
+            seen = []
+            for i in range(2):
+                obs, rewards, dones, info = pool.recv()
+                self.assertEqual(obs.shape, (2, 3))
+                self.assertTrue((obs[:, 2] == 1).all()) # first observations of new matches
+                seen += info["env_id"].tolist()
+            self.assertEqual(sorted(seen), list(range(numEnvs)))
+
+            with self.assertRaises(Exception):
+                pool.recv() # nothing is running
+            pool.send(np.zeros(numEnvs, dtype=np.int64), np.arange(numEnvs))
+            with self.assertRaises(Exception):
+                pool.send([0], [0]) # still running
+
+            rng = np.random.default_rng(0)
+            steps = np.zeros(numEnvs, dtype=np.int64)
+            for i in range(100):
+                obs, rewards, dones, info = pool.recv()
+                envIds = info["env_id"]
+                self.assertEqual(len(set(envIds.tolist())), 2)
+                steps[envIds] += 1
+                pool.send(rng.integers(0, 5, len(envIds)), envIds)
+            self.assertEqual(steps.sum(), 200)
+        finally:
+            pool.close()
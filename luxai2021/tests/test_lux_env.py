@@ -0,0 +1,76 @@
+from unittest import TestCase
+
+import random
+import numpy as np
+from gym import spaces
+from ..env.agent import Agent
+from ..env.lux_env import LuxEnvironment
+from ..game.actions import MoveAction
+from ..game.constants import Constants
+
+DIRECTIONS = [
+    Constants.DIRECTIONS.CENTER, Constants.DIRECTIONS.NORTH, Constants.DIRECTIONS.EAST,
+    Constants.DIRECTIONS.SOUTH, Constants.DIRECTIONS.WEST,
+]
+
+
+class MovingAgent(Agent):
+    ''' Learning agent that moves its units in the direction of the action code '''
+    def __init__(self):
+        super().__init__()
+        self.action_space = spaces.Discrete(len(DIRECTIONS))
+        self.observation_space = spaces.Box(low=0, high=32, shape=(3,), dtype=np.float32)
+
+    def getAgentType(self):
+        return Constants.AGENT_TYPE.LEARNING
+
+    def getObservation(self, game, unit, citytile, team, isNewTurn):
+        pos = unit.pos if unit is not None else citytile.pos
+        return np.array([pos.x, pos.y, isNewTurn], dtype=np.float32)
+
+    def takeAction(self, actionCode, game, unit=None, citytile=None, team=None):
+        if unit is not None:
+            self.matchController.takeAction(MoveAction(team, unit.id, DIRECTIONS[actionCode]))
+
+    def getReward(self, game, isGameFinished, isNewTurn, isGameError):
+        return 1 if isNewTurn else 0
+
+
+def playEpisode(turnMode, seed):
+    ''' Plays an episode with random actions, returns the observations, entity ids, rewards and final units '''
+    random.seed(seed)
+    rng = random.Random(seed)
+    env = LuxEnvironment(
+        {"seed": seed, "engine": Constants.ENGINE_TYPES.OBJECT}, MovingAgent(), Agent(), turnMode=turnMode
+    )
+    observations = []
+    entityIds = []
+    rewards = []
+    obs = env.reset()
+    done = False
+    while not done:
+        observations.append(obs)
+        entityIds.append(env.entityIds)
+        if turnMode:
+            actions = [rng.randrange(len(DIRECTIONS)) for row in obs]
+        else:
+            actions = rng.randrange(len(DIRECTIONS))
+        obs, reward, done, info = env.step(actions)
+        rewards.append(reward)
+    units = sorted((unit.id, unit.pos.x, unit.pos.y) for team in [0, 1] for unit in env.game.getTeamsUnits(team).values())
+    return observations, entityIds, rewards, units, env.game.state["turn"]
+
+
+class TestLuxEnv(TestCase):
+    def test_turn_mode_matches_unit_mode(self):
+        unitObs, _, unitRewards, unitUnits, unitTurn = playEpisode(False, 11)
+        turnObs, turnIds, turnRewards, turnUnits, turnTurn = playEpisode(True, 11)
+
+        # same match, with one step per turn holding the observations of every unit and city tile
+        self.assertEqual(unitUnits, turnUnits)
+        self.assertEqual(unitTurn, turnTurn)
+        np.testing.assert_array_equal(np.concatenate(turnObs), np.stack(unitObs))
+        self.assertEqual(len(turnObs), sum(obs[2] for obs in unitObs))
+        self.assertEqual(sum(turnRewards), sum(unitRewards))
+        for obs, ids in zip(turnObs, turnIds):
+            self.assertEqual(len(obs), len(ids))
@@ -9,6 +9,40 @@ import math
 from ..game.game import Game
 from ..game.constants import Constants, LuxMatchConfigs_Default
 from ..game.game_constants import GAME_CONSTANTS
+from ..game.game_map import MOVE_DELTAS, sign
+
+
+def loopGOL(arr, options):
+    ''' The cell by cell Game of Life round _simulateGOL() used before, as a reference '''
+    for i in range(1, len(arr) - 1):
+        for j in range(1, len(arr[0]) - 1):
+            alive = 0
+            for delta in MOVE_DELTAS:
+                if arr[i + delta[1]][j + delta[0]] == 1:
+                    alive += 1
+            if arr[i][j] == 1:
+                arr[i][j] = 0 if alive < options["deathLimit"] else 1
+            else:
+                arr[i][j] = 1 if alive > options["birthLimit"] else 0
+    return arr
+
+
+def loopKernelForce(resourcesMap, rx, ry):
+    ''' The cell by cell force _kernelForce() computed before, as a reference '''
+    force = [0, 0]
+    resource = resourcesMap[ry][rx]
+    for y in range(ry - 5, ry + 5):
+        for x in range(rx - 5, rx + 5):
+            if (x < 0 or y < 0 or x >= len(resourcesMap[0]) or y >= len(resourcesMap)): continue
+            r2 = resourcesMap[y][x]
+            if (r2 != None):
+                dx = rx - x
+                dy = ry - y
+                mdist = abs(dx) + abs(dy)
+                direction = 1 if r2["type"] != resource["type"] else -1
+                if (dx != 0): force[0] += direction * math.pow(dx/mdist, 2) * sign(dx)
+                if (dy != 0): force[1] += direction * math.pow(dy/mdist, 2) * sign(dy)
+    return force
 
 
 class TestMap(TestCase):
@@ -131,3 +165,43 @@ class TestMap(TestCase):
         
 
         return True
+
+    def test_simulate_gol_matches_loop(self):
+        game = Game({"seed": 1})
+        rng = random.Random(1)
+        for trial in range(200):
+            height = rng.randint(1, 20)
+            width = rng.randint(1, 20)
+            density = rng.random()
+            options = {"deathLimit": rng.randint(0, 8), "birthLimit": rng.randint(0, 8)}
+            arr = [[1 if rng.random() < density else 0 for x in range(width)] for y in range(height)]
+            expected = loopGOL([list(row) for row in arr], options)
+            self.assertEqual(game.map._simulateGOL(arr, options), expected)
+
+    def test_kernel_forces_match_loop(self):
+        game = Game({"seed": 1})
+        rng = random.Random(1)
+        types = [Constants.RESOURCE_TYPES.WOOD, Constants.RESOURCE_TYPES.COAL, Constants.RESOURCE_TYPES.URANIUM]
+        for trial in range(50):
+            size = rng.choice([12, 16, 24, 32])
+            density = rng.random()
+            resourcesMap = [
+                [{"type": rng.choice(types), "amt": 1} if rng.random() < density else None for x in range(size)]
+                for y in range(size)
+            ]
+            ys, xs, forceX, forceY = game.map._kernelForces(resourcesMap)
+            expected = [(y, x) for y in range(size) for x in range(size) if resourcesMap[y][x] != None]
+            self.assertEqual(list(zip(ys, xs)), expected)
+            for y, x, fx, fy in zip(ys, xs, forceX.tolist(), forceY.tolist()):
+                self.assertEqual([fx, fy], loopKernelForce(resourcesMap, x, y))
+
+    def test_adjacent_cells(self):
+        game = Game({"seed": 1})
+        gameMap = game.map
+        for cell in gameMap.cells:
+            x, y = cell.pos.x, cell.pos.y
+            expected = [(x, y - 1), (x + 1, y), (x, y + 1), (x - 1, y)]
+            expected = [pos for pos in expected if 0 <= pos[0] < gameMap.width and 0 <= pos[1] < gameMap.height]
+            self.assertEqual([(adj.pos.x, adj.pos.y) for adj in gameMap.getAdjacentCells(cell)], expected)
+            self.assertIs(gameMap.getCell(x, y), cell)
+            self.assertIs(gameMap.getRow(y)[x], cell)
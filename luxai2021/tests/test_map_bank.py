@@ -0,0 +1,30 @@
+from unittest import TestCase
+
+import os
+import random
+import tempfile
+from ..game.game import Game
+from ..game.constants import Constants
+from ..game.map_bank import MapBank, generateMapBank
+from .test_array_state import randomActions, summarize
+
+
+class TestMapBank(TestCase):
+    def test_banked_maps_match_generated(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "maps.bin")
+            generateMapBank(path, range(10), processes=2)
+            bank = MapBank.open(path)
+            self.assertEqual(len(bank), 10)
+            self.assertNotIn(10, bank)
+
+            for seed in [0, 2, 6, 9, 10]:
+                generated = Game({"seed": seed, "mapBank": None, "engine": Constants.ENGINE_TYPES.OBJECT})
+                banked = Game({"seed": seed, "mapBank": path, "engine": Constants.ENGINE_TYPES.OBJECT})
+                self.assertEqual(banked.map.getMapString(), generated.map.getMapString())
+                generatedRng = random.Random(seed)
+                bankedRng = random.Random(seed)
+                for turn in range(40):
+                    self.assertEqual(summarize(banked), summarize(generated), "seed %i turn %i" % (seed, turn))
+                    generated.runTurnWithActions(randomActions(generated, generatedRng))
+                    banked.runTurnWithActions(randomActions(banked, bankedRng))
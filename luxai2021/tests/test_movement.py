@@ -0,0 +1,131 @@
+from unittest import TestCase
+
+import random
+import time
+
+import numpy as np
+from ..game.game import Game
+from ..game.actions import MoveAction
+from ..game.constants import Constants
+from ..game.movement import resolveMoves, resolveMoveArrays
+
+
+def recursivePrune(game, actions):
+    ''' The recursive collision pruning handleMovementActions() used before, as a reference '''
+    cellsToActionsToThere = {}
+    movingUnits = set()
+    for action in actions:
+        newcell = game.map.getCellByPos(game.getUnit(action.team, action.unitid).pos.translate(action.direction, 1))
+        if newcell is not None:
+            cellsToActionsToThere.setdefault(newcell, []).append(action)
+            movingUnits.add(action.unitid)
+
+    def revertAction(action):
+        origcell = game.map.getCellByPos(game.getUnit(action.team, action.unitid).pos)
+        collidingActions = cellsToActionsToThere.get(origcell)
+        if not origcell.isCityTile() and collidingActions is not None:
+            cellsToActionsToThere.pop(origcell)
+            for collidingAction in collidingActions:
+                revertAction(collidingAction)
+
+    for cell in list(cellsToActionsToThere.keys()):
+        actionsToRevert = []
+        if cell in cellsToActionsToThere and not cell.isCityTile():
+            currActions = cellsToActionsToThere[cell]
+            if len(currActions) > 1:
+                actionsToRevert += currActions
+            elif len(cell.units) == 1 and not any(unit.id in movingUnits for unit in cell.units.values()):
+                actionsToRevert += currActions
+        for action in actionsToRevert:
+            revertAction(action)
+        for action in actionsToRevert:
+            newcell = game.map.getCellByPos(game.getUnit(action.team, action.unitid).pos.translate(action.direction, 1))
+            cellsToActionsToThere.pop(newcell, None)
+
+    prunedActions = []
+    for currActions in cellsToActionsToThere.values():
+        prunedActions += currActions
+    return prunedActions
+
+
+def crowdGame(unitCount, rng):
+    ''' A 32x32 map with no resources and unitCount workers crowded around the center '''
+    game = Game({"seed": 2, "engine": Constants.ENGINE_TYPES.OBJECT})
+    for cell in list(game.map.resources):
+        game.map.removeResource(cell)
+        cell.resource = None
+    cells = [(x, y) for y in range(4, 28) for x in range(4, 28)]
+    for x, y in rng.sample(cells, unitCount):
+        if game.map.getCell(x, y).citytile is None:
+            game.spawnWorker(rng.randint(0, 1), x, y)
+    return game
+
+
+class TestMovement(TestCase):
+    DIRECTIONS = [
+        Constants.DIRECTIONS.NORTH,
+        Constants.DIRECTIONS.EAST,
+        Constants.DIRECTIONS.SOUTH,
+        Constants.DIRECTIONS.WEST,
+        Constants.DIRECTIONS.CENTER,
+    ]
+
+    def test_matches_recursive_pruning(self):
+        rng = random.Random(1)
+        for unitCount in [50, 200, 500]:
+            game = crowdGame(unitCount, rng)
+            for trial in range(20):
+                actions = []
+                for team in [Constants.TEAM.A, Constants.TEAM.B]:
+                    for unit in game.getTeamsUnits(team).values():
+                        if rng.random() < 0.8:
+                            actions.append(MoveAction(team, unit.id, rng.choice(self.DIRECTIONS)))
+                self.assertEqual(game.handleMovementActions(actions), recursivePrune(game, actions))
+
+    def test_move_arrays_match_resolve_moves(self):
+        rng = random.Random(3)
+        for unitCount in [50, 200, 500]:
+            game = crowdGame(unitCount, rng)
+            for x, y in rng.sample([(x, y) for y in range(32) for x in range(32)], 40):
+                if len(game.map.getCell(x, y).units) == 0:
+                    game.spawnCityTile(rng.randint(0, 1), x, y)
+            cells = game.map.cells
+            for trial in range(20):
+                origins, destinations = [], []
+                for unit in list(game.getTeamsUnits(0).values()) + list(game.getTeamsUnits(1).values()):
+                    newpos = unit.pos.translate(rng.choice(self.DIRECTIONS), 1)
+                    if rng.random() < 0.8 and game.map.inMap(newpos):
+                        origins.append(unit.pos.y * 32 + unit.pos.x)
+                        destinations.append(newpos.y * 32 + newpos.x)
+                isCityTile = [cells[i].isCityTile() for i in destinations]
+                hasStillUnit = [len(cells[i].units) == 1 and i not in origins for i in destinations]
+                kept = resolveMoveArrays(np.array(origins), np.array(destinations), np.array(isCityTile), np.array(hasStillUnit))
+                expected = resolveMoves(
+                    origins, destinations, lambda i: cells[i].isCityTile(),
+                    lambda i: len(cells[i].units) == 1 and i not in origins
+                )
+                self.assertEqual(np.nonzero(kept)[0].tolist(), sorted(expected))
+
+    def test_long_chain(self):
+        # a column of units all moving north behind a unit that stays put, every move is reverted
+        game = crowdGame(0, random.Random(1))
+        units = [game.spawnWorker(Constants.TEAM.A, 1, y) for y in range(2, 30)]
+        actions = [MoveAction(Constants.TEAM.A, unit.id, Constants.DIRECTIONS.NORTH) for unit in units[1:]]
+        self.assertEqual(game.handleMovementActions(actions), [])
+
+    def test_crowd_speed(self):
+        print("Testing collision resolution speed in a crowd")
+        rng = random.Random(2)
+        game = crowdGame(500, rng)
+        actions = []
+        for team in [Constants.TEAM.A, Constants.TEAM.B]:
+            for unit in game.getTeamsUnits(team).values():
+                actions.append(MoveAction(team, unit.id, rng.choice(self.DIRECTIONS)))
+
+        start_time = time.time()
+        for i in range(100):
+            game.handleMovementActions(actions)
+        total_time = time.time() - start_time
+
+        print("%i moves: %.3f ms per turn." % (len(actions), total_time / 100 * 1000))
+        assert (total_time / 100) <= 0.05 # Normally takes ~1 ms per turn
@@ -0,0 +1,36 @@
+from unittest import TestCase
+
+import numpy as np
+from ..env.observation import SpatialObservation, CHANNEL_INDEX
+from ..game.constants import Constants
+from ..game.game import Game
+
+
+class TestObservation(TestCase):
+    def test_spatial_observation(self):
+        game = Game({"seed": 5, "engine": Constants.ENGINE_TYPES.OBJECT})
+        builder = SpatialObservation(cropSize=5)
+        builder.update(game)
+
+        obsA = builder.getObservation(Constants.TEAM.A)
+        obsB = builder.getObservation(Constants.TEAM.B)
+        self.assertEqual(obsA.shape, (len(CHANNEL_INDEX), 32, 32))
+        self.assertEqual(obsA[CHANNEL_INDEX["onMap"]].sum(), game.map.width * game.map.height)
+
+        cell = next(iter(game.map.resources_by_type[Constants.RESOURCE_TYPES.WOOD]))
+        self.assertGreater(obsA[CHANNEL_INDEX["wood"], cell.pos.y, cell.pos.x], 0)
+
+        for team, obs in [(Constants.TEAM.A, obsA), (Constants.TEAM.B, obsB)]:
+            unit = list(game.getTeamsUnits(team).values())[0]
+            self.assertEqual(obs[CHANNEL_INDEX["ownWorkers"], unit.pos.y, unit.pos.x], 1)
+            self.assertEqual(obs[CHANNEL_INDEX["ownCityTiles"], unit.pos.y, unit.pos.x], 1)
+            self.assertEqual(obs[CHANNEL_INDEX["enemyWorkers"]].sum(), 1)
+
+            # crops are views, centred on the unit
+            crop = builder.getCrop(team, unit.pos.x, unit.pos.y)
+            self.assertEqual(crop.shape, (len(CHANNEL_INDEX), 5, 5))
+            self.assertTrue(np.shares_memory(crop, builder.buffer))
+            np.testing.assert_array_equal(crop[:, 2, 2], obs[:, unit.pos.y, unit.pos.x])
+
+        # the corner crop is padded with zeros
+        self.assertEqual(builder.getCrop(Constants.TEAM.A, 0, 0)[CHANNEL_INDEX["onMap"]].sum(), 9)
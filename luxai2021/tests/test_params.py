@@ -0,0 +1,45 @@
+from unittest import TestCase
+
+import copy
+import pickle
+from ..game.constants import Constants, LuxMatchConfigs_Default
+from ..game.game import Game
+from ..game.params import GameParams
+
+
+class TestParams(TestCase):
+    def test_game_params(self):
+        parameters = copy.deepcopy(LuxMatchConfigs_Default["parameters"])
+        parameters["DAY_LENGTH"] = 5
+        parameters["NIGHT_LENGTH"] = 3
+        game = Game({"seed": 3, "parameters": parameters, "engine": Constants.ENGINE_TYPES.OBJECT})
+
+        # the defaults are left untouched
+        self.assertIsNot(game.configs, LuxMatchConfigs_Default)
+        self.assertEqual(LuxMatchConfigs_Default["seed"], None)
+        self.assertEqual(LuxMatchConfigs_Default["parameters"]["DAY_LENGTH"], 30)
+
+        params = game.params
+        self.assertEqual(params.cycleLength, 8)
+        for turn in range(params.maxDays + 10):
+            self.assertEqual(params.isNight(turn), turn % 8 >= 5)
+        game.state["turn"] = 6
+        self.assertTrue(game.isNight())
+
+        with self.assertRaises(AttributeError):
+            params.dayLength = 30
+        parameters["DAY_LENGTH"] = 30
+        self.assertEqual(params.dayLength, 5)
+        self.assertIs(game.map.getCell(0, 0).params, params)
+        self.assertEqual(pickle.loads(pickle.dumps(params)).nightTable, params.nightTable)
+        self.assertEqual(GameParams(parameters).fuelRates, (1, 5, 20))
+
+        # the raw parameters are read only too
+        with self.assertRaises(TypeError):
+            params.parameters["DAY_LENGTH"] = 30
+        with self.assertRaises(TypeError):
+            params.parameters["LIGHT_UPKEEP"]["CITY"] = 0
+        self.assertEqual(params.parameters["DAY_LENGTH"], 5)
+        self.assertEqual(GameParams(params.parameters).cycleLength, 8)
+        self.assertEqual(pickle.loads(pickle.dumps(params)).parameters, params.parameters)
+        self.assertEqual(copy.deepcopy(game.configs)["parameters"]["NIGHT_LENGTH"], 3)
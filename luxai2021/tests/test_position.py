@@ -0,0 +1,35 @@
+from unittest import TestCase
+
+import copy
+import pickle
+from ..game.position import Position, getPosition
+from ..game.constants import Constants
+
+
+class TestPosition(TestCase):
+    def test_interned_positions(self):
+        pos = getPosition(3, 4)
+        self.assertIs(getPosition(3, 4), pos)
+        self.assertIs(pos.translate(Constants.DIRECTIONS.NORTH, 1), getPosition(3, 3))
+        self.assertIs(pos.translate(Constants.DIRECTIONS.CENTER, 1), pos)
+        self.assertIs(getPosition(0, 0).translate(Constants.DIRECTIONS.WEST, 1), getPosition(-1, 0))
+        self.assertIs(copy.deepcopy(pos), pos)
+        self.assertIs(pickle.loads(pickle.dumps(pos)), pos)
+
+        # shared positions can't be moved
+        with self.assertRaises(AttributeError):
+            pos.x = 5
+        with self.assertRaises(AttributeError):
+            Position(100, 100).y = 0
+        self.assertEqual((pos.x, pos.y), (3, 4))
+
+        # positions far off the maps are not interned, but still translate and compare by value
+        far = getPosition(100, -5)
+        self.assertEqual(far.translate(Constants.DIRECTIONS.EAST, 2), Position(102, -5))
+        self.assertEqual(getPosition(-1, 0).translate(Constants.DIRECTIONS.WEST, 1), Position(-2, 0))
+
+    def test_hash_matches_eq(self):
+        positions = {Position(1, 2): "a", getPosition(5, 5): "b"}
+        self.assertEqual(positions[getPosition(1, 2)], "a")
+        self.assertEqual(positions[Position(5, 5)], "b")
+        self.assertEqual(getPosition(2, 2).directionTo(Position(2, 7)), Constants.DIRECTIONS.SOUTH)
@@ -0,0 +1,26 @@
+from unittest import TestCase, skipIf
+
+import os
+import shutil
+from subprocess import Popen, PIPE
+from ..env.rng.rng import SeedRandom, get_n_values
+
+
+class TestRng(TestCase):
+    def test_known_values(self):
+        # Values printed by `node rng.js <seed> <N>`
+        self.assertEqual(get_n_values(5, 4), [0.9195596189976892, 0.4112354790927613, 0.32452147805759257, 0.9139536236077223])
+        self.assertEqual(get_n_values(123456789, 3), [0.3631819401404689, 0.7995896811459317, 0.694804040387595])
+        self.assertEqual(get_n_values(-7, 2), [0.1843499448447731, 0.012273357690711379])
+        rng = SeedRandom(3)
+        self.assertEqual([rng.int32(), rng.quick(), rng.int32(), rng.random()],
+                         [1347883390, 0.45164424018003047, -1409940126, 0.32172140101639435])
+
+    @skipIf(shutil.which("node") is None, "node is not installed")
+    def test_matches_node(self):
+        script = os.path.join(os.path.dirname(__file__), "..", "env", "rng", "rng.js")
+        for seed in [0, 42, 987654321]:
+            p = Popen(["node", script, str(seed), "5000"], stdout=PIPE)
+            expected = [float(v) for v in p.stdout.readline().decode().split(",")]
+            p.wait()
+            self.assertEqual(get_n_values(seed, 5000), expected)
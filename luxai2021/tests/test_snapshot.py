@@ -0,0 +1,134 @@
+from unittest import TestCase
+
+import pickle
+import random
+import time
+from ..game.game import Game
+from ..game.constants import Constants
+from .test_array_state import randomActions, summarize, populate
+
+
+def playTurns(game, seed, turns):
+    ''' Plays random turns, returning the summary of the game after each of them '''
+    rng = random.Random(seed)
+    summaries = []
+    for turn in range(turns):
+        matchOver = game.runTurnWithActions(randomActions(game, rng))
+        summaries.append(summarize(game))
+        if matchOver:
+            break
+    return summaries
+
+
+class TestSnapshot(TestCase):
+    def test_restore_replays_identically(self):
+        for engine in [Constants.ENGINE_TYPES.OBJECT, Constants.ENGINE_TYPES.ARRAY]:
+            game = Game({"seed": 6, "engine": engine})
+            playTurns(game, 1, 40)
+            before = summarize(game)
+            snapshot = game.snapshot()
+            clone = game.clone()
+
+            after = playTurns(game, 2, 80)
+            game.restore(snapshot)
+            self.assertEqual(summarize(game), before)
+            self.assertEqual(game.counters, game.countTeams())
+            self.assertEqual(playTurns(game, 2, 80), after)
+
+            # the clone is independent of the game it came from
+            self.assertEqual(summarize(clone), before)
+            self.assertEqual(playTurns(clone, 2, 80), after)
+            game.restore(snapshot)
+            self.assertEqual(summarize(game), before)
+
+    def test_nested_snapshots(self):
+        game = Game({"seed": 3, "engine": Constants.ENGINE_TYPES.OBJECT})
+        populate(game, random.Random(3))
+        root = game.snapshot()
+        rootSummary = summarize(game)
+        playTurns(game, 1, 20)
+        child = game.snapshot()
+        childSummary = summarize(game)
+
+        # a search goes back to a node any number of times, then up the tree
+        for seed in range(3):
+            playTurns(game, seed, 10)
+            game.restore(child)
+            self.assertEqual(summarize(game), childSummary)
+        game.runTurnWithActions([], journal=True)
+        game.restore(root)
+        self.assertEqual(summarize(game), rootSummary)
+        self.assertEqual(game.counters, game.countTeams())
+        self.assertEqual(len(game.journal), 0)
+
+        # the turns before the child were undone, the new ones lead elsewhere
+        playTurns(game, 1, 20)
+        self.assertRaises(Exception, game.restore, child)
+        game.restore(root)
+        self.assertEqual(summarize(game), rootSummary)
+
+        # a pickled copy of the game does not hold the snapshots
+        copied = pickle.loads(pickle.dumps(game))
+        self.assertEqual(summarize(copied), rootSummary)
+        self.assertEqual(len(copied.snapshots), 0)
+
+        # turns are only recorded while a snapshot is held
+        del root, child
+        playTurns(game, 1, 5)
+        self.assertEqual(len(game.history), 0)
+        snapshot = game.snapshot()
+        game.reset()
+        self.assertRaises(Exception, game.restore, snapshot)
+
+    def test_snapshot_speed(self):
+        print("Testing snapshot and restore speed")
+        game = Game({"seed": 6, "engine": Constants.ENGINE_TYPES.OBJECT})
+        playTurns(game, 1, 100)
+        start_time = time.time()
+        for i in range(100):
+            game.restore(game.snapshot())
+        total_time = time.time() - start_time
+        print("%.3f ms per snapshot and restore." % (total_time / 100 * 1000))
+        assert (total_time / 100) <= 0.01 # Normally takes well under 1 ms
+
+    def test_undo_turns(self):
+        game = Game({"seed": 2, "engine": Constants.ENGINE_TYPES.OBJECT})
+        playTurns(game, 1, 30)
+        rng = random.Random(3)
+        summaries = [summarize(game)]
+        for turn in range(10):
+            game.runTurnWithActions(randomActions(game, rng), journal=True)
+            summaries.append(summarize(game))
+
+        # undo depth first, trying another turn from each node before going back up
+        for turn in range(10):
+            game.runTurnWithActions(randomActions(game, rng), journal=True)
+            game.undoTurn()
+            self.assertEqual(summarize(game), summaries.pop())
+            game.undoTurn()
+            self.assertEqual(summarize(game), summaries[-1])
+        self.assertEqual(game.counters, game.countTeams())
+        self.assertRaises(Exception, game.undoTurn)
+
+        # the array engine has no undo log
+        game = Game({"seed": 2, "engine": Constants.ENGINE_TYPES.ARRAY})
+        self.assertRaises(Exception, game.runTurnWithActions, [], journal=True)
+
+    def test_undo_turns_through_nights(self):
+        # populated games build roads, merge cities, and lose cities and units at night
+        game = Game({"seed": 3, "engine": Constants.ENGINE_TYPES.OBJECT})
+        populate(game, random.Random(3))
+        rng = random.Random(5)
+        for depth in range(40):
+            before = summarize(game)
+            cells = [(list(cell.units), cell.citytile, cell.road) for cell in game.map.cells]
+            resourcesByType = {type: list(index) for type, index in game.map.resources_by_type.items()}
+            for turn in range(3):
+                game.runTurnWithActions(randomActions(game, rng), journal=True)
+            for turn in range(3):
+                game.undoTurn()
+            self.assertEqual(summarize(game), before)
+            self.assertEqual([(list(cell.units), cell.citytile, cell.road) for cell in game.map.cells], cells)
+            self.assertEqual({type: list(index) for type, index in game.map.resources_by_type.items()}, resourcesByType)
+            self.assertEqual(game.counters, game.countTeams())
+            game.runTurnWithActions(randomActions(game, rng), journal=True)
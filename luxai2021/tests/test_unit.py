@@ -0,0 +1,74 @@
+from unittest import TestCase
+
+import os
+import random
+import time
+import tracemalloc
+from ..game.game import Game
+from ..game.actions import MoveAction
+from ..game.constants import Constants
+from ..game.unit import Cargo
+
+
+def crowdedGame(seed):
+    ''' A game with workers on about 30% and city tiles on about 10% of the free cells '''
+    game = Game({"seed": seed, "engine": Constants.ENGINE_TYPES.OBJECT})
+    rng = random.Random(seed)
+    for cell in game.map.cells:
+        if cell.resource is None and cell.citytile is None:
+            r = rng.random()
+            if r < 0.3:
+                game.spawnWorker(rng.randint(0, 1), cell.pos.x, cell.pos.y)
+            elif r < 0.4:
+                game.spawnCityTile(rng.randint(0, 1), cell.pos.x, cell.pos.y)
+    return game
+
+
+class TestUnit(TestCase):
+    def test_cargo(self):
+        cargo = Cargo()
+        cargo["wood"] += 30
+        cargo["coal"] = 20
+        cargo["wood"] -= 5
+        self.assertEqual(cargo.used, 45)
+        self.assertEqual(dict(cargo), {"wood": 25, "uranium": 0, "coal": 20})
+        self.assertEqual(cargo, {"wood": 25, "uranium": 0, "coal": 20})
+        self.assertRaises(KeyError, lambda: cargo["used"])
+        with self.assertRaises(AttributeError):
+            cargo.wood = 10 # would bypass used
+        self.assertEqual(cargo.used, 45)
+        cargo.clear()
+        self.assertEqual(cargo.used, 0)
+
+        game = Game({"seed": 2, "engine": Constants.ENGINE_TYPES.OBJECT})
+        unit = list(game.getTeamsUnits(Constants.TEAM.A).values())[0]
+        unit.cargo["uranium"] = 10
+        self.assertEqual(unit.getCargoSpaceLeft(), game.configs["parameters"]["RESOURCE_CAPACITY"]["WORKER"] - 10)
+        self.assertFalse(hasattr(unit, "__dict__"))
+
+    def test_crowded_game_benchmark(self):
+        tracemalloc.start()
+        start = tracemalloc.get_traced_memory()[0]
+        game = crowdedGame(6)
+        memory = tracemalloc.get_traced_memory()[0] - start
+        tracemalloc.stop()
+        unitCount = len(game.getTeamsUnits(Constants.TEAM.A)) + len(game.getTeamsUnits(Constants.TEAM.B))
+
+        rng = random.Random(2)
+        directions = [Constants.DIRECTIONS.NORTH, Constants.DIRECTIONS.EAST, Constants.DIRECTIONS.SOUTH,
+                      Constants.DIRECTIONS.WEST, Constants.DIRECTIONS.CENTER]
+        total_time = 0
+        for turn in range(30):
+            actions = []
+            for team in [Constants.TEAM.A, Constants.TEAM.B]:
+                for unit in game.getTeamsUnits(team).values():
+                    action = MoveAction(team, unit.id, rng.choice(directions))
+                    if action.isValid(game):
+                        actions.append(action)
+            start_time = time.time()
+            game.runTurnWithActions(actions)
+            total_time += time.time() - start_time
+
+        if os.environ.get("LUXAI_BENCHMARK"):
+            print("%i units: %.1f KB per game, %.3f ms per turn." % (unitCount, memory / 1024, total_time / 30 * 1000))
+        assert (total_time / 30) <= 0.05 # Normally takes ~1 ms per turn
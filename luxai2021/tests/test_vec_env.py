@@ -0,0 +1,79 @@
+from unittest import TestCase
+
+import numpy as np
+from ..env.agent import Agent
+from ..env.shm_vec_env import LuxSharedMemoryVecEnv
+from ..env.vec_env import LuxVecEnv
+from ..game.constants import Constants
+from .test_lux_env import MovingAgent
+
+
+class FailingAgent(MovingAgent):
+    ''' Learning agent that raises on the CENTER action code '''
+    def takeAction(self, actionCode, game, unit=None, citytile=None, team=None):
+        if actionCode == 0:
+            raise Exception("Failing agent.")
+        super().takeAction(actionCode, game, unit, citytile, team)
+
+
+class TestVecEnv(TestCase):
+    def test_vec_env(self):
+        numEnvs = 3
+        env = LuxVecEnv({"seed": 1, "engine": Constants.ENGINE_TYPES.OBJECT}, MovingAgent, Agent, numEnvs)
+        obs = env.reset()
+        self.assertEqual(obs.shape, (numEnvs, 3))
+
+        rng = np.random.default_rng(0)
+        episodes = 0
+        while episodes < numEnvs:
+            obs, rewards, dones, infos = env.step(rng.integers(0, 5, numEnvs))
+            self.assertEqual(obs.shape, (numEnvs, 3))
+            for i in np.nonzero(dones)[0]:
+                # matches end on their own, there is no observation to bootstrap from
+                self.assertNotIn("terminal_observation", infos[i])
+                # auto reset, the new match starts on a new turn
+                self.assertEqual(obs[i, 2], 1)
+                episodes += 1
+        self.assertEqual(len(env.get_attr("current_step")), numEnvs)
+        env.close()
+
+    def test_shared_memory_vec_env(self):
+        numEnvs = 4
+        env = LuxSharedMemoryVecEnv({"seed": 1}, MovingAgent, Agent, numEnvs, numWorkers=2)
+        try:
+            obs = env.reset()
+            self.assertEqual(obs.shape, (numEnvs, 3))
+            self.assertTrue((obs[:, 2] == 1).all())
+
+            rng = np.random.default_rng(0)
+            for step in range(200):
+                obs, rewards, dones, infos = env.step(rng.integers(0, 5, numEnvs))
+                self.assertEqual(obs.shape, (numEnvs, 3))
+                self.assertEqual(len(infos), numEnvs)
+                for i in np.nonzero(dones)[0]:
+                    self.assertNotIn("terminal_observation", infos[i])
+
+            self.assertEqual(env.seed(7), [7, 8, 9, 10])
+            self.assertEqual([game.configs["seed"] for game in env.get_attr("game")], [7, 8, 9, 10])
+            with self.assertRaises(AttributeError):
+                env.get_attr("missing", 0)
+        finally:
+            env.close()
+
+    def test_shared_memory_vec_env_failure(self):
+        numEnvs = 2
+        env = LuxSharedMemoryVecEnv({"seed": 1}, FailingAgent, Agent, numEnvs, numWorkers=2)
+        try:
+            env.reset()
+            with self.assertRaises(Exception):
+                env.step(np.array([1, 0]))
+            # the failed worker has exited, so the environment raises instead of waiting on it
+            self.assertTrue(env.failed)
+            with self.assertRaises(Exception):
+                env.reset()
+            with self.assertRaises(Exception):
+                env.step(np.array([1, 1]))
+            with self.assertRaises(Exception):
+                env.get_attr("current_step")
+        finally:
+            env.close()